@@ -1,8 +1,94 @@
+"""nicklib
+
+Submodules are imported on first use, as attributes of the package, so
+importing nicklib for attr_unpack or the transforms doesn't pay for numpy
+and the modules built on it.
+
+Typical usage example:
+
+    import nicklib
+    nicklib.vector.Vec # imports nicklib.vector, and numpy, only here
+"""
 from __future__ import annotations
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator, Literal
+from operator import attrgetter
+import importlib
+import itertools
+
+_SUBMODULES = frozenset({'benchmark', 'config', 'files', 'query', 'records', 'shared', 'spatial', 'stack', 'table', 'testing', 'transforms', 'tupleclass', 'vector'})
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}') # binds it on the package, so this runs once per submodule
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | _SUBMODULES)
+
+_TYPECODES = {float: 'd', int: 'q', bool: 'b'} # array.array typecodes of python types, shared with the stacks
 
 def attr_unpack(obj: object, *args: list[str]) -> list[object]:
     return [getattr(obj, arg) for arg in args]
 
 def iter_attr_unpack(iterable: iter, *args: list[str]) -> list[object]:
     return [attr_unpack(obj, *args) for obj in iterable]
+
+def iter_attr_stream(iterable: Iterable, *args: str) -> Iterator[tuple]:
+    """Lazily give a tuple of the named attributes of each object, fetched by one precompiled attrgetter."""
+    if len(args) == 1: # attrgetter of one name gives the value rather than a tuple
+        return zip(map(attrgetter(args[0]), iterable))
+    return map(attrgetter(*args), iterable)
+
+def attr_columns(iterable: Iterable, *args: str, dtype: Any = float, kind: Literal['numpy', 'array'] = 'numpy',
+                 count: int|None = None, chunked: bool = False, chunk_size: int = 65536) -> tuple:
+    """Give a column of each named attribute over the objects of an iterable, without building a row per object.
+
+    Columns are numpy arrays, or with kind='array' array.arrays, of dtype (a
+    typecode for array.arrays), which may be one for every column or a dict from
+    attribute name to its own. numpy columns are preallocated when the number of
+    objects is known, from len or given as count, and otherwise grown as chunks
+    of chunk_size objects are read. With chunked, the iterable gives chunks of
+    objects, e.g. the batches of a database cursor, rather than objects.
+
+    Typical usage example:
+
+        xs, ys = attr_columns(session.query(Body), 'x', 'y')
+        positions = VecArray(VecXY, np.column_stack((xs, ys)))
+    """
+    if not args:
+        return ()
+    dtypes = [dtype.get(arg, float) if isinstance(dtype, dict) else dtype for arg in args]
+    getters = [attrgetter(arg) for arg in args]
+    chunks = iterable if chunked else _chunks(iterable, chunk_size)
+
+    if kind == 'array':
+        import array
+        dtypes = [_TYPECODES.get(code, code) for code in dtypes]
+        columns = [array.array(code) for code in dtypes]
+        for chunk in chunks:
+            for column, getter in zip(columns, getters):
+                column.extend(map(getter, chunk))
+        return tuple(columns)
+    if kind != 'numpy':
+        raise ValueError(f"Expected kind to be 'numpy' or 'array', got {kind!r}")
+
+    import numpy as np
+    if count is None and not chunked and hasattr(iterable, '__len__'):
+        count = len(iterable)
+    columns = [np.empty(count or 0, dtype=code) for code in dtypes]
+    size = 0
+    for chunk in chunks:
+        n = len(chunk)
+        if size + n > len(columns[0]): # grow geometrically, when the count wasn't known or was too few
+            capacity = max(size + n, 2 * len(columns[0]))
+            columns = [np.concatenate((column[:size], np.empty(capacity - size, dtype=column.dtype))) for column in columns]
+        for column, getter in zip(columns, getters):
+            column[size:size + n] = np.fromiter(map(getter, chunk), dtype=column.dtype, count=n)
+        size += n
+    return tuple(column[:size] for column in columns)
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    if isinstance(iterable, (list, tuple)):
+        return (iterable[i:i + size] for i in range(0, len(iterable), size))
+    iterator = iter(iterable)
+    return iter(lambda: list(itertools.islice(iterator, size)), [])
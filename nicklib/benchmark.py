@@ -0,0 +1,748 @@
+"""Benchmarks
+
+Timings and allocations of the hot paths of the library: Vec
+construction and arithmetic, TupleClass construction and access, the
+per-call overhead of the function transformers, the table, query and
+spatial index paths, and the stacks against list and deque. Results are written
+to JSON, and compared against a stored baseline to catch regressions.
+
+The time to import each module, in a fresh interpreter with python -X
+importtime, is checked against a budget, so that a module which starts
+importing numpy, or anything else heavy, when it needn't is caught.
+
+Typical usage example:
+
+    python -m nicklib.benchmark --output baseline.json   # record a baseline
+    python -m nicklib.benchmark --baseline baseline.json # compare, exit 1 on a regression
+    python -m nicklib.benchmark -k vec/ --threshold 0.25 # only the Vec cases, 25% slack
+    python -m nicklib.benchmark --list
+    python -m nicklib.benchmark --imports                # import times, exit 1 over budget
+
+A case is registered with @case(name) on a setup function, which gives
+the zero argument callable to time. What a case measures, and numpy, is
+imported by its setup function rather than with this module, so listing
+the cases, or running a few, only imports what those need.
+"""
+from __future__ import annotations
+from typing import Any, Callable
+from operator import attrgetter
+import argparse
+import atexit
+import collections
+import json
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+import tracemalloc
+import typing
+from .tupleclass import TupleClass
+
+_CASES: dict[str, Callable[[], Callable[[], Any]]] = {}
+
+def case(name: str) -> Callable:
+    """Register a benchmark case under name, given by a setup function giving the callable to time."""
+    def decorator(setup: Callable[[], Callable[[], Any]]) -> Callable:
+        if name in _CASES:
+            raise ValueError(f"Benchmark case '{name}' is already registered")
+        _CASES[name] = setup
+        return setup
+    return decorator
+
+def measure(func: Callable[[], Any], repeat: int = 5, min_time: float = 0.1, memory: bool = True) -> dict[str, Any]:
+    """Time a callable, giving the best and median time per call and, with memory, its allocations.
+
+    Each of repeat runs makes enough calls to take at least min_time. peak_bytes
+    is the most memory allocated at once during a call, and retained_bytes what a
+    call leaves allocated on average.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while (elapsed := timer.timeit(number)) < min_time:
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    per_call = [t / number * 1e9 for t in timer.repeat(repeat, number)]
+    result = {'ns_min': min(per_call), 'ns_median': statistics.median(per_call), 'number': number}
+
+    if memory:
+        func() # leave caches out of the allocations
+        calls = min(number, 1000)
+        tracemalloc.start()
+        try:
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            for _ in range(calls - 1):
+                func()
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result['peak_bytes'] = peak - start
+        result['retained_bytes'] = (current - start) / calls
+    return result
+
+def run(pattern: str|None = None, repeat: int = 5, min_time: float = 0.1, memory: bool = True, report: Callable[[str, dict], Any]|None = None) -> dict[str, dict[str, Any]]:
+    """Run every case whose name contains pattern, giving the measurements of each by name."""
+    results = {}
+    for name, setup in _CASES.items():
+        if pattern is None or pattern in name:
+            results[name] = measure(setup(), repeat, min_time, memory)
+            if report is not None:
+                report(name, results[name])
+    return results
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], threshold: float = 0.1) -> list[tuple[str, float, float]]:
+    """Give the (name, baseline ns, ns) of each case more than threshold slower than its baseline, by best time."""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['ns_min'] > baseline[name]['ns_min'] * (1 + threshold):
+            regressions.append((name, baseline[name]['ns_min'], result['ns_min']))
+    return regressions
+
+# microseconds to import each module, including whatever it imports, in a fresh interpreter.
+# Each is about twice what it took when set, room for a noisy machine but not for numpy (~70 ms)
+# turning up in a module which doesn't need it.
+_IMPORT_BUDGETS = {
+    'nicklib': 40_000,
+    'nicklib.tupleclass': 40_000,
+    'nicklib.stack': 40_000,
+    'nicklib.testing': 80_000, # statistics
+    'nicklib.transforms.arguments': 60_000,
+    'nicklib.transforms.caching': 60_000,
+    'nicklib.transforms.instrument': 60_000,
+    'nicklib.transforms.parallel': 120_000,
+    'nicklib.transforms.governors': 160_000, # asyncio
+    'nicklib.files': 120_000,
+    'nicklib.config': 140_000,
+    'nicklib.vector': 220_000, # numpy
+    'nicklib.table': 220_000,
+    'nicklib.query': 220_000,
+    'nicklib.spatial': 250_000,
+    'nicklib.records': 250_000,
+    'nicklib.shared': 250_000,
+}
+
+def import_time(module: str, repeat: int = 5) -> dict[str, Any]:
+    """Time importing a module in a fresh interpreter, by python -X importtime, giving the best of repeat imports.
+
+    us is the cumulative microseconds of the module and its parent packages,
+    and so of everything they import, and modules the names of what the import
+    brought in.
+    """
+    parents = {'.'.join(module.split('.')[:i]) for i in range(1, module.count('.') + 2)}
+    code = f"import sys; before = set(sys.modules); import {module}; print(*sorted(set(sys.modules) - before), sep='\\n')"
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+        us = 0
+        for line in process.stderr.splitlines(): # import time: self [us] | cumulative | imported package
+            if line.startswith('import time:') and not line.endswith('imported package'):
+                _, cumulative, name = line.split('|')
+                if name.strip() in parents and not name.startswith('  '): # top level, not imported by another
+                    us += int(cumulative)
+        best = us if best is None else min(best, us)
+    return {'us': best, 'modules': process.stdout.split()}
+
+def _format(name: str, result: dict[str, Any], baseline: dict[str, Any]|None = None) -> str:
+    line = f"{name:40s} {result['ns_min']:12.1f} ns"
+    if 'peak_bytes' in result:
+        line += f" {result['peak_bytes']:10d} B peak {result['retained_bytes']:10.1f} B kept"
+    if baseline is not None:
+        line += f" {result['ns_min'] / baseline['ns_min']:6.2f}x"
+    return line
+
+def main(argv: list[str]|None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the library's hot paths.")
+    parser.add_argument('-k', dest='pattern', help="only run cases whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case, the best is kept")
+    parser.add_argument('--min-time', type=float, default=0.1, help="least seconds per timed run")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against the results in this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.1, help="slowdown over the baseline counted as a regression, e.g. 0.1 for 10%%")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip measuring allocations with tracemalloc")
+    parser.add_argument('--list', action='store_true', help="list the cases and exit")
+    parser.add_argument('--imports', action='store_true', help="check the import time of each module against its budget")
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        over = []
+        for module, budget in _IMPORT_BUDGETS.items():
+            if args.pattern is None or args.pattern in module:
+                result = import_time(module, args.repeat)
+                print(f"{module:40s} {result['us']:10d} us of {budget:6d} us {len(result['modules']):5d} modules", flush=True)
+                if result['us'] > budget:
+                    over.append((module, budget, result['us']))
+        for module, budget, us in over:
+            print(f"OVER BUDGET {module}: {us} us > {budget} us")
+        return 1 if over else 0
+
+    if args.list:
+        print('\n'.join(name for name in _CASES if args.pattern is None or args.pattern in name))
+        return 0
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+
+    results = run(args.pattern, args.repeat, args.min_time, args.memory,
+                  report=lambda name, result: print(_format(name, result, baseline.get(name)), flush=True))
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': sys.version, 'machine': platform.platform(), 'results': results}, file, indent=2)
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: {before:.1f} ns -> {after:.1f} ns ({after / before:.2f}x)")
+    return 1 if regressions else 0
+
+# Vec
+
+def _vec_cls(dim: int) -> type[Vec]:
+    from .vector import Vec
+    return type(Vec)(f'Vec{dim}', (Vec,), {'__annotations__': {f'x{i}': float for i in range(dim)}})
+
+def _small_vec_cls(dim: int) -> type:
+    from .vector import Vec2, Vec3
+    return {2: Vec2, 3: Vec3}[dim]
+
+for _dim, _small in ((2, False), (3, False), (8, False), (2, True), (3, True)):
+    def _register(dim: int, small: bool):
+        prefix = 'vec/small' if small else 'vec'
+        values = [float(i) for i in range(dim)]
+
+        def operands() -> tuple[type, Any, Any]:
+            cls = _small_vec_cls(dim) if small else _vec_cls(dim)
+            return cls, cls(*values), cls(*values)
+
+        @case(f'{prefix}/construct/{dim}d')
+        def _():
+            cls, _, _ = operands()
+            return lambda: cls(*values)
+
+        @case(f'{prefix}/add/{dim}d')
+        def _():
+            _, a, b = operands()
+            return lambda: a + b
+
+        @case(f'{prefix}/mul_scalar/{dim}d')
+        def _():
+            _, a, _ = operands()
+            return lambda: a * 2.0
+
+        @case(f'{prefix}/magnitude/{dim}d')
+        def _():
+            _, a, _ = operands()
+            return lambda: a.magnitude()
+
+        @case(f'{prefix}/iadd/{dim}d')
+        def _():
+            _, c, b = operands()
+            def f():
+                nonlocal c
+                c += b
+            return f
+    _register(_dim, _small)
+
+@case('vec/array_property_get')
+def _():
+    v = _vec_cls(3)(1.0, 2.0, 3.0)
+    return lambda: v.x1
+
+@case('vec/array_property_set')
+def _():
+    v = _vec_cls(3)(1.0, 2.0, 3.0)
+    def f():
+        v.x1 = 5.0
+    return f
+
+@case('vec/vecarray_add/10k')
+def _():
+    import numpy as np
+    from .vector import VecArray
+    cls = _vec_cls(3)
+    a = VecArray(cls, np.random.rand(10_000, 3))
+    return lambda: a + a
+
+def _vecarray_operands() -> list[VecArray]:
+    import numpy as np
+    from .vector import VecArray
+    cls = _vec_cls(3)
+    rng = np.random.default_rng(0)
+    return [VecArray(cls, rng.random((100_000, 3)) + 1) for _ in range(4)]
+
+@case('vec/expr_eager/100k')
+def _():
+    a, b, c, d = _vecarray_operands()
+    return lambda: a + b * 2 - c / d
+
+@case('vec/expr_lazy/100k')
+def _():
+    from .vector import lazy
+    a, b, c, d = lazy(*_vecarray_operands())
+    return lambda: (a + b * 2 - c / d).eval()
+
+@case('vec/expr_lazy_out/100k')
+def _():
+    from .vector import VecArray, lazy
+    operands = _vecarray_operands()
+    out = VecArray(operands[0]._vec_cls, 100_000)
+    a, b, c, d = lazy(*operands)
+    return lambda: (a + b * 2 - c / d).eval(out=out)
+
+# TupleClass
+
+class _Point(TupleClass):
+    x: float
+    y: float
+    label: str = ''
+
+class _SlotPoint(TupleClass, slots=True):
+    x: float
+    y: float
+    label: str = ''
+
+class _FrozenPoint(TupleClass, frozen=True):
+    x: float
+    y: float
+    label: str = ''
+
+class _InternedPoint(TupleClass, intern=True):
+    x: float
+    y: float
+    label: str = ''
+
+class _NamedPoint(typing.NamedTuple):
+    x: float
+    y: float
+    label: str = ''
+
+for _cls in (_Point, _SlotPoint, _FrozenPoint):
+    def _register(cls: type[TupleClass]):
+        mode = 'frozen' if cls._TupleClass_frozen else 'slots' if cls._TupleClass_slots else 'dict'
+        p, q = cls(1.0, 2.0, 'a'), cls(1.0, 3.0, 'a')
+
+        case(f'tupleclass/{mode}/construct')(lambda: lambda: cls(1.0, 2.0, 'a'))
+        case(f'tupleclass/{mode}/attribute')(lambda: lambda: p.y)
+        case(f'tupleclass/{mode}/index')(lambda: lambda: p[1])
+        case(f'tupleclass/{mode}/iterate')(lambda: lambda: tuple(p))
+        case(f'tupleclass/{mode}/unpack')(lambda: lambda: [*p])
+        case(f'tupleclass/{mode}/eq')(lambda: lambda: p == q)
+        case(f'tupleclass/{mode}/lt')(lambda: lambda: p < q)
+    _register(_cls)
+
+# records as dict keys and set members, against NamedTuple; mutable records are unhashable, so key by their tuple
+
+def _keys(cls: type, n: int = 1000, distinct: int = 100) -> list:
+    return [cls(float(i % distinct), 2.0, 'a') for i in range(n)]
+
+for _name, _cls, _key in (('dict', _Point, tuple), ('frozen', _FrozenPoint, None), ('namedtuple', _NamedPoint, None)):
+    def _register(name: str, cls: type, key: Callable|None):
+        @case(f'tupleclass/{name}/dict_count/1k')
+        def _():
+            keys = _keys(cls)
+            if key is not None:
+                keys = [key(k) for k in keys]
+            def count():
+                counts = {}
+                for k in keys:
+                    counts[k] = counts.get(k, 0) + 1
+                return counts
+            return count
+
+        @case(f'tupleclass/{name}/set_contains/1k')
+        def _():
+            keys = _keys(cls)
+            if key is not None:
+                keys = [key(k) for k in keys]
+            members = set(keys[:50])
+            return lambda: sum(k in members for k in keys)
+
+        case(f'tupleclass/{name}/construct_1k')(lambda: lambda: _keys(cls))
+    _register(_name, _cls, _key)
+
+# interning keeps one record of each of the 100 distinct values, rather than 1000 records
+case('tupleclass/interned/construct_1k')(lambda: lambda: _keys(_InternedPoint))
+
+# function transformers, against a bare function
+
+def _bare(x, y=1):
+    return x
+
+_positive = lambda x: None if x > 0 else ValueError(x)
+_check = lambda x, y=1: _positive(x)
+_identity_map = lambda *args, **kwargs: (args, kwargs)
+
+def _call(transform: Callable[[], Callable]) -> Callable[[], Callable]:
+    """A setup function timing a call of _bare transformed by what transform gives, which imports the transformers."""
+    def setup():
+        f = transform()(_bare)
+        return lambda: f(1, 2)
+    return setup
+
+def _map_arguments():
+    from .transforms.arguments import map_arguments
+    return map_arguments(_identity_map)
+
+def _take_args_as_list():
+    from .transforms.arguments import take_args_as_list
+    return take_args_as_list()
+
+def _validate_args():
+    from .transforms.arguments import validate_args
+    return validate_args(_check)
+
+def _validate_params():
+    from .transforms.arguments import validate_params
+    return validate_params(x=_positive)
+
+def _limit_calls():
+    from .transforms.testing import limit_calls
+    return limit_calls(sys.maxsize)
+
+def _memoize():
+    from .transforms.caching import memoize
+    return memoize()
+
+def _stacked():
+    stages = _map_arguments(), _validate_args(), _validate_params()
+    return lambda f: stages[0](stages[1](stages[2](f)))
+
+def _fused():
+    from .transforms.arguments import fuse
+    return fuse(_map_arguments(), _validate_args(), _validate_params())
+
+case('transforms/bare')(lambda: lambda: _bare(1, 2))
+case('transforms/map_arguments')(_call(_map_arguments))
+case('transforms/take_args_as_list')(_call(_take_args_as_list))
+case('transforms/validate_args')(_call(_validate_args))
+case('transforms/validate_params')(_call(_validate_params))
+case('transforms/limit_calls')(_call(_limit_calls))
+case('transforms/memoize_hit')(_call(_memoize))
+case('transforms/stacked_3')(_call(_stacked))
+case('transforms/fused_3')(_call(_fused))
+
+# concurrent lookups against a store of one connection with a round trip of 0.2 ms, one at a time or coalesced
+
+def _store() -> Callable:
+    import asyncio
+    connection = asyncio.Lock()
+    async def get_many(keys: list) -> list:
+        async with connection:
+            await asyncio.sleep(0.0002)
+            return keys
+    return get_many
+
+def _lookups(make_get: Callable[[Callable], Callable], n: int = 100) -> Callable:
+    """Time n concurrent gets, made by make_get from a new store in each event loop."""
+    import asyncio
+    async def main():
+        get = make_get(_store())
+        return await asyncio.gather(*[get(i) for i in range(n)])
+    return lambda: asyncio.run(main())
+
+def _get_one(get_many: Callable) -> Callable:
+    async def get(key):
+        return (await get_many([key]))[0]
+    return get
+
+case('transforms/uncoalesced/100')(lambda: _lookups(_get_one))
+@case('transforms/coalesce/100')
+def _():
+    from .transforms.governors import coalesce
+    return _lookups(coalesce(max_size=64))
+
+# call governors under contention, each timed call being 3200 calls of an empty function split across 1, 8 or 32 threads.
+# The threads are started before timing
+
+_CONTENDED_CALLS = 3200
+
+def _empty():
+    pass
+
+def _contended(threads: int, make: Callable[[], Callable]) -> Callable[[], Callable]:
+    """A setup function timing _CONTENDED_CALLS calls of what make gives, split across threads."""
+    def setup():
+        from concurrent.futures import ThreadPoolExecutor
+        f, calls = make(), _CONTENDED_CALLS // threads
+        def work(_):
+            for _ in range(calls):
+                f()
+        pool = ThreadPoolExecutor(threads)
+        list(pool.map(abs, range(threads * 4))) # start the threads
+        return lambda: list(pool.map(work, range(threads)))
+    return setup
+
+def _counting():
+    from .transforms.testing import limit_calls
+    return limit_calls(sys.maxsize)(_empty)
+
+def _settled():
+    from .transforms.testing import limit_calls
+    f = limit_calls(1)(_empty)
+    f() # the limit is reached, so the rest go straight to then
+    return f
+
+def _once():
+    from .transforms.governors import once
+    f = once()(_empty)
+    f()
+    return f
+
+def _max_concurrency():
+    from .transforms.governors import max_concurrency
+    return max_concurrency(64)(_empty)
+
+def _rate_limit():
+    from .transforms.governors import rate_limit
+    return rate_limit(1e12, burst=64, block=False)(_empty) # a rate never reached, so no call is refused
+
+for _threads in (1, 8, 32):
+    case(f'governors/bare/{_threads}t')(_contended(_threads, lambda: _empty))
+    case(f'governors/limit_calls_counting/{_threads}t')(_contended(_threads, _counting))
+    case(f'governors/limit_calls_settled/{_threads}t')(_contended(_threads, _settled))
+    case(f'governors/once_settled/{_threads}t')(_contended(_threads, _once))
+    case(f'governors/max_concurrency/{_threads}t')(_contended(_threads, _max_concurrency))
+    case(f'governors/rate_limit/{_threads}t')(_contended(_threads, _rate_limit))
+
+# tables and spatial indexes
+
+@case('table/row_attribute')
+def _():
+    from .table import TupleClassTable
+    table = TupleClassTable(_Point, [(float(i), float(i), str(i)) for i in range(1000)])
+    return lambda: table[500].x
+
+@case('table/append')
+def _():
+    from .table import TupleClassTable
+    table = TupleClassTable(_Point)
+    record = _Point(1.0, 2.0, 'a')
+    return lambda: table.append(record)
+
+# sorts, groups and joins of records, against the python way of each
+
+def _sales(n: int = 100_000) -> list[_Point]:
+    import numpy as np
+    rng = np.random.default_rng(0)
+    return [_Point(x, y, f'shop{int(x * 100)}') for x, y in rng.random((n, 2)).tolist()]
+
+@case('query/sort_python/100k')
+def _():
+    records = _sales()
+    return lambda: sorted(records, key=attrgetter('label', 'x'))
+
+@case('query/sort_lt/100k')
+def _(): # by __lt__ over every field, building tuples in each comparison
+    records = _sales()
+    return lambda: sorted(records)
+
+@case('query/sort/100k')
+def _():
+    records = _sales()
+    from .query import Query
+    return lambda: Query(records).sort('label', 'x')
+
+@case('query/sort_warm/100k')
+def _():
+    from .query import Query
+    query = Query(_sales())
+    return lambda: query.sort('label', 'x')
+
+@case('query/group_by_python/100k')
+def _():
+    records = _sales()
+    def group():
+        totals = {}
+        for record in records:
+            totals[record.label] = totals.get(record.label, 0.0) + record.x
+        return totals
+    return group
+
+@case('query/group_by/100k')
+def _(): # reading the columns from the records in every call
+    records = _sales()
+    from .query import Query
+    return lambda: Query(records).group_by('label').aggregate(total=('x', 'sum'))
+
+@case('query/group_by_warm/100k')
+def _(): # over columns already read, as for a table or a query reused
+    from .query import Query
+    query = Query(_sales())
+    return lambda: query.group_by('label').aggregate(total=('x', 'sum'))
+
+@case('query/join_python/100k')
+def _():
+    records, shops = _sales(), _sales(100)
+    def join():
+        by_label = {}
+        for shop in shops:
+            by_label.setdefault(shop.label, []).append(shop)
+        return [(record, shop) for record in records for shop in by_label.get(record.label, ())]
+    return join
+
+@case('query/join/100k')
+def _():
+    records, shops = _sales(), _sales(100)
+    from .query import Query
+    return lambda: Query(records).join(Query(shops), on='label')
+
+@case('query/join_warm/100k')
+def _():
+    from .query import Query
+    records, shops = Query(_sales()), Query(_sales(100))
+    return lambda: records.join(shops, on='label')
+
+# 100 radius and nearest neighbour queries of uniform 2-D points, by the grid index and by brute force
+# with numpy, the radius giving about 10 neighbours
+
+def _spatial_points(n: int) -> tuple[Any, Any, float]:
+    import numpy as np
+    rng = np.random.default_rng(0)
+    return rng.random((n, 2)), rng.random((100, 2)), math.sqrt(10 / (math.pi * n))
+
+for _n, _label in ((10_000, '10k'), (100_000, '100k'), (1_000_000, '1M')):
+    def _register(n: int, label: str):
+        @case(f'spatial/query_radius/{label}')
+        def _():
+            from .spatial import GridIndex
+            points, queries, r = _spatial_points(n)
+            index = GridIndex(points)
+            return lambda: index.query_radius(queries, r)
+
+        @case(f'spatial/query_radius_brute/{label}')
+        def _():
+            import numpy as np
+            points, queries, r = _spatial_points(n)
+            return lambda: [np.flatnonzero(((points - q)**2).sum(axis=1) <= r * r) for q in queries]
+
+        @case(f'spatial/query_knn/{label}')
+        def _():
+            from .spatial import GridIndex
+            points, queries, _ = _spatial_points(n)
+            index = GridIndex(points)
+            return lambda: index.query_knn(queries, k=8)
+
+        @case(f'spatial/query_knn_brute/{label}')
+        def _():
+            import numpy as np
+            points, queries, _ = _spatial_points(n)
+            def knn():
+                for q in queries:
+                    dists = ((points - q)**2).sum(axis=1)
+                    nearest = np.argpartition(dists, 8)[:8]
+                    nearest[np.argsort(dists[nearest])]
+            return knn
+    _register(_n, _label)
+
+# a step of 1M positions by their velocities, split across processes, with the vectors in shared memory
+# or pickled to and from the workers. Each has its own pool, started before timing
+
+_STEP_ROWS = 1_000_000
+
+def _vec_xy() -> type[Vec]:
+    """Give the Vec class of the steps, made as it's first needed so that importing this module doesn't import Vec."""
+    if '_VecXY' not in globals():
+        from .vector import Vec
+        class _VecXY(Vec):
+            x: float
+            y: float
+        _VecXY.__qualname__ = '_VecXY' # pickled by reference, as this module's _VecXY
+        globals()['_VecXY'] = _VecXY
+    return globals()['_VecXY']
+
+def __getattr__(name: str) -> Any:
+    if name == '_VecXY': # as unpickled in a worker
+        return _vec_xy()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _step_shared(positions: SharedVecBuffer, velocities: SharedVecBuffer, rows: slice, dt: float):
+    positions.value[rows] += velocities.value[rows] * dt
+
+def _step_pickled(positions: VecArray, velocities: VecArray, dt: float) -> VecArray:
+    return positions + velocities * dt
+
+def _parts(processes: int) -> list[slice]:
+    size = -(-_STEP_ROWS // processes)
+    return [slice(start, start + size) for start in range(0, _STEP_ROWS, size)]
+
+def _pool(processes: int) -> ProcessPoolExecutor:
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(processes)
+    list(pool.map(abs, range(processes * 4))) # start the workers
+    return pool
+
+for _processes in (1, 2, 4):
+    def _register(processes: int):
+        @case(f'shared/step_shared/1M/{processes}p')
+        def _():
+            import numpy as np
+            from .shared import SharedVecBuffer
+            rng = np.random.default_rng(0)
+            positions = SharedVecBuffer.create(_vec_xy(), rng.random((_STEP_ROWS, 2)))
+            velocities = SharedVecBuffer.create(_vec_xy(), rng.random((_STEP_ROWS, 2)))
+            for buffer in (positions, velocities):
+                atexit.register(buffer.unlink)
+            pool, parts = _pool(processes), _parts(processes)
+            return lambda: list(pool.map(_step_shared, [positions] * processes, [velocities] * processes, parts, [0.01] * processes))
+
+        @case(f'shared/step_pickled/1M/{processes}p')
+        def _():
+            import numpy as np
+            from .vector import VecArray
+            rng = np.random.default_rng(0)
+            positions = VecArray(_vec_xy(), rng.random((_STEP_ROWS, 2)))
+            velocities = VecArray(_vec_xy(), rng.random((_STEP_ROWS, 2)))
+            pool, parts = _pool(processes), _parts(processes)
+            def step():
+                stepped = pool.map(_step_pickled, [positions[rows] for rows in parts], [velocities[rows] for rows in parts], [0.01] * processes)
+                for rows, part in zip(parts, stepped):
+                    positions[rows] = part
+            return step
+    _register(_processes)
+
+# stacks, against list and deque
+
+def _push_pop(push: Callable, pop: Callable) -> Callable:
+    def f():
+        push(1.0)
+        push(2.0)
+        pop()
+        pop()
+    return f
+
+case('stack/list')(lambda: (lambda l: _push_pop(l.append, l.pop))([]))
+case('stack/deque')(lambda: (lambda d: _push_pop(d.append, d.pop))(collections.deque()))
+@case('stack/bottomless')
+def _():
+    from .stack import BottomlessStack
+    stack = BottomlessStack()
+    return _push_pop(stack.push, stack.pop)
+
+@case('stack/typed')
+def _():
+    from .stack import TypedStack
+    stack = TypedStack(float)
+    return _push_pop(stack.push, stack.pop)
+
+@case('stack/counter')
+def _():
+    from .stack import StackCounter
+    counter = StackCounter()
+    return _push_pop(lambda _: counter.push(), counter.pop)
+
+@case('stack/typed_bulk/10k')
+def _():
+    import numpy as np
+    from .stack import TypedStack
+    stack, data = TypedStack(float), np.arange(10_000.0)
+    def f():
+        stack.push_many(data)
+        stack.pop_many(10_000)
+    return f
+
+if __name__ == '__main__':
+    sys.exit(main())
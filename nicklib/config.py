@@ -0,0 +1,300 @@
+"""Config reader
+
+Reads TOML, JSON and INI config files into typed TupleClass schemas,
+through a process-wide cache so that reading config on a hot path costs
+a dict lookup and an os.stat rather than a parse. A cached file is
+re-read when its modification time or size changes, checked at most
+once per polling interval when one is given.
+
+TOML and INI files are indexed by their section headers, and only the
+sections asked for are parsed, so a large file with many sections costs
+little more than the ones in use. A TOML file with arrays or strings
+spanning lines, where a line may look like a header without being one,
+is parsed whole instead.
+
+Typical usage example:
+
+    class Database(TupleClass):
+        host: str = 'localhost'
+        port: int = 5432
+        debug: bool = False
+
+    db = read_config('service.toml', Database, section='database')
+    db.port # 5432 as an int, whether the file is TOML, JSON or INI
+
+    config = ConfigFile('service.ini', poll_interval=1.0)
+    config.section('database')  # a dict of the section alone
+"""
+from __future__ import annotations
+from typing import Any, get_type_hints
+import configparser
+import json
+import os
+import re
+import threading
+import time
+import tomllib
+import warnings
+from .tupleclass import TupleClass
+from .files import map_file
+
+_FORMATS = {'.toml': 'toml', '.json': 'json', '.ini': 'ini', '.cfg': 'ini', '.conf': 'ini'}
+
+# a section header line, [name] or for TOML [[name]] with maybe a comment after it, with the whole line as the match
+_HEADER = re.compile(rb'^[ \t]*\[\[?[ \t]*((?:"(?:[^"\\\r\n]|\\.)*"|\'[^\'\r\n]*\'|[^\]\r\n"\'])+?)[ \t]*\]\]?[ \t]*(?:[#;][^\r\n]*)?\r?$', re.M)
+
+# a single line TOML string, basic or literal
+_STRING = re.compile(rb'"(?:[^"\\\r\n]|\\.)*"|\'[^\'\r\n]*\'')
+
+def _headers_safe(text: bytes) -> bool:
+    """Whether every line of TOML text that looks like a header is one, as no array or string in it spans lines."""
+    if b'"""' in text or b"'''" in text:
+        return False
+    for line in _STRING.sub(b'""', text).splitlines():
+        line = line.split(b'#', 1)[0]
+        if line.count(b'[') != line.count(b']'):
+            return False
+    return True
+
+def _first_key(name: str) -> str:
+    """Give the first key of a TOML table name, e.g. 'a' of 'a.b' and 'a.b' of '"a.b".c'."""
+    if '"' not in name and "'" not in name:
+        return name.split('.')[0].strip()
+    return next(iter(tomllib.loads(f'[{name}]')))
+
+def _is_table(value: Any) -> bool:
+    """Whether a parsed TOML value is a section, being a table or an array of tables."""
+    return isinstance(value, dict) or (isinstance(value, list) and len(value) > 0 and all(isinstance(item, dict) for item in value))
+
+_TRUE = {'true', 'yes', 'on', '1'}
+_FALSE = {'false', 'no', 'off', '0'}
+
+def _convert(value: Any, annotation: Any) -> Any:
+    """Convert a parsed value to a field's annotation, which INI values, all strings, need."""
+    if isinstance(annotation, type) and issubclass(annotation, TupleClass):
+        return to_schema(value, annotation)
+    if annotation is bool and isinstance(value, str):
+        if value.lower() in _TRUE:
+            return True
+        if value.lower() in _FALSE:
+            return False
+        raise ValueError(f"Expected a boolean, got {value!r}")
+    if annotation in (int, float, str) and not isinstance(value, annotation):
+        return annotation(value)
+    return value
+
+def to_schema(data: dict[str, Any], schema: type[TupleClass]) -> TupleClass:
+    """Give an instance of a TupleClass schema from a parsed mapping, converting each value to its field's annotation.
+
+    Fields missing from data take their defaults, and keys without a field are
+    ignored. Keys match their field ignoring case and with '-' for '_'.
+    """
+    try:
+        hints = get_type_hints(schema)
+    except NameError as e: # e.g. a schema annotated with a class local to a function
+        warnings.warn(f"Values of {schema.__name__} are left unconverted, as its annotations can't be resolved: {e}", stacklevel=2)
+        hints = {}
+
+    keys = {key.lower().replace('-', '_'): key for key in data}
+    values = {}
+    for name in schema._TupleClass_fields:
+        key = name if name in data else keys.get(name.lower())
+        if key is not None:
+            try:
+                values[name] = _convert(data[key], hints.get(name))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Field '{name}' of {schema.__name__}: {e}") from e
+    return schema(**values)
+
+class ConfigFile:
+    """A config file, parsed section by section as sections are asked for, and re-read when it changes.
+
+    Changes are found by the file's modification time and size, checked with
+    os.stat on each access, or at most once per poll_interval seconds.
+    """
+
+    def __init__(self, path: str|os.PathLike, poll_interval: float = 0.0, format: str|None = None):
+        self.path = os.fspath(path)
+        self.poll_interval = poll_interval
+        self.format = format or _FORMATS.get(os.path.splitext(self.path)[1].lower())
+        if self.format not in ('toml', 'json', 'ini'):
+            raise ValueError(f"Can't tell the format of {self.path}, expected one of {sorted(_FORMATS)}")
+
+        self._lock = threading.RLock()
+        self._version = None # the (mtime, size) of what's cached
+        self._checked = 0.0
+        self._clear()
+
+    def _clear(self):
+        self._text = None
+        self._index = None # section name -> [(start, end)] byte ranges of its blocks, or False for a file parsed whole
+        self._sections: dict[str|None, dict] = {}
+        self._data = None
+        self._schemas: dict[tuple, TupleClass] = {}
+
+    def _refresh(self):
+        """Drop what's cached if the file has changed, checking at most once per poll interval."""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked < self.poll_interval:
+            return
+        stat = os.stat(self.path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        self._checked = now
+        if version != self._version:
+            self._clear()
+            self._version = version
+
+    def _read(self) -> bytes:
+        if self._text is None:
+            mapped = map_file(self.path)
+            self._text = mapped[:] if mapped else b''
+            if mapped:
+                mapped.close()
+        return self._text
+
+    def _section_ranges(self) -> dict[str|None, list[tuple[int, int]]]|None:
+        """Index the file's blocks by their section, a TOML table's section being the first part of its name.
+
+        Gives None for a TOML file whose header lines can't be told apart by scanning.
+        """
+        if self._index is None:
+            text = self._read()
+            if self.format == 'toml' and not _headers_safe(text):
+                self._index = False
+                return None
+            headers = list(_HEADER.finditer(text))
+            index = {None: [(0, headers[0].start() if headers else len(text))]}
+            for header, next_header in zip(headers, headers[1:] + [None]):
+                name = header.group(1).decode()
+                if self.format == 'toml':
+                    name = _first_key(name)
+                end = next_header.start() if next_header is not None else len(text)
+                index.setdefault(name, []).append((header.start(), end))
+            self._index = index
+        return self._index or None
+
+    def _parse_toml_section(self, name: str|None) -> Any:
+        """Parse a section of a TOML file, the top level being its values that aren't tables.
+
+        Tables may also be made by dotted keys and inline tables at the top level,
+        so a name without a header of its own is looked for there.
+        """
+        if (ranges := self._section_ranges()) is None:
+            data = self.data()
+        elif name is not None and name in ranges:
+            text = self._read()
+            return tomllib.loads(b''.join(text[start:end] + b'\n' for start, end in ranges[name]).decode())[name]
+        else:
+            start, end = ranges[None][0]
+            data = tomllib.loads(self._read()[start:end].decode())
+
+        if name is None:
+            return {key: value for key, value in data.items() if not _is_table(value)}
+        if not _is_table(data.get(name)):
+            raise KeyError(f"{self.path} has no section {name!r}")
+        return data[name]
+
+    def _parse_section(self, name: str|None) -> dict[str, Any]:
+        if self.format == 'toml':
+            return self._parse_toml_section(name)
+
+        text = self._read()
+        ranges = self._section_ranges()
+        if name not in ranges:
+            raise KeyError(f"{self.path} has no section {name!r}")
+        chunk = b''.join(text[start:end] + b'\n' for start, end in ranges[name]).decode()
+
+        parser = configparser.ConfigParser(interpolation=None)
+        if name is not None and 'DEFAULT' in ranges and name != 'DEFAULT': # defaults apply to every section
+            chunk = b''.join(text[start:end] + b'\n' for start, end in ranges['DEFAULT']).decode() + chunk
+        parser.read_string(chunk if name is not None else '')
+        return {} if name is None else dict(parser['DEFAULT' if name == 'DEFAULT' else name])
+
+    def section(self, name: str|None, schema: type[TupleClass]|None = None) -> Any:
+        """Give a section, None for the top level, as a dict or as an instance of schema.
+
+        Only that section of a TOML or INI file is parsed. JSON is parsed whole,
+        its sections being the top level keys.
+        """
+        with self._lock:
+            self._refresh()
+            key = (name, schema)
+            if schema is not None and key in self._schemas:
+                return self._schemas[key]
+
+            if name not in self._sections:
+                if self.format == 'json':
+                    data = self.data()
+                    self._sections[name] = data if name is None else data[name]
+                else:
+                    self._sections[name] = self._parse_section(name)
+            section = self._sections[name]
+
+            if schema is None:
+                return section
+            result = self._schemas[key] = to_schema(section, schema)
+            return result
+
+    def sections(self) -> list[str]:
+        """Give the names of the file's sections."""
+        with self._lock:
+            self._refresh()
+            if self.format == 'json':
+                return [key for key, value in self.data().items() if isinstance(value, dict)]
+            if self.format == 'toml':
+                if (ranges := self._section_ranges()) is None:
+                    return [key for key, value in self.data().items() if _is_table(value)]
+                # and the tables made at the top level, rather than by headers
+                top = tomllib.loads(self._read()[slice(*ranges[None][0])].decode())
+                return [key for key, value in top.items() if _is_table(value)] + [name for name in ranges if name is not None]
+            return [name for name in self._section_ranges() if name is not None]
+
+    def data(self) -> dict[str, Any]:
+        """Give the whole file, parsed."""
+        with self._lock:
+            self._refresh()
+            if self._data is None:
+                text = self._read().decode()
+                if self.format == 'json':
+                    self._data = json.loads(text)
+                elif self.format == 'toml':
+                    self._data = tomllib.loads(text)
+                else:
+                    parser = configparser.ConfigParser(interpolation=None)
+                    parser.read_string(text)
+                    self._data = {name: dict(parser[name]) for name in parser.sections()}
+            return self._data
+
+    def load(self, schema: type[TupleClass]) -> TupleClass:
+        """Give the whole file as an instance of schema, whose fields may be schemas of sections."""
+        with self._lock:
+            self._refresh()
+            key = (..., schema)
+            if key not in self._schemas:
+                self._schemas[key] = to_schema(self.data(), schema)
+            return self._schemas[key]
+
+_configs: dict[tuple[str, float], ConfigFile] = {}
+_configs_lock = threading.Lock()
+
+def config_file(path: str|os.PathLike, poll_interval: float = 0.0) -> ConfigFile:
+    """Give the process-wide cached ConfigFile of a path."""
+    key = (os.path.abspath(path), poll_interval)
+    if (config := _configs.get(key)) is None:
+        with _configs_lock:
+            config = _configs.setdefault(key, ConfigFile(key[0], poll_interval))
+    return config
+
+def read_config(path: str|os.PathLike, schema: type[TupleClass]|None = None, section: str|None = None, poll_interval: float = 0.0) -> Any:
+    """Read a config file, or one section of it, as a dict or as an instance of schema, through the process-wide cache.
+
+    Repeated reads give the same object until the file changes.
+    """
+    config = config_file(path, poll_interval)
+    if section is None and schema is not None:
+        return config.load(schema)
+    return config.section(section, schema) if section is not None else config.data()
+
+def clear_config_cache():
+    with _configs_lock:
+        _configs.clear()
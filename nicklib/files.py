@@ -0,0 +1,79 @@
+"""File manager
+
+Reading many files at once through a pool of threads, and reading large
+files through read-only memory maps rather than copies, for the
+services and config readers which read files on hot paths.
+
+Typical usage example:
+
+    with FileManager(workers=16) as files:
+        contents = files.read_many(paths)   # bytes per path, in order
+        big = files.read('huge.bin')        # an mmap, being over the threshold
+        header = big[:64]
+"""
+from __future__ import annotations
+from typing import Literal
+from collections.abc import Iterable
+import mmap
+import os
+import threading
+from .transforms.parallel import parallel_map
+
+_MMAP_THRESHOLD = 1 << 20 # files from 1MiB are mapped rather than read
+
+def map_file(path: str|os.PathLike) -> mmap.mmap|bytes:
+    """Give a read-only memory map of a file, or b'' for an empty file, which can't be mapped."""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b''
+        # the map stays valid once the file is closed
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+class FileManager:
+    """Reads files singly or in bulk, mapping those at least mmap_threshold bytes long into memory.
+
+    Bulk reads run on a pool of workers threads, so their I/O overlaps. The
+    maps the manager gives are closed along with it.
+    """
+
+    def __init__(self, workers: int = 8, mmap_threshold: int|None = _MMAP_THRESHOLD):
+        self.workers = workers
+        self.mmap_threshold = mmap_threshold
+        self._maps: list[mmap.mmap] = []
+        self._lock = threading.Lock()
+
+    def read(self, path: str|os.PathLike) -> bytes|mmap.mmap:
+        """Give the contents of a file as bytes, or as a read-only mmap when at least mmap_threshold bytes long."""
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if self.mmap_threshold is None or size < self.mmap_threshold or size == 0:
+                return file.read()
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        with self._lock:
+            self._maps.append(mapped)
+        return mapped
+
+    def read_text(self, path: str|os.PathLike, encoding: str = 'utf-8') -> str:
+        with open(path, encoding=encoding) as file:
+            return file.read()
+
+    def read_many(self, paths: Iterable[str|os.PathLike], errors: Literal['raise', 'capture'] = 'raise') -> list[bytes|mmap.mmap|Exception]:
+        """Give the contents of many files, read in parallel, in the order of their paths.
+
+        With errors='capture', a file which can't be read gives its exception in
+        place of its contents rather than failing the rest.
+        """
+        return list(parallel_map(workers=self.workers, chunk_size=1, errors=errors)(self.read)(iter(paths)))
+
+    def close(self):
+        """Close every map given by the manager."""
+        with self._lock:
+            maps, self._maps = self._maps, []
+        for mapped in maps:
+            mapped.close()
+
+    def __enter__(self) -> FileManager:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
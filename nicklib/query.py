@@ -0,0 +1,378 @@
+"""Queries over collections of TupleClass records
+
+Sorting, grouping and joining of a list of TupleClass records, or a
+TupleClassTable, by named fields. Each field used is read once into a
+column, numeric fields as typed numpy arrays, so a sort is one numpy
+lexsort over the columns rather than a comparison of records building
+tuples, and groups and joins match keys by factorising the columns into
+integer codes. Results are views of the records by index, which are only
+read when iterated.
+
+Typical usage example:
+
+    class Sale(TupleClass):
+        shop: str
+        day: int
+        amount: float
+
+    sales = Query(records)                    # a list of Sales or a TupleClassTable
+    sales.sort('day', 'amount', descending=(False, True))[0]   # the largest sale of the first day
+    sales.where(sales.column('amount') > 10.0).to_list()
+
+    by_shop = sales.group_by('shop')
+    by_shop['a']                              # a Query of shop a's sales
+    by_shop.aggregate(total=('amount', 'sum'), sales='count')
+    # {'shop': ['a', 'b'], 'total': array([...]), 'sales': array([...])}
+
+    for sale, shop in sales.join(Query(shops), on='shop', right_on='name'):
+        ...
+"""
+
+from __future__ import annotations
+from typing import Any, Callable
+from collections.abc import Iterator, Sequence
+from operator import attrgetter
+import numpy as np
+from .tupleclass import TupleClass
+from .table import TupleClassTable, _column_dtype, _field_annotations
+
+# reductions of a column sorted by group, applied at the start of each group
+_REDUCERS = {'sum': np.add, 'min': np.minimum, 'max': np.maximum, 'prod': np.multiply}
+
+class _Source:
+    """The records queried, with the column of each field read from them at most once."""
+    __slots__ = ('records', 'record_cls', '_dtypes', '_columns', '_codes', '_ranks')
+
+    def __init__(self, records: Sequence[TupleClass]|TupleClassTable, record_cls: type[TupleClass]|None):
+        if isinstance(records, TupleClassTable):
+            record_cls = records.record_cls
+        elif record_cls is None:
+            record_cls = type(records[0]) if len(records) else TupleClass
+        self.records = records
+        self.record_cls = record_cls
+        self._dtypes = {name: _column_dtype(annotation) for name, annotation in _field_annotations(record_cls).items()}
+        self._columns: dict[str, np.ndarray] = {}
+        self._codes: dict[str, tuple[np.ndarray, int]] = {}
+        self._ranks: dict[str, np.ndarray] = {}
+
+    def column(self, name: str) -> np.ndarray:
+        """Give the column of a field over every record, typed for numeric fields and of objects otherwise."""
+        if (column := self._columns.get(name)) is not None:
+            return column
+        if name not in self._dtypes:
+            raise KeyError(f"{self.record_cls.__name__} has no field '{name}'")
+
+        records, n = self.records, len(self.records)
+        if isinstance(records, TupleClassTable):
+            values = records.column(name)
+            if isinstance(values, list):
+                column = np.empty(n, dtype=object)
+                column[:] = values
+            else:
+                column = np.asarray(values)
+        elif (dtype := self._dtypes[name]) is not None:
+            column = np.fromiter(map(attrgetter(name), records), dtype=dtype, count=n)
+        else:
+            column = np.empty(n, dtype=object)
+            column[:] = list(map(attrgetter(name), records))
+        self._columns[name] = column
+        return column
+
+    def codes(self, name: str) -> tuple[np.ndarray, int]:
+        """Give the codes of a field's values over every record, and the number of distinct values, see _factorize."""
+        if (codes := self._codes.get(name)) is None:
+            codes = self._codes[name] = _factorize(self.column(name))
+        return codes
+
+    def ranks(self, name: str) -> np.ndarray:
+        """Give the rank of each record's value of an object field among the distinct values, comparing only those in python."""
+        if (ranks := self._ranks.get(name)) is None:
+            codes, count = self.codes(name)
+            uniques = list(dict.fromkeys(self.column(name).tolist())) # in the order of their codes
+            ranks = np.empty(count, dtype=np.intp)
+            ranks[sorted(range(count), key=uniques.__getitem__)] = np.arange(count)
+            ranks = self._ranks[name] = ranks[codes]
+        return ranks
+
+def _factorize(column: np.ndarray) -> tuple[np.ndarray, int]:
+    """Give an integer code per value of a column, equal for equal values, and the number of distinct values.
+
+    Numeric codes rank the values. Object columns are coded by hashing their
+    values, in order of first appearance, so need only be hashable.
+    """
+    if column.dtype != object:
+        uniques, codes = np.unique(column, return_inverse=True)
+        return codes.reshape(-1), len(uniques)
+    table = {}
+    codes = np.array([table.setdefault(value, len(table)) for value in column.tolist()], dtype=np.intp)
+    return codes, len(table)
+
+def _combine(codes: Sequence[np.ndarray], counts: Sequence[int]) -> np.ndarray:
+    """Give one code per row for the combination of several columns of codes, compacted as each is added."""
+    combined = codes[0]
+    for column, count in zip(codes[1:], counts[1:]):
+        combined, _ = _factorize(combined * count + column)
+    return combined
+
+def _sort_key(column: np.ndarray, descending: bool) -> np.ndarray:
+    """Give a key for lexsort ordering a numeric column, or the ranks of an object column, descending if need be."""
+    if not descending:
+        return column
+    if column.dtype.kind == 'f':
+        return -column
+    return -_factorize(column)[0] # ranks can be negated whatever the dtype
+
+class Query:
+    """A view of a sequence of TupleClass records, or rows of a TupleClassTable, by index.
+
+    Sorting, filtering, grouping and joining give new views of the same
+    records, which are only read when iterated or indexed by int.
+    """
+    __slots__ = ('_source', '_index')
+
+    def __init__(self, records: Sequence[TupleClass]|TupleClassTable, record_cls: type[TupleClass]|None = None):
+        self._source = _Source(records, record_cls)
+        self._index = np.arange(len(records))
+
+    @classmethod
+    def _view(cls, source: _Source, index: np.ndarray) -> Query:
+        query = object.__new__(cls)
+        query._source = source
+        query._index = index
+        return query
+
+    @property
+    def record_cls(self) -> type[TupleClass]:
+        return self._source.record_cls
+
+    @property
+    def indices(self) -> np.ndarray:
+        """The index of each record of the view into the records queried."""
+        return self._index
+
+    def column(self, name: str) -> np.ndarray:
+        """Give the values of a field over the view, in its order."""
+        return self._source.column(name)[self._index]
+
+    def _codes(self, name: str) -> tuple[np.ndarray, int]:
+        """Give the codes of a field's values over the view, and a bound on them.
+
+        The codes of object columns are hashed once for all the views of the
+        records, so only those of values in the view are used.
+        """
+        if self._source.column(name).dtype == object:
+            codes, count = self._source.codes(name)
+            return codes[self._index], count
+        return _factorize(self.column(name))
+
+    def sort(self, *fields: str, descending: bool|Sequence[bool] = False) -> Query:
+        """Give a view sorted by fields, the first being the primary key, and stable for equal keys.
+
+        descending is one for every field or a sequence with one per field.
+        """
+        if not fields:
+            raise TypeError("sort() needs at least one field")
+        if isinstance(descending, bool):
+            descending = [descending] * len(fields)
+        elif len(descending) != len(fields):
+            raise ValueError(f"Expected {len(fields)} values of descending, got {len(descending)}")
+
+        keys = []
+        for name, desc in zip(fields, descending):
+            if self._source.column(name).dtype == object: # which numpy would compare as python objects
+                keys.append(_sort_key(self._source.ranks(name)[self._index], desc))
+            else:
+                keys.append(_sort_key(self.column(name), desc))
+        order = np.lexsort(keys[::-1]) # lexsort's primary key is its last
+        return Query._view(self._source, self._index[order])
+
+    def where(self, mask: np.ndarray|Sequence[bool]) -> Query:
+        """Give a view of the records where a boolean mask over the view is True."""
+        mask = np.asarray(mask, dtype=bool)
+        if len(mask) != len(self._index):
+            raise IndexError(f"Boolean mask of length {len(mask)} doesn't match query of length {len(self._index)}")
+        return Query._view(self._source, self._index[mask])
+
+    def group_by(self, *fields: str) -> Groups:
+        """Group the records by the values of fields, see Groups."""
+        if not fields:
+            raise TypeError("group_by() needs at least one field")
+        return Groups(self, fields)
+
+    def join(self, other: Query, on: str|Sequence[str], right_on: str|Sequence[str]|None = None) -> Join:
+        """Give the inner join with another query, of every pair of records with equal values of the fields.
+
+        The fields are on for both, or on for this query and right_on for other.
+        """
+        on = (on,) if isinstance(on, str) else tuple(on)
+        right_on = on if right_on is None else (right_on,) if isinstance(right_on, str) else tuple(right_on)
+        if len(on) != len(right_on):
+            raise ValueError(f"Expected as many fields to join on each side, got {on} and {right_on}")
+
+        n_left = len(self)
+        codes, counts = [], []
+        for left_name, right_name in zip(on, right_on):
+            left, right = self.column(left_name), other.column(right_name)
+            if left.dtype == object or right.dtype == object:
+                column = np.empty(len(left) + len(right), dtype=object)
+                column[:n_left], column[n_left:] = left, right
+            else:
+                column = np.concatenate((left, right))
+            code, count = _factorize(column)
+            codes.append(code)
+            counts.append(count)
+        combined = _combine(codes, counts)
+        left_codes, right_codes = combined[:n_left], combined[n_left:]
+
+        # the right rows sorted by key, so each left row's matches are one run of them
+        n_keys = int(combined.max()) + 1 if len(combined) else 0
+        right_order = np.argsort(right_codes, kind='stable')
+        right_counts = np.bincount(right_codes, minlength=n_keys)
+        right_starts = np.cumsum(right_counts) - right_counts
+
+        matches = right_counts[left_codes]
+        left_rows = np.repeat(np.arange(n_left), matches)
+        offsets = np.arange(len(left_rows)) - np.repeat(np.cumsum(matches) - matches, matches)
+        right_rows = right_order[np.repeat(right_starts[left_codes], matches) + offsets]
+        return Join(Query._view(self._source, self._index[left_rows]), Query._view(other._source, other._index[right_rows]))
+
+    def to_list(self) -> list:
+        """Give the records of the view in a list."""
+        return list(self)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator:
+        return map(self._source.records.__getitem__, self._index.tolist())
+
+    def __getitem__(self, key: int|slice|np.ndarray) -> Any:
+        if isinstance(key, (int, np.integer)):
+            return self._source.records[int(self._index[key])]
+        return Query._view(self._source, self._index[key])
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}[{self.record_cls.__name__}]({len(self)} records)"
+
+class Groups:
+    """The records of a query grouped by equal values of some fields, in order of each group's first record.
+
+    Indexing with a key gives the Query of that group, where the key is the
+    value of the field, or a tuple of the values of several fields.
+    """
+
+    def __init__(self, query: Query, fields: tuple[str, ...]):
+        self._query = query
+        self._fields = fields
+
+        codes, counts = zip(*(query._codes(name) for name in fields))
+        codes = _combine(codes, counts)
+        n_codes = int(codes.max()) + 1 if len(codes) else 0
+
+        # renumber the groups by their first record, found by writing the rows in reverse so the first is written last.
+        # Codes of no record in the view are skipped
+        first = np.full(n_codes, len(codes), dtype=np.intp)
+        first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+        order = np.flatnonzero(first < len(codes))
+        order = order[np.argsort(first[order])]
+        n_groups = len(order)
+        renumber = np.empty(n_codes, dtype=np.intp)
+        renumber[order] = np.arange(n_groups)
+        self.codes = renumber[codes]
+        self._first = first[order]
+
+        # the rows sorted by group, so each group is one run of them
+        self._order = np.argsort(self.codes, kind='stable')
+        self._counts = np.bincount(self.codes, minlength=n_groups)
+        self._starts = np.cumsum(self._counts) - self._counts
+        self._lookup = None
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return self._fields
+
+    @property
+    def keys(self) -> list:
+        """The key of each group, in the order of the groups."""
+        columns = [self._key_column(name) for name in self._fields]
+        return columns[0] if len(columns) == 1 else list(zip(*columns))
+
+    def _key_column(self, name: str) -> list:
+        return self._query.column(name)[self._first].tolist()
+
+    def sizes(self) -> np.ndarray:
+        """Give the number of records in each group."""
+        return self._counts
+
+    def group(self, number: int) -> Query:
+        """Give the Query of the records of a group, by its number."""
+        start = self._starts[number]
+        rows = self._order[start:start + self._counts[number]]
+        return Query._view(self._query._source, self._query._index[rows])
+
+    def aggregate(self, **aggregations: str|tuple[str, str|Callable]) -> dict[str, Any]:
+        """Give columns of the group keys then of each aggregation, by name, with a value per group.
+
+        An aggregation is 'count', or a (field, function) pair where function
+        is one of 'sum', 'min', 'max', 'prod', 'mean', 'first' and 'last', or a
+        callable given the group's column of the field as a numpy array. The
+        result suits TupleClassTable.from_columns for a record class of the
+        same fields.
+        """
+        result = {name: self._key_column(name) for name in self._fields}
+
+        for name, aggregation in aggregations.items():
+            if aggregation == 'count':
+                result[name] = self._counts.copy()
+                continue
+            field, func = aggregation
+            values = self._query.column(field)[self._order] # sorted by group
+            if len(self) == 0:
+                result[name] = values[:0]
+            elif func in _REDUCERS:
+                result[name] = _REDUCERS[func].reduceat(values, self._starts)
+            elif func == 'mean':
+                result[name] = np.add.reduceat(values, self._starts) / self._counts
+            elif func == 'first':
+                result[name] = values[self._starts]
+            elif func == 'last':
+                result[name] = values[self._starts + self._counts - 1]
+            elif callable(func):
+                result[name] = [func(group) for group in np.split(values, self._starts[1:])]
+            else:
+                raise ValueError(f"Unknown aggregation {func!r} of '{field}'")
+        return result
+
+    def __getitem__(self, key: Any) -> Query:
+        if self._lookup is None:
+            self._lookup = {key: number for number, key in enumerate(self.keys)}
+        return self.group(self._lookup[key])
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __iter__(self) -> Iterator[tuple[Any, Query]]:
+        return ((key, self.group(number)) for number, key in enumerate(self.keys))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({', '.join(self._fields)}: {len(self)} groups)"
+
+class Join:
+    """The inner join of two queries, as the two aligned views of the left and right record of each pair."""
+    __slots__ = ('left', 'right')
+
+    def __init__(self, left: Query, right: Query):
+        self.left = left
+        self.right = right
+
+    def __len__(self) -> int:
+        return len(self.left)
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        return zip(self.left, self.right)
+
+    def __getitem__(self, key: int) -> tuple[Any, Any]:
+        return self.left[key], self.right[key]
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}[{self.left.record_cls.__name__}, {self.right.record_cls.__name__}]({len(self)} pairs)"
@@ -0,0 +1,188 @@
+"""Binary record files
+
+Fixed binary layouts derived from the annotations of a TupleClass (or a
+typed Vec), and files of such records which are read back through a
+memory map rather than deserialised.
+
+A record file starts with a small header: a magic number, the length of
+a JSON schema, then the schema itself giving the record class's fields
+and the numpy dtype of each record. The records follow, packed one after
+another, so a file can be appended to without rewriting it.
+
+Typical usage example:
+
+    class Point(TupleClass):
+        x: float
+        y: float
+        label: str
+
+    write_records('points.rec', Point, points, sizes={'label': 16})
+
+    table = read_records('points.rec', Point) # a TupleClassTable over the file
+    table[0].x                                 # read straight from the memory map
+"""
+
+from __future__ import annotations
+from typing import Any, Literal
+from collections.abc import Iterable
+import itertools
+import json
+import os
+import struct
+import numpy as np
+from .tupleclass import TupleClass
+from .table import TupleClassTable, _column_dtype, _field_annotations
+from .vector import _ArrayClass, Vec, VecArray
+
+MAGIC = b'NICKREC1'
+_HEADER_PREFIX = struct.Struct('<8sI') # magic, schema length
+_HEADER_ALIGNMENT = 64 # records start on an aligned offset
+
+_SIZED_DTYPES = {str: 'U', 'str': 'U', bytes: 'S', 'bytes': 'S'}
+
+def record_dtype(record_cls: type[TupleClass], sizes: dict[str, int]|None = None) -> np.dtype:
+    """Give the structured numpy dtype laying out one record of a TupleClass, with a field per annotated field.
+
+    Numeric and numpy scalar annotations map to their numpy type. str and bytes
+    fields are fixed width, so need their maximum length given in sizes.
+    """
+    sizes = sizes or {}
+    layout = []
+    for name, annotation in _field_annotations(record_cls).items():
+        if (dtype := _column_dtype(annotation)) is not None:
+            layout.append((name, dtype))
+        elif annotation in _SIZED_DTYPES:
+            if name not in sizes:
+                raise TypeError(f"Field '{name}' of {record_cls.__name__} is a {annotation}, so needs a size")
+            layout.append((name, f'{_SIZED_DTYPES[annotation]}{sizes[name]}'))
+        else:
+            raise TypeError(f"Field '{name}' of {record_cls.__name__} has no fixed binary layout, got {annotation!r}")
+
+    if len(layout) == 0:
+        raise TypeError(f"{record_cls.__name__} has no fields to lay out")
+    return np.dtype(layout)
+
+def _schema(record_cls: type[TupleClass], dtype: np.dtype) -> dict[str, Any]:
+    return {
+        'record': f'{record_cls.__module__}.{record_cls.__qualname__}',
+        'fields': list(record_cls._TupleClass_fields),
+        'dtype': dtype.descr,
+    }
+
+def _write_header(file, schema: dict[str, Any]):
+    encoded = json.dumps(schema).encode()
+    # pad the schema so that records start on an aligned offset
+    padding = -(_HEADER_PREFIX.size + len(encoded)) % _HEADER_ALIGNMENT
+    encoded += b' ' * padding
+    file.write(_HEADER_PREFIX.pack(MAGIC, len(encoded)))
+    file.write(encoded)
+
+def read_schema(path: str|os.PathLike) -> tuple[dict[str, Any], int]:
+    """Give the schema of a record file along with the offset its records start at."""
+    with open(path, 'rb') as file:
+        prefix = file.read(_HEADER_PREFIX.size)
+        if len(prefix) < _HEADER_PREFIX.size:
+            raise ValueError(f"{path} is too short to be a record file")
+        magic, length = _HEADER_PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a record file")
+        schema = json.loads(file.read(length))
+
+    schema['dtype'] = np.dtype([tuple(field) for field in schema['dtype']])
+    return schema, _HEADER_PREFIX.size + length
+
+def _validate(path: str|os.PathLike, schema: dict[str, Any], record_cls: type[TupleClass], sizes: dict[str, int]|None):
+    """Raise a ValueError if a record file's schema doesn't match a record class."""
+    if issubclass(record_cls, _ArrayClass):
+        expected = _vec_dtype(record_cls)
+        if expected != schema['dtype']:
+            raise ValueError(f"{path} holds records of dtype {schema['dtype']}, but {record_cls.__name__} is laid out as {expected}")
+        return
+
+    if schema['fields'] != list(record_cls._TupleClass_fields):
+        raise ValueError(f"{path} holds records with fields {schema['fields']}, but {record_cls.__name__} has {list(record_cls._TupleClass_fields)}")
+
+    # sized fields take their size from the file unless given
+    sizes = {name: schema['dtype'][name].itemsize // (4 if schema['dtype'][name].kind == 'U' else 1) for name in schema['fields']} | (sizes or {})
+    expected = record_dtype(record_cls, sizes)
+    if expected != schema['dtype']:
+        raise ValueError(f"{path} holds records of dtype {schema['dtype']}, but {record_cls.__name__} is laid out as {expected}")
+
+def _vec_dtype(vec_cls: type[_ArrayClass]) -> np.dtype:
+    """The record dtype of a typed Vec, whose fields all share the type of the first."""
+    fields = vec_cls._TupleClass_fields
+    if len(fields) == 0:
+        raise TypeError(f"{vec_cls.__name__} has no fields, so no fixed binary layout")
+    base = np.dtype(next(iter(vec_cls.__annotations__.values())))
+    return np.dtype([(name, base) for name in fields])
+
+def _to_structured(records: Any, dtype: np.dtype) -> np.ndarray:
+    """Convert a chunk of records, or a whole table or VecArray, to a structured array."""
+    if isinstance(records, TupleClassTable):
+        array = np.empty(len(records), dtype=dtype)
+        for name in dtype.names:
+            array[name] = records[name]
+        return array
+    if isinstance(records, VecArray):
+        return np.ascontiguousarray(records._items, dtype=dtype[0]).view(dtype).reshape(-1)
+    if len(records) > 0 and isinstance(records[0], _ArrayClass):
+        return np.stack([v._items for v in records]).astype(dtype[0], copy=False).view(dtype).reshape(-1)
+    return np.array([tuple(record) for record in records], dtype=dtype)
+
+def write_records(path: str|os.PathLike, record_cls: type[TupleClass], records: Iterable,
+                  sizes: dict[str, int]|None = None, append: bool = False, chunk_size: int = 65536) -> int:
+    """Write records of a TupleClass or typed Vec to a record file, giving the number written.
+
+    records may be any iterable of records (or tuples of their values), which is
+    written chunk by chunk, or a whole TupleClassTable or VecArray. With append,
+    the records are added to the end of an existing file of the same schema.
+    """
+    dtype = _vec_dtype(record_cls) if issubclass(record_cls, _ArrayClass) else record_dtype(record_cls, sizes)
+
+    if append and os.path.exists(path):
+        schema, _ = read_schema(path)
+        _validate(path, schema, record_cls, sizes)
+        mode = 'ab'
+    else:
+        mode = 'wb'
+
+    count = 0
+    with open(path, mode) as file:
+        if mode == 'wb':
+            _write_header(file, _schema(record_cls, dtype))
+
+        if isinstance(records, (TupleClassTable, VecArray)):
+            chunks = [records]
+        else:
+            iterator = iter(records)
+            chunks = iter(lambda: list(itertools.islice(iterator, chunk_size)), [])
+
+        for chunk in chunks:
+            array = _to_structured(chunk, dtype)
+            array.tofile(file)
+            count += len(array)
+
+    return count
+
+def read_records(path: str|os.PathLike, record_cls: type[TupleClass], mode: Literal['r', 'r+', 'c'] = 'r') -> TupleClassTable|VecArray:
+    """Give the records of a record file through a memory map, without deserialising them.
+
+    For a TupleClass, gives a TupleClassTable whose columns are views of the
+    file and whose rows look like the record class. For a typed Vec, gives a
+    VecArray over the file whose rows are Vecs. The mode is that of numpy.memmap:
+    read only, read and write through to the file, or copy on write.
+    """
+    schema, offset = read_schema(path)
+    _validate(path, schema, record_cls, None)
+    dtype = schema['dtype']
+
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count > 0:
+        array = np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=(count,))
+    else: # an empty file can't be mapped
+        array = np.empty(0, dtype=dtype)
+
+    if issubclass(record_cls, _ArrayClass): # every field has the same type, so it's viewable as an (N, dim) array
+        items = array.view(dtype[0]).reshape(count, len(dtype.names))
+        return VecArray(record_cls, items)
+    return TupleClassTable.from_columns(record_cls, {name: array[name] for name in dtype.names})
@@ -0,0 +1,238 @@
+"""Shared memory Vec buffers
+
+Storage for a Vec, or a batch of them, in a multiprocessing.shared_memory
+segment, so that processes working on the same vectors share one copy
+of them. A buffer is pickled as a small handle naming its segment, and
+is attached to by that name when unpickled, so it can be passed to the
+workers of a process pool with each task, or once when each worker
+starts, without its vectors being copied.
+
+The process creating a buffer owns its segment, and unlinks it once
+every process is done with it. A buffer may have locks, each over a
+stripe of its rows, for writers to take over the rows they write.
+Locks can only be given to a process as it starts, e.g. through the
+initargs of a pool, or inherited by forking, after which any handle of
+the buffer unpickled in that process shares them.
+
+Only the creating process registers the segment with multiprocessing's
+resource tracker, which unlinks it should the creator die without doing
+so. Processes attaching to it don't, as a process with a tracker of its
+own, rather than one shared with the creator, would otherwise unlink the
+segment when it exits. Before Python 3.13 there is no way to attach
+without registering, so such a process, one not started through
+multiprocessing, unregisters it again.
+
+Typical usage example:
+
+    with SharedVecBuffer.create(VecXY, 10_000_000, locks=16) as positions:
+        with ProcessPoolExecutor(initializer=init, initargs=(positions,)) as pool:
+            list(pool.map(step, itertools.repeat(positions, 8), range(8)))
+        positions.value.x # updated by the workers
+
+    def step(positions: SharedVecBuffer, part: int):
+        rows = slice(part * 1_250_000, (part + 1) * 1_250_000)
+        positions.value[rows] += 1.0 # the worker's own rows, so needs no lock
+        with positions.locked(rows):
+            ...
+"""
+
+from __future__ import annotations
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+import gc
+import multiprocessing
+import multiprocessing.context
+import os
+import sys
+import weakref
+import numpy as np
+from .tupleclass import TupleClass
+from .vector import Vec, VecArray
+
+# the segments this process created, and registered with its tracker
+_created: set[str] = set()
+
+def _open_untracked(name: str, child: bool) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without leaving it registered with this process's resource tracker.
+
+    child is whether this process was started through multiprocessing, and so
+    shares its parent's tracker, where the creator already registered the segment.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # in a shared tracker, unregistering would drop the creator's registration rather than this one
+    if os.name == 'posix' and not child and name not in _created:
+        resource_tracker.unregister(f'/{shm.name}', 'shared_memory')
+    return shm
+
+class SharedVecHandle(TupleClass, frozen=True):
+    """What a SharedVecBuffer is pickled as: the name of its segment and the layout of the vectors in it."""
+    name: str
+    shape: tuple
+    dtype: str
+    vec_cls: type
+    locks: int = 0
+
+# the buffers attached to in this process by segment name, so each segment is mapped once per process
+_attached: dict[str, SharedVecBuffer] = {}
+
+class SharedVecBuffer:
+    """A Vec, or a VecArray of vectors, stored in a shared memory segment.
+
+    Make one with create, which allocates and owns the segment, or attach
+    to an existing one with attach. value gives a Vec or VecArray view of
+    the segment, which every process attached to it sees the writes of.
+    """
+    __slots__ = ('_shm', '_handle', '_items', '_value', '_locks', '_owner')
+
+    def __init__(self, shm: shared_memory.SharedMemory, handle: SharedVecHandle, locks: Sequence|None, owner: int|None):
+        self._shm = shm
+        self._handle = handle
+        self._locks = tuple(locks) if locks is not None else None
+        self._owner = owner # the pid of the process which created the segment, not of those it's forked into
+        # every view of the segment handed out derives from this one array, and so keeps it alive while in use
+        self._items = np.ndarray(handle.shape, dtype=handle.dtype, buffer=shm.buf)
+        self._value = self._make_value()
+
+    def _make_value(self) -> Vec|VecArray:
+        if len(self._handle.shape) == 1:
+            return self._handle.vec_cls._from_items(self._items)
+        return VecArray(self._handle.vec_cls, self._items)
+
+    @classmethod
+    def create(cls, vec_cls: type[Vec], items: int|Sequence|np.ndarray|Vec|VecArray, locks: int = 0, name: str|None = None,
+               context: multiprocessing.context.BaseContext|None = None) -> SharedVecBuffer:
+        """Allocate a segment for vectors of vec_cls, initialised with items, and give the buffer owning it.
+
+        items is the number of vectors of a batch, zeroed, the vectors of a batch,
+        or a Vec to share alone. locks is the number of locks over stripes of
+        the rows, at most one per row, made by the multiprocessing context the
+        workers are started by, the default one if not given.
+        """
+        if isinstance(items, Vec):
+            values = items._items
+        else:
+            values = (items if isinstance(items, VecArray) else VecArray(vec_cls, items))._items
+        if locks < 0 or locks > max(len(values) if values.ndim > 1 else 1, 1):
+            raise ValueError(f"Expected from 0 to one lock per row, got {locks}")
+
+        # a new segment is zero filled, so only given values need writing
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(values.nbytes, 1))
+        handle = SharedVecHandle(shm.name, values.shape, values.dtype.str, vec_cls, locks)
+        if not isinstance(items, int):
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[...] = values
+
+        buffer = cls(shm, handle, [(context or multiprocessing).Lock() for _ in range(locks)], owner=os.getpid())
+        _attached[shm.name] = buffer
+        _created.add(shm.name)
+        return buffer
+
+    @classmethod
+    def attach(cls, handle: SharedVecHandle, locks: Sequence|None = None) -> SharedVecBuffer:
+        """Give the buffer of a segment by its handle, attaching to the segment if this process hasn't already."""
+        return cls._attach(handle, locks, spawned=False)
+
+    @classmethod
+    def _attach(cls, handle: SharedVecHandle, locks: Sequence|None, spawned: bool) -> SharedVecBuffer:
+        if (buffer := _attached.get(handle.name)) is not None:
+            if buffer._locks is None and locks is not None:
+                buffer._locks = tuple(locks)
+            return buffer
+        # a process being started unpickles what it was started with before it knows its parent
+        child = spawned or multiprocessing.parent_process() is not None
+        buffer = _attached[handle.name] = cls(_open_untracked(handle.name, child), handle, locks, owner=None)
+        return buffer
+
+    @property
+    def handle(self) -> SharedVecHandle:
+        return self._handle
+
+    @property
+    def name(self) -> str:
+        return self._handle.name
+
+    @property
+    def value(self) -> Vec|VecArray:
+        """The Vec, or VecArray, viewing the segment."""
+        if self._value is None:
+            raise ValueError(f"{self!r} is closed")
+        return self._value
+
+    def _stripes(self, rows: int|slice|None) -> range:
+        """Give the indices of the locks over the stripes of some rows."""
+        n_rows = self._handle.shape[0] if len(self._handle.shape) > 1 else 1
+        stripe = -(-n_rows // len(self._locks))
+        if rows is None:
+            return range(len(self._locks))
+        if isinstance(rows, slice):
+            start, stop, _ = rows.indices(n_rows)
+            return range(start // stripe, (stop - 1) // stripe + 1) if stop > start else range(0)
+        rows = rows + n_rows if rows < 0 else rows
+        return range(rows // stripe, rows // stripe + 1)
+
+    @contextmanager
+    def locked(self, rows: int|slice|None = None) -> Iterator[None]:
+        """Hold the locks over some rows, or every row, while in the context.
+
+        Locks are taken in order, so writers holding overlapping rows can't deadlock.
+        """
+        if self._handle.locks == 0:
+            raise RuntimeError(f"{self!r} was created without locks")
+        if self._locks is None:
+            raise RuntimeError(f"{self!r} was attached without its locks, which are only passed to a process as it starts")
+
+        taken = []
+        try:
+            for i in self._stripes(rows):
+                self._locks[i].acquire()
+                taken.append(self._locks[i])
+            yield
+        finally:
+            for lock in reversed(taken):
+                lock.release()
+
+    def close(self):
+        """Unmap the segment from this process.
+
+        Raises BufferError, leaving the buffer open, while any view of value is
+        still in use, as it would read unmapped memory once the segment is closed.
+        """
+        if self._value is None:
+            return
+        items = weakref.ref(self._items)
+        self._items = self._value = None
+        if items() is not None: # a view held only by a reference cycle is dropped by collecting it
+            gc.collect()
+        self._items = items()
+        if self._items is not None:
+            self._value = self._make_value()
+            raise BufferError(f"{self!r} still has views of its vectors in use, so can't be closed")
+        self._shm.close()
+        if _attached.get(self.name) is self:
+            del _attached[self.name]
+
+    def unlink(self):
+        """Free the segment once every process has closed it, which is up to the process that created it."""
+        self._shm.unlink()
+        _created.discard(self.name)
+
+    def __enter__(self) -> SharedVecBuffer:
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.close()
+        finally: # the segment is freed once the views left are dropped
+            if self._owner == os.getpid():
+                self.unlink()
+
+    def __reduce__(self):
+        # locks can only be pickled for a process being started
+        spawning = multiprocessing.context.get_spawning_popen() is not None
+        return (SharedVecBuffer._attach, (self._handle, self._locks if spawning else None, spawning))
+
+    def __repr__(self):
+        state = '' if self._value is not None else ', closed'
+        return f"{self.__class__.__name__}[{self._handle.vec_cls.__name__}]({self.name!r}, {self._handle.shape}{state})"
@@ -0,0 +1,274 @@
+"""Spatial indexing of Vec collections
+
+A uniform grid index over points, for radius, nearest-neighbour and
+pairwise-within-distance queries without comparing every pair of points.
+
+Points are bucketed into cubic cells which are kept sorted by cell, so a
+query only measures the points of the cells that its search radius
+overlaps. Every query is answered for a whole batch of query points at
+once with numpy, rather than one Python call per pair.
+
+Typical usage example:
+
+    index = GridIndex(positions)           # a VecArray, Vecs, or an (N, dim) array
+    index.query_radius(Vec(0.0, 0.0), 5.0) # the ids of the points within 5
+    ids, dists = index.query_knn(targets, k=3)
+    index.pairs(1.0)                       # every pair of points closer than 1
+
+    index.move(ids, new_positions)         # incremental updates for moving points
+"""
+
+from __future__ import annotations
+from typing import Any
+from collections.abc import Sequence
+import itertools
+import math
+import numpy as np
+from .vector import _ArrayClass, Vec, VecArray
+
+def _as_points(points: Any) -> np.ndarray:
+    """Give points, being a VecArray, Vec, sequence of Vecs or array-like, as a 2-D float array."""
+    if isinstance(points, (VecArray, _ArrayClass)):
+        points = points._items
+    elif isinstance(points, Sequence) and len(points) > 0 and isinstance(points[0], _ArrayClass):
+        points = np.stack([p._items for p in points])
+    points = np.asarray(points, dtype=float)
+    return points.reshape(1, -1) if points.ndim == 1 else points
+
+class GridIndex:
+    """A uniform grid spatial index over a collection of points.
+
+    Each point has an id, which is its position in the points the index was
+    built from, or is given by insert. Inserted and moved points are kept aside
+    in a second, small grid until there are enough of them to rebuild the main one.
+    """
+
+    # points kept aside, as a fraction of all points, before the grid is rebuilt
+    REBUILD_FRACTION = 0.05
+    _MIN_PENDING = 1024
+
+    # queries answered at once, bounding the memory used by their candidates
+    _QUERY_CHUNK = 8192
+
+    def __init__(self, points: Any, cell_size: float|None = None):
+        points = _as_points(points)
+        if points.ndim != 2 or points.shape[1] == 0:
+            raise ValueError(f"Expected points of shape (N, dim), got {points.shape}")
+
+        self._dim = points.shape[1]
+        self._size = len(points) # number of ids given out
+        self._points = points.copy()
+        self._alive = np.ones(len(points), dtype=bool)
+        self._pending: set[int] = set() # ids not in the grid
+        self._pending_grid: tuple[np.ndarray, np.ndarray]|None = None # (keys, ids) of the pending ids, sorted by key
+
+        # the cell key of each dimension is packed into an int64, so nearby cells never collide
+        self._bits = 63 // self._dim
+        self._multipliers = np.array([1 << (self._bits * i) for i in range(self._dim)], dtype=np.int64)
+        self._cell_size = cell_size if cell_size is not None else self._default_cell_size(points)
+        if not self._cell_size > 0:
+            raise ValueError(f"Expected a positive cell size, got {self._cell_size}")
+
+        self.rebuild()
+
+    @staticmethod
+    def _default_cell_size(points: np.ndarray) -> float:
+        """A cell size giving around two points per cell, over the bounding box of the points."""
+        if len(points) < 2:
+            return 1.0
+        extent = points.max(axis=0) - points.min(axis=0)
+        extent = extent[extent > 0]
+        if len(extent) == 0:
+            return 1.0
+        return float((np.prod(extent) * 2 / len(points)) ** (1 / len(extent)))
+
+    def _cells(self, points: np.ndarray) -> np.ndarray:
+        return np.floor(points / self._cell_size).astype(np.int64)
+
+    def _keys(self, cells: np.ndarray) -> np.ndarray:
+        return cells @ self._multipliers # wraps around for very distant cells, which only adds candidates
+
+    def rebuild(self):
+        """Sort every live point into the grid, leaving none aside."""
+        ids = np.flatnonzero(self._alive[:self._size])
+        keys = self._keys(self._cells(self._points[ids]))
+        order = np.argsort(keys, kind='stable')
+        self._grid_ids = ids[order]
+        self._grid_keys = keys[order]
+        self._in_grid = np.zeros(len(self._points), dtype=bool)
+        self._in_grid[self._grid_ids] = True
+        self._pending.clear()
+        self._pending_grid = None
+
+    def _maybe_rebuild(self):
+        self._pending_grid = None
+        if len(self._pending) > max(self._MIN_PENDING, self.REBUILD_FRACTION * len(self)):
+            self.rebuild()
+
+    def _sorted_pending(self) -> tuple[np.ndarray, np.ndarray]:
+        """Give the keys and ids of the points kept aside sorted by key, sorting them on the first query since they changed."""
+        if self._pending_grid is None:
+            ids = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+            keys = self._keys(self._cells(self._points[ids]))
+            order = np.argsort(keys, kind='stable')
+            self._pending_grid = keys[order], ids[order]
+        return self._pending_grid
+
+    @property
+    def cell_size(self) -> float:
+        return self._cell_size
+
+    @property
+    def points(self) -> np.ndarray:
+        """The current position of every id, including removed ones."""
+        return self._points[:self._size]
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._alive[:self._size]))
+
+    def __contains__(self, id: int) -> bool:
+        return 0 <= id < self._size and bool(self._alive[id])
+
+    def insert(self, points: Any) -> np.ndarray:
+        """Add points to the index, giving their new ids."""
+        points = _as_points(points)
+        n = len(points)
+        if self._size + n > len(self._points): # grow geometrically
+            capacity = max(self._size + n, 2 * len(self._points))
+            for name in ('_points', '_alive', '_in_grid'):
+                old = getattr(self, name)
+                new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+                new[:self._size] = old[:self._size]
+                setattr(self, name, new)
+
+        ids = np.arange(self._size, self._size + n)
+        self._points[ids] = points
+        self._alive[ids] = True
+        self._size += n
+        self._pending.update(ids.tolist())
+        self._maybe_rebuild()
+        return ids
+
+    def remove(self, ids: int|Sequence[int]|np.ndarray):
+        """Remove points from the index by id."""
+        ids = np.atleast_1d(ids)
+        self._alive[ids] = False
+        self._pending.difference_update(ids.tolist())
+        self._pending_grid = None
+
+    def move(self, ids: int|Sequence[int]|np.ndarray, points: Any):
+        """Change the positions of points by id."""
+        ids = np.atleast_1d(ids)
+        self._points[ids] = _as_points(points)
+        # their entries in the grid are now stale, so they're kept aside until the next rebuild
+        self._in_grid[ids] = False
+        self._pending.update(ids[self._alive[ids]].tolist())
+        self._maybe_rebuild()
+
+    def _candidates(self, queries: np.ndarray, r: float) -> tuple[np.ndarray, np.ndarray]:
+        """Give (query index, id) pairs for every live point in a cell within r of each query."""
+        span = max(1, math.ceil(r / self._cell_size))
+        offsets = None
+        if (2 * span + 1)**self._dim <= self._size: # otherwise there are more cells than points, so every point is compared
+            offsets = np.array(list(itertools.product(range(-span, span + 1), repeat=self._dim)), dtype=np.int64)
+
+        query_index, ids = self._grid_candidates(queries, offsets, self._grid_keys, self._grid_ids)
+        keep = self._in_grid[ids] & self._alive[ids] # drop the points moved or removed since the grid was built
+        query_index, ids = query_index[keep], ids[keep]
+
+        if self._pending:
+            pending_index, pending_ids = self._grid_candidates(queries, offsets, *self._sorted_pending())
+            query_index, ids = np.concatenate([query_index, pending_index]), np.concatenate([ids, pending_ids])
+        return query_index, ids
+
+    def _grid_candidates(self, queries: np.ndarray, offsets: np.ndarray|None, grid_keys: np.ndarray, grid_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Give (query index, id) pairs for every point of a sorted grid in the cells at offsets from each query, or every point for no offsets."""
+        if offsets is None or len(offsets) > len(grid_ids): # more cells than points, so compare every point
+            return np.repeat(np.arange(len(queries)), len(grid_ids)), np.tile(grid_ids, len(queries))
+
+        # the range of the sorted grid holding each neighbouring cell of each query
+        keys = self._keys(self._cells(queries)[:, np.newaxis, :] + offsets).reshape(-1)
+        starts = np.searchsorted(grid_keys, keys, side='left')
+        counts = np.searchsorted(grid_keys, keys, side='right') - starts
+
+        # expand the ranges into one entry per candidate
+        total = int(counts.sum())
+        query_index = np.repeat(np.arange(len(keys)) // len(offsets), counts)
+        positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+        return query_index, grid_ids[positions]
+
+    def _within(self, queries: np.ndarray, r: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Give (query index, id, distance) for every point within r of each query, ordered by query index."""
+        results = []
+        for start in range(0, len(queries), self._QUERY_CHUNK):
+            chunk = queries[start:start + self._QUERY_CHUNK]
+            query_index, ids = self._candidates(chunk, r)
+            dists = np.sqrt(((self._points[ids] - chunk[query_index])**2).sum(axis=1))
+            keep = dists <= r
+            query_index, ids, dists = query_index[keep], ids[keep], dists[keep]
+            order = np.argsort(query_index, kind='stable')
+            results.append((query_index[order] + start, ids[order], dists[order]))
+
+        if len(results) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+    def query_radius(self, points: Any, r: float, return_distances: bool = False) -> Any:
+        """Give the ids of the points within r of each query point.
+
+        For a batch of query points gives a list with an array of ids per query,
+        and for a single Vec or point gives just its array.
+        """
+        single = isinstance(points, _ArrayClass) or np.ndim(points) == 1
+        queries = _as_points(points)
+        query_index, ids, dists = self._within(queries, r)
+
+        splits = np.cumsum(np.bincount(query_index, minlength=len(queries)))[:-1]
+        ids, dists = np.split(ids, splits), np.split(dists, splits)
+        result = list(zip(ids, dists)) if return_distances else ids
+        return result[0] if single else result
+
+    def query_knn(self, points: Any, k: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """Give the ids and distances of the k nearest points to each query point, nearest first.
+
+        Each is an array of shape (M, k), or (k,) for a single query point. If fewer
+        than k points are indexed, the missing entries have id -1 and distance inf.
+        """
+        single = isinstance(points, _ArrayClass) or np.ndim(points) == 1
+        queries = _as_points(points)
+        k_found = min(k, len(self))
+
+        result_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        result_dists = np.full((len(queries), k), np.inf)
+
+        # search outwards, widening the radius for the queries that haven't found enough points yet
+        remaining = np.arange(len(queries))
+        r = self._cell_size
+        while len(remaining) > 0 and k_found > 0:
+            query_index, ids, dists = self._within(queries[remaining], r)
+            counts = np.bincount(query_index, minlength=len(remaining))
+            found = counts >= k_found
+
+            # order each query's results by distance, then take the first k of each
+            order = np.lexsort((dists, query_index))
+            query_index, ids, dists = query_index[order], ids[order], dists[order]
+            rank = np.arange(len(query_index)) - np.repeat(np.cumsum(counts) - counts, counts)
+            take = (rank < k_found) & found[query_index]
+            rows = remaining[query_index[take]]
+            result_ids[rows, rank[take]] = ids[take]
+            result_dists[rows, rank[take]] = dists[take]
+
+            remaining = remaining[~found]
+            r *= 2
+
+        if single:
+            return result_ids[0], result_dists[0]
+        return result_ids, result_dists
+
+    def pairs(self, r: float) -> np.ndarray:
+        """Give every pair of ids of points within r of each other, as an array of shape (P, 2) with the lower id first."""
+        ids = np.flatnonzero(self._alive[:self._size])
+        query_index, others, _ = self._within(self._points[ids], r)
+        first = ids[query_index]
+        keep = first < others
+        return np.stack([first[keep], others[keep]], axis=1)
@@ -0,0 +1,202 @@
+"""Stacks
+
+A bottomless stack, which gives a default rather than raising when popped
+empty, a compact typed variant storing numbers unboxed in an array.array,
+and a stack counter tracking only the depth of a stack, and statistics of
+it, for parsers and evaluators which need nothing more.
+
+Typical usage example:
+
+    stack = BottomlessStack(default=0)
+    stack.push(1)
+    stack.pop() # 1
+    stack.pop() # 0, rather than an IndexError
+
+    values = TypedStack(float)
+    values.push_many(np.arange(1000.0))
+    values.pop_many(10) # the top 10, bottom first
+
+    depth = StackCounter()
+    with depth: # a push, then a pop on leaving
+        ...
+    depth.high_water # 1
+"""
+from __future__ import annotations
+from typing import Any, Generic, TypeVar
+from collections.abc import Iterable, Iterator
+import array
+import itertools
+import sys
+from . import _TYPECODES
+
+T = TypeVar('T')
+
+class BottomlessStack(Generic[T]):
+    """A stack which gives default when popped or peeked at empty, as if above infinitely many defaults.
+
+    push(item) puts an item on top.
+    """
+    # push is the storage's own append, bound per instance, so pushing costs no python call
+    __slots__ = ('_items', 'default', 'push')
+
+    def __init__(self, items: Iterable[T] = (), default: T|None = None):
+        self._items: list[T] = list(items)
+        self.default = default
+        self.push = self._items.append
+
+    # copies and unpickled stacks bind push to their own storage, rather than keeping the original's
+    def __getstate__(self) -> tuple:
+        return self._items, self.default
+
+    def __setstate__(self, state: tuple):
+        self._items, self.default = state
+        self.push = self._items.append
+
+    def __copy__(self) -> BottomlessStack[T]:
+        copy = self.__class__.__new__(self.__class__)
+        copy.__setstate__((self._items[:], self.default))
+        return copy
+
+    def pop(self) -> T:
+        return self._items.pop() if self._items else self.default
+
+    def peek(self) -> T:
+        return self._items[-1] if self._items else self.default
+
+    def push_many(self, items: Iterable[T]):
+        """Push each of items in turn, leaving the last on top."""
+        self._items.extend(items)
+
+    def pop_many(self, n: int) -> list[T]:
+        """Pop the top n items, given bottom first as they were pushed, with defaults for any below the bottom."""
+        if n <= 0:
+            return []
+        taken = self._items[-n:]
+        del self._items[-n:]
+        if len(taken) < n:
+            taken[:0] = [self.default] * (n - len(taken))
+        return taken
+
+    def clear(self):
+        del self._items[:]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __iter__(self) -> Iterator[T]:
+        """Iterate from the bottom of the stack to the top."""
+        return iter(self._items)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._items!r}, default={self.default!r})"
+
+# the kind of number of each struct format character, native or in this machine's byte order
+_KINDS = {**dict.fromkeys('bhilqn', 'i'), **dict.fromkeys('BHILQN', 'u'), **dict.fromkeys('efd', 'f')}
+_NATIVE_ORDER = '@=' + ('<' if sys.byteorder == 'little' else '>')
+
+def _number_kind(format: str) -> str|None:
+    """Give the kind of number of a buffer format, 'i', 'u' or 'f', or None for any other format."""
+    return _KINDS.get(format.lstrip(_NATIVE_ORDER))
+
+class TypedStack(BottomlessStack):
+    """A bottomless stack of numbers of one type, stored unboxed in an array.array.
+
+    The type is an array.array typecode, or float, int or bool. The array grows
+    geometrically, and push_many and pop_many move whole slices, from and to
+    anything supporting the buffer protocol (such as numpy arrays) without
+    touching each element.
+    """
+    __slots__ = ()
+
+    def __init__(self, typecode: str|type = float, items: Iterable = (), default: Any = 0):
+        self._items = array.array(_TYPECODES.get(typecode, typecode))
+        self.default = default
+        self.push = self._items.append
+        self.push_many(items)
+
+    @property
+    def typecode(self) -> str:
+        return self._items.typecode
+
+    def push_many(self, items: Iterable):
+        """Push each of items in turn, copying their memory directly when they're a buffer of the same type."""
+        try:
+            view = memoryview(items)
+        except TypeError:
+            self._items.extend(items)
+            return
+        # compared by kind and size, as the same type has different formats, e.g. numpy's int64 is 'l' and array's 'q'
+        kind = _number_kind(view.format)
+        if kind is not None and kind == _number_kind(self.typecode) and view.itemsize == self._items.itemsize and view.c_contiguous:
+            self._items.frombytes(view.cast('B'))
+        else:
+            self._items.extend(view.tolist())
+
+    def pop_many(self, n: int) -> array.array:
+        """Pop the top n items as an array, bottom first as they were pushed, with defaults for any below the bottom."""
+        if n <= 0:
+            return array.array(self.typecode)
+        taken = self._items[-n:]
+        del self._items[-n:]
+        if len(taken) < n:
+            taken = array.array(self.typecode, itertools.repeat(self.default, n - len(taken))) + taken
+        return taken
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.typecode!r}, {self._items.tolist()!r}, default={self.default!r})"
+
+class StackCounter:
+    """The depth of a stack, without its items, along with statistics of it.
+
+    Popping below the bottom leaves the depth at 0 and counts an underflow.
+    Entering the counter as a context manager pushes, and leaving pops.
+    """
+    __slots__ = ('depth', 'high_water', 'pushes', 'pops', 'underflows', '_operations', '_depth_total')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.depth = 0
+        self.high_water = 0
+        self.pushes = 0
+        self.pops = 0
+        self.underflows = 0
+        self._operations = 0
+        self._depth_total = 0 # the sum of the depth after each operation, for its mean
+
+    def push(self, n: int = 1):
+        self.depth += n
+        self.pushes += n
+        if self.depth > self.high_water:
+            self.high_water = self.depth
+        self._operations += 1
+        self._depth_total += self.depth
+
+    def pop(self, n: int = 1):
+        self.pops += n
+        if n > self.depth:
+            self.underflows += n - self.depth
+            self.depth = 0
+        else:
+            self.depth -= n
+        self._operations += 1
+        self._depth_total += self.depth
+
+    @property
+    def mean_depth(self) -> float:
+        """The mean depth after each push and pop."""
+        return self._depth_total / self._operations if self._operations else 0.0
+
+    def __enter__(self) -> StackCounter:
+        self.push()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.pop()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(depth={self.depth}, high_water={self.high_water})"
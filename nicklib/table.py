@@ -0,0 +1,294 @@
+"""TupleClassTable
+
+Columnar storage for large collections of TupleClass records. Each
+annotated field of the record class is kept as one column: numeric
+fields in a typed numpy array and any other field in a list of objects.
+
+Typical usage example:
+
+    class Point(TupleClass):
+        x: float
+        y: float
+        label: str
+
+    points = TupleClassTable(Point)
+    points.append(Point(1.0, 2.0, 'a'))
+    points.extend([(3.0, 4.0, 'b'), (5.0, 6.0, 'c')])
+
+    points[0].x                  # 1.0, a row view onto the table
+    x, y, label = points[1]      # rows unpack like the record does
+    points['x'] * 2              # the x column, as a numpy array
+    points[points['x'] > 2.0]    # a new table of the matching rows
+"""
+
+from __future__ import annotations
+from typing import Any, get_type_hints
+from collections.abc import Iterable, Iterator
+import weakref
+import numpy as np
+from .tupleclass import TupleClass
+
+# annotations stored as typed numpy columns, everything else is stored as objects
+_NUMERIC_DTYPES = {
+    int: np.int64, 'int': np.int64,
+    float: np.float64, 'float': np.float64,
+    bool: np.bool_, 'bool': np.bool_,
+    complex: np.complex128, 'complex': np.complex128,
+}
+
+_INITIAL_CAPACITY = 16
+
+def _column_dtype(annotation: Any) -> type|None:
+    """Give the numpy dtype of the column for a field annotation, or None for an object column."""
+    if isinstance(annotation, type) and issubclass(annotation, np.generic):
+        return annotation
+    try:
+        return _NUMERIC_DTYPES.get(annotation)
+    except TypeError: # unhashable annotation
+        return None
+
+def _field_annotations(record_cls: type[TupleClass]) -> dict[str, Any]:
+    """Give the annotation of each field of a TupleClass, including inherited fields.
+
+    String annotations, as under from __future__ import annotations, are resolved
+    in the record class's module. If any can't be, e.g. names local to a function,
+    all are left as written, which only the builtin numeric names are known by.
+    """
+    try:
+        annotations = get_type_hints(record_cls)
+    except NameError:
+        annotations = {}
+        for base in reversed(record_cls.__mro__):
+            annotations.update(base.__dict__.get('__annotations__', {}))
+    return {name: annotations.get(name) for name in record_cls._TupleClass_fields}
+
+class _TableRow:
+    """A view of one row of a TupleClassTable which behaves like the table's record class.
+
+    A subclass with a property per field is made for each record class, see _row_class.
+    """
+    __slots__ = ('_table', '_index')
+
+    _fields: tuple[str, ...] = ()
+
+    def __init__(self, table: TupleClassTable, index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: int|slice) -> Any:
+        if isinstance(key, slice):
+            return tuple(self)[key]
+        return self._table._storage[self._fields[key]][self._index]
+
+    def __setitem__(self, key: int, val: Any):
+        self._table._storage[self._fields[key]][self._index] = val
+
+    def __iter__(self) -> Iterator[Any]:
+        columns, index = self._table._storage, self._index
+        return (columns[name][index] for name in self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __eq__(self, other: Any) -> bool:
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return repr(self.to_record())
+
+    def to_record(self) -> TupleClass:
+        """Give a copy of this row as an instance of the record class."""
+        return self._table._record_cls(*self)
+
+def _make_row_property(name: str) -> property:
+    def getter(_self):
+        return _self._table._storage[name][_self._index]
+    def setter(_self, value):
+        _self._table._storage[name][_self._index] = value
+
+    return property(getter, setter)
+
+# weakly keyed, so a record class and its row class can be collected together, the row class not referring back to it
+_row_classes: weakref.WeakKeyDictionary[type, type] = weakref.WeakKeyDictionary()
+
+def _row_class(record_cls: type[TupleClass]) -> type[_TableRow]:
+    """Give the row view class of a record class, made once per record class."""
+    if (row_cls := _row_classes.get(record_cls)) is None:
+        fields = record_cls._TupleClass_fields
+        dct = {name: _make_row_property(name) for name in fields}
+        dct.update(__slots__=(), _fields=fields)
+        row_cls = _row_classes[record_cls] = type(record_cls.__name__ + 'Row', (_TableRow,), dct)
+    return row_cls
+
+class TupleClassTable:
+    """A table of records of a TupleClass subclass, stored column by column.
+
+    Indexing with an int gives a row view, with a field name gives that
+    column, and with a slice, boolean mask or array of indices gives a new
+    table of the selected rows. Numeric columns are only views of the
+    table's storage until the table grows, so take a copy to keep one.
+    """
+
+    def __init__(self, record_cls: type[TupleClass], records: Iterable = ()):
+        self._record_cls = record_cls
+        self._row_cls = _row_class(record_cls)
+        self._fields = record_cls._TupleClass_fields
+        self._dtypes = {name: _column_dtype(annotation) for name, annotation in _field_annotations(record_cls).items()}
+        self._size = 0
+
+        # numeric columns are allocated with spare capacity and grown geometrically
+        self._storage = {
+            name: np.zeros(_INITIAL_CAPACITY, dtype=dtype) if dtype is not None else []
+            for name, dtype in self._dtypes.items()
+        }
+        self.extend(records)
+
+    @classmethod
+    def from_columns(cls, record_cls: type[TupleClass], columns: dict[str, np.ndarray|list]) -> TupleClassTable:
+        """Give a table around existing columns, one per field of equal length, without copying them.
+
+        Numeric columns keep their dtype, which may be any numpy dtype, e.g. 
+        the fields of a structured or memory-mapped array.
+        """
+        table = cls(record_cls)
+        if set(columns) != set(table._fields):
+            raise ValueError(f"Expected columns {table._fields}, got {tuple(columns)}")
+
+        sizes = {len(column) for column in columns.values()}
+        if len(sizes) > 1:
+            raise ValueError(f"Columns have differing lengths {sorted(sizes)}")
+
+        table._storage = {name: columns[name] for name in table._fields}
+        table._dtypes = {name: None if isinstance(column, list) else column.dtype for name, column in table._storage.items()}
+        table._size = sizes.pop() if sizes else 0
+        return table
+
+    @property
+    def record_cls(self) -> type[TupleClass]:
+        return self._record_cls
+
+    @property
+    def fields(self) -> tuple[str, ...]:
+        return self._fields
+
+    def _reserve(self, size: int):
+        """Ensure every numeric column can hold size rows."""
+        for name, dtype in self._dtypes.items():
+            if dtype is not None and len(self._storage[name]) < size:
+                grown = np.zeros(max(size, 2 * len(self._storage[name])), dtype=dtype)
+                grown[:self._size] = self._storage[name][:self._size]
+                self._storage[name] = grown
+
+    def append(self, record: Iterable):
+        """Add a record, or any iterable of values in field order, to the end of the table."""
+        values = tuple(record)
+        if len(values) != len(self._fields):
+            raise ValueError(f"Expected {len(self._fields)} values, got {len(values)}")
+
+        self._reserve(self._size + 1)
+        for name, val in self._write_order(values):
+            column = self._storage[name]
+            if isinstance(column, list):
+                column.append(val)
+            else:
+                column[self._size] = val
+        self._size += 1
+
+    def _write_order(self, values: Iterable) -> list[tuple[str, Any]]:
+        """Pair each field with its values, numeric columns first.
+
+        Writing to a numeric column converts the values, which may fail, but only
+        writes past the end of the table, so once those are written appending to
+        the object columns can't leave the table misaligned.
+        """
+        pairs = list(zip(self._fields, values))
+        return sorted(pairs, key=lambda pair: isinstance(self._storage[pair[0]], list))
+
+    def extend(self, records: Iterable):
+        """Add many records, or iterables of values in field order, to the end of the table at once."""
+        if isinstance(records, TupleClassTable):
+            columns = [records[name] for name in self._fields]
+        else:
+            rows = [tuple(record) for record in records]
+            if len(rows) == 0:
+                return
+            if any(len(row) != len(self._fields) for row in rows):
+                raise ValueError(f"Expected {len(self._fields)} values for every record")
+            columns = list(zip(*rows)) # transpose into columns
+
+        n = len(columns[0]) if columns else 0
+        self._reserve(self._size + n)
+        for name, values in self._write_order(columns):
+            column = self._storage[name]
+            if isinstance(column, list):
+                column.extend(values)
+            else:
+                column[self._size:self._size + n] = values
+        self._size += n
+
+    def column(self, name: str) -> np.ndarray|list:
+        """Give the column of a field, a view for numeric fields and the stored list for any other."""
+        column = self._storage[name]
+        return column if isinstance(column, list) else column[:self._size]
+
+    def _select(self, index: slice|np.ndarray|list) -> TupleClassTable:
+        """Give a new table of the rows picked by a slice, boolean mask or array of indices."""
+        if not isinstance(index, slice):
+            index = np.asarray(index)
+            if index.dtype == bool:
+                if len(index) != self._size:
+                    raise IndexError(f"Boolean mask of length {len(index)} doesn't match table of length {self._size}")
+                index = np.flatnonzero(index)
+
+        columns = {}
+        for name in self._fields:
+            column = self.column(name)
+            if isinstance(column, list):
+                columns[name] = column[index] if isinstance(index, slice) else [column[i] for i in index]
+            else:
+                columns[name] = column[index].copy()
+        return TupleClassTable.from_columns(self._record_cls, columns)
+
+    def __getitem__(self, key: int|str|slice|np.ndarray) -> Any:
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += self._size
+            if not 0 <= key < self._size:
+                raise IndexError("table index out of range")
+            return self._row_cls(self, key)
+        return self._select(key)
+
+    def __setitem__(self, key: int|str, val: Any):
+        if isinstance(key, str):
+            column = self.column(key)
+            if isinstance(column, list):
+                values = list(val) if isinstance(val, Iterable) and not isinstance(val, str) else [val] * self._size
+                if len(values) != self._size: # as numpy raises for a numeric column
+                    raise ValueError(f"Expected {self._size} values for column '{key}', got {len(values)}")
+                column[:] = values
+            else:
+                column[:] = val
+        else:
+            row = self[key]
+            for i, v in enumerate(val):
+                row[i] = v
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[_TableRow]:
+        return (self._row_cls(self, i) for i in range(self._size))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}[{self._record_cls.__name__}]({self._size} rows)"
+
+    def to_records(self) -> list[TupleClass]:
+        """Give a copy of every row as an instance of the record class."""
+        columns = [self.column(name) for name in self._fields]
+        columns = [c.tolist() if isinstance(c, np.ndarray) else c for c in columns]
+        return [self._record_cls(*values) for values in zip(*columns)]
@@ -1,5 +1,29 @@
+"""Test assertions
+
+assert_error checks the error a call raises. The performance assertions
+check how long a call takes, how much it allocates and how its time
+grows with the size of its input, each raising an AssertionError with
+the measurements when it fails, and otherwise giving them back.
+PerformanceAssertions gives the same checks as methods of a
+unittest.TestCase.
+
+Typical usage example:
+
+    class TestVec(PerformanceAssertions, unittest.TestCase):
+        def test_speed(self):
+            a, b = Vec(1, 2), Vec(3, 4)
+            self.assertTimeUnder(2e-6, lambda: a + b)
+            self.assertAllocationsUnder(lambda: a + b, max_peak_bytes=1024, max_retained_blocks=0)
+            self.assertScales('O(n log n)', sorted, sizes=(1000, 4000, 16000), setup=random_list)
+"""
 from __future__ import annotations
-from typing import Any, Callable
+from typing import Any, Callable, Literal
+from collections.abc import Sequence
+import gc
+import math
+import statistics
+import time
+import tracemalloc
 
 def assert_error(exp_error: BaseException|type, func: Callable, *args, **kwargs) -> Any:
     """Debug assert that a call with provided args will result in the specified exception raised. Will raise an AssertionError. If exp_error is None, then assert that no error will be raised. For convinience, a successful call's value will be retured."""
@@ -12,3 +36,197 @@ def assert_error(exp_error: BaseException|type, func: Callable, *args, **kwargs)
             raise AssertionError(f"Function {func.__name__} raised {repr(e)}, but no error was expected.") from e
         else: # the caller didn't expect this error to be raised
             raise AssertionError(f"Function {func.__name__} raised {repr(e)}, but a {exp_error.__name__} was expected.") from e
+
+def _name(func: Callable) -> str:
+    return getattr(func, '__qualname__', None) or repr(func)
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if abs(seconds) >= scale:
+            return f'{seconds / scale:.3g} {unit}'
+    return f'{seconds / 1e-9:.3g} ns'
+
+def measure_time(func: Callable[[], Any], repeat: int = 7, warmup: int = 1, min_time: float = 0.01) -> dict[str, Any]:
+    """Time a callable of no arguments, giving statistics of the time per call in seconds.
+
+    After warmup calls, each of repeat runs makes enough calls to take at least
+    min_time, and gives one sample of the time per call. Samples beyond the
+    Tukey fences, 1.5 interquartile ranges outside the quartiles, are rejected
+    as outliers, e.g. a run interrupted by the scheduler or the collector, and
+    the statistics are of the samples kept.
+    """
+    if repeat < 1:
+        raise ValueError(f"Expected a repeat of at least 1, got {repeat}")
+    for _ in range(warmup):
+        func()
+
+    # calibrate the calls per run, from the time of one call
+    number = 1
+    while (elapsed := _time_calls(func, number)) < min_time:
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    samples = [_time_calls(func, number) / number for _ in range(repeat)]
+
+    kept = samples
+    if len(samples) >= 4:
+        q1, _, q3 = statistics.quantiles(samples, n=4)
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        kept = [t for t in samples if low <= t <= high]
+    return {
+        'min': min(kept), 'median': statistics.median(kept), 'mean': statistics.fmean(kept),
+        'stdev': statistics.stdev(kept) if len(kept) > 1 else 0.0, 'max': max(kept),
+        'samples': len(samples), 'rejected': len(samples) - len(kept), 'number': number,
+    }
+
+def _time_calls(func: Callable[[], Any], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+def _format_timing(stats: dict[str, Any]) -> str:
+    return (f"min {_format_time(stats['min'])}, median {_format_time(stats['median'])}, "
+            f"mean {_format_time(stats['mean'])} +- {_format_time(stats['stdev'])}, max {_format_time(stats['max'])} "
+            f"over {stats['samples'] - stats['rejected']} runs of {stats['number']} calls ({stats['rejected']} outliers rejected)")
+
+def assert_time_under(budget: float, func: Callable[[], Any], statistic: Literal['min', 'median', 'mean'] = 'median',
+                      repeat: int = 7, warmup: int = 1, min_time: float = 0.01) -> dict[str, Any]:
+    """Assert that a callable of no arguments takes less than budget seconds per call, by a statistic of measure_time.
+
+    The median is robust to a noisy machine, the min gives the least noisy
+    estimate of the cost itself. For convenience, the statistics are returned.
+    """
+    stats = measure_time(func, repeat, warmup, min_time)
+    if stats[statistic] >= budget:
+        raise AssertionError(f"{_name(func)} took {_format_time(stats[statistic])} per call by {statistic}, "
+                             f"over its budget of {_format_time(budget)}: {_format_timing(stats)}")
+    return stats
+
+def measure_allocations(func: Callable[[], Any], calls: int = 1, warmup: int = 1) -> dict[str, Any]:
+    """Trace the memory allocated by calls of a callable of no arguments, with tracemalloc.
+
+    peak_bytes is the most memory allocated at once during a call, above what
+    was allocated before it, and retained_bytes and retained_blocks what the calls
+    left allocated once their results were dropped, per call. The warmup calls
+    leave any caches out of the allocations.
+    """
+    for _ in range(warmup):
+        func()
+    gc.collect()
+
+    tracing = tracemalloc.is_tracing() # under a caller already tracing, only what's allocated from here counts
+    if not tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        peak = 0
+        for _ in range(calls):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - start)
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    # leave out the tracing's own allocations
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'filename')
+    return {
+        'peak_bytes': peak,
+        'retained_bytes': sum(stat.size_diff for stat in diff) / calls,
+        'retained_blocks': sum(stat.count_diff for stat in diff) / calls,
+        'calls': calls,
+    }
+
+def assert_allocations_under(func: Callable[[], Any], max_peak_bytes: int|None = None, max_retained_bytes: int|None = None,
+                             max_retained_blocks: int|None = None, calls: int = 1, warmup: int = 1) -> dict[str, Any]:
+    """Assert that a callable of no arguments allocates no more than the given limits, by measure_allocations.
+
+    For convenience, the measurements are returned.
+    """
+    stats = measure_allocations(func, calls, warmup)
+    over = [f"{key} {stats[key]:g} over {limit}" for key, limit in
+            (('peak_bytes', max_peak_bytes), ('retained_bytes', max_retained_bytes), ('retained_blocks', max_retained_blocks))
+            if limit is not None and stats[key] > limit]
+    if over:
+        raise AssertionError(f"{_name(func)} allocated {', '.join(over)}: peak {stats['peak_bytes']} B, "
+                             f"retained {stats['retained_bytes']:g} B in {stats['retained_blocks']:g} blocks per call over {calls} calls")
+    return stats
+
+# the growth of the time of each complexity class, as a function of the input size
+COMPLEXITIES: dict[str, Callable[[float], float]] = {
+    'O(1)': lambda n: 1.0,
+    'O(log n)': lambda n: math.log(n),
+    'O(n)': lambda n: n,
+    'O(n log n)': lambda n: n * math.log(n),
+    'O(n^2)': lambda n: n ** 2,
+    'O(n^3)': lambda n: n ** 3,
+}
+
+def measure_complexity(func: Callable[[Any], Any], sizes: Sequence[int], setup: Callable[[int], Any]|None = None,
+                       repeat: int = 5, min_time: float = 0.01) -> dict[str, Any]:
+    """Time a callable of one argument over inputs of each size, and fit how its time grows.
+
+    The input of each size is setup(size), made before timing, or the size
+    itself without setup. The time of each size is the median of measure_time.
+    exponent is the slope of log time against log size, and best the complexity
+    class whose growth leaves the flattest time per unit of growth.
+    """
+    if len(sizes) < 2 or min(sizes) < 2:
+        raise ValueError(f"Expected at least 2 sizes of at least 2, got {sizes}")
+    times = []
+    for size in sizes:
+        arg = size if setup is None else setup(size)
+        times.append(measure_time(lambda: func(arg), repeat=repeat, min_time=min_time)['median'])
+
+    log_sizes = [math.log(size) for size in sizes]
+    slopes = {name: statistics.linear_regression(log_sizes, [math.log(t / growth(size)) for size, t in zip(sizes, times)]).slope
+              for name, growth in COMPLEXITIES.items()}
+    return {
+        'sizes': list(sizes), 'times': times,
+        'exponent': slopes['O(1)'],
+        'slopes': slopes,
+        'best': min(slopes, key=lambda name: abs(slopes[name])),
+    }
+
+def assert_complexity(expected: str, func: Callable[[Any], Any], sizes: Sequence[int], setup: Callable[[int], Any]|None = None,
+                      tolerance: float = 0.25, repeat: int = 5, min_time: float = 0.01) -> dict[str, Any]:
+    """Assert that the time of a callable of one argument grows no faster than a complexity class, one of COMPLEXITIES.
+
+    Fails when the time divided by the growth of the class still grows with the
+    size, by more than tolerance in the slope of log time against log size.
+    Classes a log factor apart differ by little over a small range of sizes, so
+    spread the sizes by as many orders of magnitude as is quick to run. For
+    convenience, the fit of measure_complexity is returned.
+    """
+    if expected not in COMPLEXITIES:
+        raise ValueError(f"Expected a complexity in {list(COMPLEXITIES)}, got {expected!r}")
+    fit = measure_complexity(func, sizes, setup, repeat, min_time)
+    if fit['slopes'][expected] > tolerance:
+        rows = ', '.join(f"n={size}: {_format_time(t)}" for size, t in zip(fit['sizes'], fit['times']))
+        raise AssertionError(f"{_name(func)} grows faster than {expected}, as about n^{fit['exponent']:.2f}, "
+                             f"best fit {fit['best']} (time / growth of {expected} has slope {fit['slopes'][expected]:.2f}, "
+                             f"over the tolerance of {tolerance}): {rows}")
+    return fit
+
+class PerformanceAssertions:
+    """A mixin of the performance assertions as unittest.TestCase methods.
+
+    Typical usage example:
+
+        class TestStack(PerformanceAssertions, unittest.TestCase):
+            def test_push(self):
+                stack = BottomlessStack()
+                self.assertTimeUnder(1e-6, lambda: stack.push(1))
+    """
+
+    def assertTimeUnder(self, budget: float, func: Callable[[], Any], **options) -> dict[str, Any]:
+        return assert_time_under(budget, func, **options)
+
+    def assertAllocationsUnder(self, func: Callable[[], Any], **limits) -> dict[str, Any]:
+        return assert_allocations_under(func, **limits)
+
+    def assertScales(self, expected: str, func: Callable[[Any], Any], sizes: Sequence[int], setup: Callable[[int], Any]|None = None, **options) -> dict[str, Any]:
+        return assert_complexity(expected, func, sizes, setup, **options)
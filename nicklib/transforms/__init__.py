@@ -0,0 +1,17 @@
+"""Function transformers
+
+Submodules are imported on first use, as attributes of the package.
+"""
+from __future__ import annotations
+from typing import Any
+import importlib
+
+_SUBMODULES = frozenset({'arguments', 'caching', 'governors', 'instrument', 'parallel', 'testing'})
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | _SUBMODULES)
@@ -2,8 +2,8 @@
 
 Here, the term "transformer" denotes a operation on a function,
 and in Python, is typically implemented as a decorator, or a
-decorator factory. This module defines such function transformers 
-for the  purposes of leveraging specific manipulations on function 
+decorator factory. This module defines such function transformers
+for the  purposes of leveraging specific manipulations on function
 input or output whilst maintaining code brevity.
 
 Typical usage example:
@@ -22,56 +22,314 @@ Typical usage example:
     g(a=1, b=2)      # 3
     g(a=1, b=2, c=3) # AssertionError
     g(a=1, c=3)      # -2
-    
+
+    @validate_params(n=lambda n: None if n >= 0 else ValueError(n), sample=10)
+    def h(n: int, scale: float = 1.0) -> float:
+        return n * scale
+
+    h(-1) # ValueError, on the first of every 10 calls
+
+    @fuse(map_arguments(normalise), validate_args(check), take_args_as_list())
+    def k(nums): # one wrapper frame rather than three
+        ...
+
+Given a coroutine function, each transformer gives a coroutine function,
+which runs the transformer's logic and then awaits the function, except
+vectorize, which refuses coroutine functions with a TypeError.
+
+Validation may be switched off, for every function decorated from then on
+with set_validation(False) or by setting the environment variable
+NICKLIB_VALIDATION=0, or for one decorator with enabled=False. A disabled
+validator gives back the function undecorated, so costs nothing per call.
 """
 from __future__ import annotations
 from typing import Callable, Any
 import functools
+import inspect
+import itertools
+import os
 
 type _Args = tuple[list[Any, ...], dict[str, Any]]
 type _ArgMap = Callable[_Args, _Args]
 
+_validation_enabled = os.environ.get('NICKLIB_VALIDATION', '1') != '0'
+
+def set_validation(enabled: bool):
+    """Enable or disable argument validation for every function decorated from now on.
+
+    Functions already decorated keep what they were decorated with.
+    """
+    global _validation_enabled
+    _validation_enabled = enabled
+
+def _is_enabled(enabled: bool|None) -> bool:
+    return _validation_enabled if enabled is None else enabled
+
+def _fusable(decorator: Callable, kind: str, payload: Any, sample: int = 1, enabled: bool|None = True) -> Callable:
+    """Mark a decorator as a stage which fuse can inline into a single wrapper."""
+    decorator._fusable_stage = (kind, payload, sample, enabled)
+    return decorator
+
 # give a function transformerDecorator factory for functions to apply an arg transform on each call."""
 def map_arguments(arg_transform: Callable[tuple[list, dict], tuple[list, dict]]) -> Callable:
     """Gives a transformer whose output functions' recieved input arguments are the result of the given argument mapping over the input arguments provided"""
     def _decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def _async_wrapper(*args, **kwargs) -> any:
+                t_args, t_kwargs = arg_transform(*args, **kwargs)
+                return await func(*t_args, **t_kwargs)
+            return _async_wrapper
+
         @functools.wraps(func)
         def _wrapper(*args, **kwargs) -> any:
             t_args, t_kwargs = arg_transform(*args, **kwargs)
             return func(*t_args, **t_kwargs)
         return _wrapper
-    return _decorator
+    return _fusable(_decorator, 'map', arg_transform)
+
+def _as_list(list_args: tuple) -> list:
+    # check if we were passed a regular list
+    if len(list_args) == 1 and type(list_args[0]) == list:
+        return list_args[0]
+    return list(list_args)
 
 def take_args_as_list(pos: int = 0): # the factory
     """Gives a transformer whose output function's input arguments are all recieved in one list argument"""
-    def take_args_as_list_decorator(func): # the actual decorator 
+    def take_args_as_list_decorator(func): # the actual decorator
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await func(*args[:pos], _as_list(args[pos:]), **kwargs)
+            return async_wrapper
+
         @functools.wraps(func) # ensures decorator wrapping preserves original name
         def wrapper(*args, **kwargs):
             # extract only the desired list args
             normal_args = args[:pos]
             list_args = args[pos:]
-            
-            L: list[any] = list(list_args) # convert args tuple to list
-            
-            # check if we were passed a regular list
-            if len(list_args) == 1 and type(list_args[0]) == list:
-                # revert L back into the passed list
-                L = list_args[0]
-            
-            return func(*normal_args, L, **kwargs)
+            return func(*normal_args, _as_list(list_args), **kwargs)
         return wrapper
-    return take_args_as_list_decorator
+    return _fusable(take_args_as_list_decorator, 'list', pos)
+
+def _is_batch(arg: Any, np: Any) -> bool:
+    """Whether an argument is a batch of values, rather than a scalar value."""
+    # numpy scalars have __array__ too, but are 0-d
+    return isinstance(arg, (list, tuple)) or (hasattr(arg, '__array__') and np.ndim(arg) > 0)
+
+def vectorize(dtype: Any = float, chunk_size: int = 65536) -> Callable:
+    """Gives a transformer whose output functions, given batches of values in place of scalar arguments, give the batch of results.
+
+    Lists, tuples, numpy arrays and Vecs are batches, and any positional argument
+    may be one. Batches and scalars broadcast against each other as numpy, and so
+    the Vec operators, do. Keyword arguments are always passed as they are.
+
+    A vectorised implementation, taking numpy arrays, may be registered with the
+    output function's vectorized method and is used for every batched call.
+    Otherwise the scalar function is called for each element, a chunk of at most
+    chunk_size at a time, into a preallocated array of dtype. A Vec batch gives a
+    Vec of the same class, any other batch gives a numpy array.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Expected a chunk_size of at least 1, got {chunk_size}")
 
-def validate_args(arg_validator: Callable) -> Callable:
-    """Gives a transformer whose output function's assert conformance to the provided argument validator predicate before execution"""
     def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func): # would fill the batch with coroutines, never awaited
+            raise TypeError(f"vectorize can't batch the coroutine function {func.__qualname__}")
+        import numpy as np # loaded with the first vectorised function rather than with the module
+        from ..vector import Vec, _SmallVec
+        vectorized = None
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            # an arg_validator can raise an error by itself, or return a BaseException for us to throw for it 
-            validation = arg_validator(*args, **kwargs)
-            if validation != None:
-                raise validation from validation
+            batches = [i for i, arg in enumerate(args) if _is_batch(arg, np)]
+            if not batches:
+                return func(*args, **kwargs)
+
+            arrays = [np.asarray(args[i]) for i in batches]
+            if vectorized is not None:
+                call_args = list(args)
+                for i, array in zip(batches, arrays):
+                    call_args[i] = array
+                out = np.asarray(vectorized(*call_args, **kwargs), dtype=dtype)
+            else:
+                arrays = np.broadcast_arrays(*arrays)
+                out = np.empty(arrays[0].shape, dtype=dtype)
+                flat_out = out.reshape(-1)
+                scalar_func = functools.partial(func, **kwargs) if kwargs else func
+                columns = [itertools.repeat(arg) for arg in args]
+                for start in range(0, out.size, chunk_size):
+                    stop = min(start + chunk_size, out.size)
+                    # map over columns of python scalars, which the scalar function expects and which are quicker to make
+                    for i, array in zip(batches, arrays):
+                        columns[i] = array.flat[start:stop].tolist()
+                    flat_out[start:stop] = list(map(scalar_func, *columns))
+
+            first = args[batches[0]]
+            if isinstance(first, (Vec, _SmallVec)) and out.ndim == 1:
+                return type(first)(*out.tolist())
+            return out
 
-            return func(*args, **kwargs)
+        def register(impl: Callable) -> Callable:
+            """Register a vectorised implementation, taking numpy arrays in place of batches. Usable as a decorator."""
+            nonlocal vectorized
+            vectorized = impl
+            return impl
+
+        wrapper.vectorized = register
         return wrapper
     return decorator
+
+def validate_args(arg_validator: Callable, enabled: bool|None = None, sample: int = 1) -> Callable:
+    """Gives a transformer whose output function's assert conformance to the provided argument validator predicate before execution
+
+    Only 1 in every sample calls is validated. When disabled, the function is given back undecorated.
+    """
+    if sample < 1:
+        raise ValueError(f"Expected a sample of at least 1, got {sample}")
+
+    def decorator(func: Callable) -> Callable:
+        if not _is_enabled(enabled):
+            return func
+        return _fuse_stages(func, [('validate', arg_validator, sample, enabled)])
+    return _fusable(decorator, 'validate', arg_validator, sample, enabled)
+
+def _signature_source(sig: inspect.Signature, namespace: dict[str, Any]) -> tuple[str, str]:
+    """Give the source of a parameter list matching a signature and of a call passing those parameters on.
+
+    Defaults are added to namespace to be referred to by the parameter list.
+    """
+    params, call = [], []
+    for param in sig.parameters.values():
+        if params and param.kind is not param.POSITIONAL_ONLY and last_kind is param.POSITIONAL_ONLY:
+            params.append('/')
+        last_kind = param.kind
+
+        name = param.name
+        if param.kind is param.VAR_POSITIONAL:
+            params.append(f'*{name}')
+            call.append(f'*{name}')
+        elif param.kind is param.VAR_KEYWORD:
+            params.append(f'**{name}')
+            call.append(f'**{name}')
+        else:
+            if param.kind is param.KEYWORD_ONLY and not any(p.startswith('*') for p in params):
+                params.append('*')
+            if param.default is param.empty:
+                params.append(name)
+            else:
+                namespace[f'_nl_default_{name}'] = param.default
+                params.append(f'{name}=_nl_default_{name}')
+            call.append(f'{name}={name}' if param.kind is param.KEYWORD_ONLY else name)
+
+    if params and last_kind is inspect.Parameter.POSITIONAL_ONLY:
+        params.append('/')
+    return ', '.join(params), ', '.join(call)
+
+def _compile_params(func: Callable, validators: dict[str, Callable], sample: int, call: bool) -> Callable:
+    """Generate a function with the signature of func which runs the validator of each parameter, then calls func if call.
+
+    Calling a coroutine function, the function generated is one too and awaits it.
+    """
+    sig = inspect.signature(func)
+    unknown = set(validators) - set(sig.parameters)
+    if unknown:
+        raise TypeError(f"{func.__qualname__} has no parameters {sorted(unknown)} to validate")
+    if any(name.startswith('_nl_') for name in sig.parameters):
+        raise ValueError(f"{func.__qualname__} has parameters named like validation internals")
+
+    namespace = {'_nl_func': func, '_nl_count': itertools.count(), '_nl_next': next}
+    params, passed = _signature_source(sig, namespace)
+
+    is_async = call and inspect.iscoroutinefunction(func)
+    lines = [f'{"async " if is_async else ""}def _nl_wrapper({params}):']
+    indent = '    '
+    if sample > 1 and validators:
+        lines.append(f'    if _nl_next(_nl_count) % {sample} == 0:')
+        indent += '    '
+    for name, validator in validators.items():
+        namespace[f'_nl_validate_{name}'] = validator
+        lines.append(f'{indent}if (_nl_error := _nl_validate_{name}({name})) is not None:')
+        lines.append(f'{indent}    raise _nl_error')
+    lines.append(f'    return {"await " if is_async else ""}_nl_func({passed})' if call else '    return None')
+
+    exec('\n'.join(lines), namespace)
+    return namespace['_nl_wrapper']
+
+def validate_params(enabled: bool|None = None, sample: int = 1, **validators: Callable) -> Callable:
+    """Gives a transformer whose output functions validate each named parameter with its own validator before execution.
+
+    A validator is given the parameter's value, and raises an error itself or
+    returns one to raise, or None when the value is valid. The checks are
+    compiled once, into a wrapper with the same signature as the function, so
+    each call binds its arguments once and runs no more than the validators.
+    Only 1 in every sample calls is validated. When disabled, the function is
+    given back undecorated.
+    """
+    if sample < 1:
+        raise ValueError(f"Expected a sample of at least 1, got {sample}")
+
+    def decorator(func: Callable) -> Callable:
+        if not _is_enabled(enabled):
+            return func
+        return functools.update_wrapper(_compile_params(func, validators, sample, call=True), func)
+    return _fusable(decorator, 'params', validators, sample, enabled)
+
+def _fuse_stages(func: Callable, stages: list[tuple[str, Any, int, bool|None]]) -> Callable:
+    """Generate one wrapper running each stage in order on the arguments, then calling func, or awaiting it for a coroutine function."""
+    namespace = {'_nl_func': func, '_nl_as_list': _as_list, '_nl_next': next}
+    is_async = inspect.iscoroutinefunction(func)
+    lines = [f'{"async " if is_async else ""}def _nl_wrapper(*args, **kwargs):']
+    for i, (kind, payload, sample, _) in enumerate(stages):
+        indent = '    '
+        if kind in ('validate', 'params') and sample > 1:
+            namespace[f'_nl_count{i}'] = itertools.count()
+            lines.append(f'    if _nl_next(_nl_count{i}) % {sample} == 0:')
+            indent += '    '
+
+        match kind:
+            case 'map':
+                namespace[f'_nl_stage{i}'] = payload
+                lines.append(f'{indent}args, kwargs = _nl_stage{i}(*args, **kwargs)')
+            case 'list':
+                lines.append(f'{indent}args = (*args[:{payload}], _nl_as_list(args[{payload}:]))')
+            case 'validate':
+                # an arg_validator can raise an error by itself, or return a BaseException for us to throw for it
+                namespace[f'_nl_stage{i}'] = payload
+                lines.append(f'{indent}if (_nl_error := _nl_stage{i}(*args, **kwargs)) is not None:')
+                lines.append(f'{indent}    raise _nl_error from _nl_error')
+            case 'params':
+                # binds the arguments against the function's signature, raising any error itself
+                namespace[f'_nl_stage{i}'] = _compile_params(func, payload, 1, call=False)
+                lines.append(f'{indent}_nl_stage{i}(*args, **kwargs)')
+    lines.append(f'    return {"await " if is_async else ""}_nl_func(*args, **kwargs)')
+
+    exec('\n'.join(lines), namespace)
+    return functools.update_wrapper(namespace['_nl_wrapper'], func)
+
+def fuse(*transformers: Callable) -> Callable:
+    """Gives a transformer applying the given transformers, outermost first as if stacked, with a single wrapper frame.
+
+    map_arguments, take_args_as_list, validate_args and validate_params are
+    inlined into one generated wrapper, and disabled validators are left out.
+    Any other transformer is applied as usual, between the fused runs either side of it.
+    """
+    def decorator(func: Callable) -> Callable:
+        stages = []
+
+        def flush(func: Callable) -> Callable:
+            fused = _fuse_stages(func, stages[::-1]) if stages else func
+            stages.clear()
+            return fused
+
+        # apply innermost first, gathering runs of fusable stages
+        for transformer in reversed(transformers):
+            stage = getattr(transformer, '_fusable_stage', None)
+            if stage is None:
+                func = transformer(flush(func))
+            elif not _is_enabled(stage[3]):
+                continue # a disabled validator
+            else:
+                stages.append(stage)
+        return flush(func)
+    return decorator
@@ -0,0 +1,229 @@
+"""Memoizing function transformers
+
+A memoize transformer which caches the results of a function by its
+arguments, with least recently used eviction, expiry after a time to
+live and limits on the total weight of what's cached.
+
+Unlike functools.lru_cache, the arguments may first be normalised by an
+argument mapping in the same form that map_arguments takes, and may be
+unhashable lists, dicts and sets, such as those given by
+take_args_as_list.
+
+Typical usage example:
+
+    @take_args_as_list()
+    @memoize(max_size=1024, ttl=60)
+    def total(nums: list[int]) -> int:
+        return sum(nums)
+
+    total(1, 2, 3)       # computed
+    total([1, 2, 3])     # cached, the same list argument
+    total.cache_info()   # {'hits': 1, 'misses': 1, ...}
+
+Given a coroutine function, memoize gives a coroutine function caching
+the awaited results, not the coroutines.
+"""
+from __future__ import annotations
+from typing import Any, Callable
+from collections import OrderedDict
+from concurrent.futures import Future
+import functools
+import inspect
+import threading
+import time
+import weakref
+from .arguments import _ArgMap
+
+_ATOMIC_TYPES = frozenset({int, float, complex, bool, str, bytes, type(None)})
+
+def _freeze(obj: Any) -> Any:
+    """Give a hashable equivalent of an object, recursing into lists, tuples, dicts and sets."""
+    if type(obj) in _ATOMIC_TYPES:
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return (type(obj), tuple([_freeze(item) for item in obj]))
+    if isinstance(obj, dict):
+        return (type(obj), frozenset([(key, _freeze(val)) for key, val in obj.items()]))
+    if isinstance(obj, (set, frozenset)):
+        return (frozenset, frozenset([_freeze(item) for item in obj]))
+    hash(obj) # anything else must already be hashable
+    return obj
+
+# separates the positional arguments of a key from the keyword ones, as in functools._make_key
+_KWD_MARK = object()
+
+_MISSING = object()
+
+def _make_key(args: tuple, kwargs: dict) -> Any:
+    key = args + (_KWD_MARK, *kwargs.items()) if kwargs else args
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return _freeze(key)
+
+class _Entry:
+    __slots__ = ('value', 'expires', 'weight')
+
+    def __init__(self, value: Any, expires: float|None, weight: float):
+        self.value = value
+        self.expires = expires
+        self.weight = weight
+
+def memoize(max_size: int|None = 128, ttl: float|None = None, max_weight: float|None = None,
+            weigh: Callable[[Any], float]|None = None, arg_transform: _ArgMap|None = None,
+            single_flight: bool = False) -> Callable:
+    """Gives a transformer whose output functions cache their results by their arguments.
+
+    At most max_size results are kept, evicting the least recently used (None for
+    no limit). Results expire ttl seconds after being computed. When max_weight is
+    given, weigh(result) gives the weight of each result, by default 1, and the total
+    weight kept is at most max_weight, so a single result heavier than that isn't
+    kept at all. The arguments are first mapped by arg_transform, as map_arguments
+    does, and the mapped arguments are both the cache key and what the function is
+    called with. With single_flight, concurrent calls missing the cache with the
+    same arguments wait for the first of them, rather than all computing the result.
+
+    The output function has cache_info() giving its hits, misses, evictions and
+    expirations along with its size and weight, and cache_clear() emptying it.
+    A coroutine function's results are cached once awaited, and with
+    single_flight concurrent calls in an event loop await one shared task.
+    """
+    if max_size is not None and max_size < 0:
+        raise ValueError(f"Expected a non-negative max_size, got {max_size}")
+
+    def decorator(func: Callable) -> Callable:
+        lock = threading.Lock()
+        cache: OrderedDict[Any, _Entry] = OrderedDict()
+        in_flight: dict[Any, Future] = {}
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        total_weight = 0.0
+
+        def remove(key: Any):
+            nonlocal total_weight
+            total_weight -= cache.pop(key).weight
+
+        def store(key: Any, value: Any):
+            nonlocal total_weight
+            weight = weigh(value) if weigh is not None else 1
+            if (max_weight is not None and weight > max_weight) or max_size == 0:
+                return
+
+            expires = time.monotonic() + ttl if ttl is not None else None
+            with lock:
+                if key in cache:
+                    remove(key)
+                cache[key] = _Entry(value, expires, weight)
+                total_weight += weight
+
+                # evict the least recently used until within limits
+                while (max_size is not None and len(cache) > max_size) or (max_weight is not None and total_weight > max_weight):
+                    remove(next(iter(cache)))
+                    stats['evictions'] += 1
+
+        def cache_info() -> dict[str, Any]:
+            with lock:
+                return {**stats, 'size': len(cache), 'weight': total_weight, 'max_size': max_size, 'max_weight': max_weight}
+
+        def cache_clear():
+            nonlocal total_weight
+            with lock:
+                cache.clear()
+                total_weight = 0.0
+                for name in stats:
+                    stats[name] = 0
+
+        if inspect.iscoroutinefunction(func):
+            import asyncio # loaded with the first memoized coroutine function rather than with the module
+            tasks: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[Any, asyncio.Task]] = weakref.WeakKeyDictionary()
+
+            def lookup(key: Any) -> Any:
+                with lock:
+                    if (entry := cache.get(key)) is not None:
+                        if entry.expires is None or entry.expires > time.monotonic():
+                            cache.move_to_end(key)
+                            stats['hits'] += 1
+                            return entry.value
+                        remove(key)
+                        stats['expirations'] += 1
+                    stats['misses'] += 1
+                    return _MISSING
+
+            async def compute(key: Any, args: tuple, kwargs: dict) -> Any:
+                value = await func(*args, **kwargs)
+                store(key, value)
+                return value
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if arg_transform is not None:
+                    args, kwargs = arg_transform(*args, **kwargs)
+                key = _make_key(args, kwargs)
+                if (value := lookup(key)) is not _MISSING:
+                    return value
+                if not single_flight:
+                    return await compute(key, args, kwargs)
+
+                # tasks are bound to their loop, so calls only share one with calls in the same loop
+                loop = asyncio.get_running_loop()
+                with lock:
+                    flights = tasks.setdefault(loop, {})
+                if (task := flights.get(key)) is None:
+                    task = flights[key] = loop.create_task(compute(key, args, kwargs))
+                    task.add_done_callback(lambda _: flights.pop(key, None))
+                # shielded, so one waiter being cancelled doesn't cancel it for the others
+                return await asyncio.shield(task)
+
+            async_wrapper.cache_info = cache_info
+            async_wrapper.cache_clear = cache_clear
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if arg_transform is not None:
+                args, kwargs = arg_transform(*args, **kwargs)
+            key = _make_key(args, kwargs)
+
+            with lock:
+                # the lookup is inlined, as a hit is the path worth keeping short
+                if (entry := cache.get(key)) is not None:
+                    if entry.expires is None or entry.expires > time.monotonic():
+                        cache.move_to_end(key)
+                        stats['hits'] += 1
+                        return entry.value
+                    remove(key)
+                    stats['expirations'] += 1
+                stats['misses'] += 1
+
+                leader = True
+                if single_flight:
+                    if (future := in_flight.get(key)) is not None:
+                        leader = False
+                    else:
+                        future = in_flight[key] = Future()
+
+            if not single_flight:
+                value = func(*args, **kwargs)
+                store(key, value)
+                return value
+
+            if not leader: # another caller is computing it
+                return future.result()
+
+            try:
+                value = func(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                store(key, value)
+                future.set_result(value)
+                return value
+            finally:
+                with lock:
+                    del in_flight[key]
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
@@ -0,0 +1,280 @@
+"""Call governing function transformers
+
+Transformers which govern when and how often the functions they give
+are allowed to run: limited in total calls, limited in rate, limited in
+concurrency, run once only, or coalesced into batches. Each is safe to
+use from many threads, and given a coroutine function gives a coroutine
+function governed the same way for asyncio.
+
+Typical usage example:
+
+    @once()
+    def load_model():
+        return expensive_initialisation()
+
+    @rate_limit(10, burst=5) # at most 10 calls per second, 5 at once
+    def query(q):
+        return backend.query(q)
+
+    @max_concurrency(4)
+    async def fetch(url):
+        return await session.get(url)
+
+    @coalesce(max_size=100, window=0.002)
+    async def get_user(ids: list[int]) -> list[User]:
+        return await store.get_many(ids)
+
+    await get_user(1) # sent to the store with the other ids asked for within 2 ms
+
+"""
+from __future__ import annotations
+from typing import Any, Callable
+import asyncio
+import functools
+import inspect
+import threading
+import time
+import weakref
+
+_REJECT = lambda *args, **kwargs: None
+
+async def _call_then(then: Callable, *args, **kwargs) -> Any:
+    """Call then from a coroutine function, awaiting its result if it's a coroutine function too."""
+    result = then(*args, **kwargs)
+    return await result if inspect.isawaitable(result) else result
+
+def rate_limit(calls_per_second: float, burst: int = 1, block: bool = True, then: Callable = _REJECT) -> Callable:
+    """Gives a transformer whose output functions run at most calls_per_second times per second, by a token bucket holding up to burst calls.
+
+    When no call is available, a blocking function waits its turn (sleeping, or
+    awaiting asyncio.sleep for coroutine functions), otherwise the call goes to then.
+    """
+    if calls_per_second <= 0 or burst < 1:
+        raise ValueError("Expected a positive rate and a burst of at least 1")
+
+    def decorator(func: Callable) -> Callable:
+        lock = threading.Lock()
+        tokens = float(burst)
+        last = time.monotonic()
+
+        def acquire() -> float|None:
+            """Take a call, giving how long to wait before making it, or None if it was refused."""
+            nonlocal tokens, last
+            with lock:
+                now = time.monotonic()
+                tokens = min(burst, tokens + (now - last) * calls_per_second)
+                last = now
+                if tokens >= 1:
+                    tokens -= 1
+                    return 0.0
+                if not block:
+                    return None
+                # reserve the next token, so that waiting callers are served in order
+                tokens -= 1
+                return -tokens / calls_per_second
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if (wait := acquire()) is None:
+                    return await _call_then(then, *args, **kwargs)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if (wait := acquire()) is None:
+                return then(*args, **kwargs)
+            if wait > 0:
+                time.sleep(wait)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def max_concurrency(limit: int, block: bool = True, then: Callable = _REJECT) -> Callable:
+    """Gives a transformer whose output functions have at most limit calls running at any one time.
+
+    When the limit is reached, a blocking function waits for a running call to
+    finish, otherwise the call goes to then. Functions are limited across threads,
+    and coroutine functions across the tasks of an event loop.
+    """
+    if limit < 1:
+        raise ValueError(f"Expected a limit of at least 1, got {limit}")
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            # a semaphore is bound to the loop it's first used in, so each loop has its own
+            semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+            lock = threading.Lock() # only guards the mapping
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                loop = asyncio.get_running_loop()
+                if (semaphore := semaphores.get(loop)) is None:
+                    with lock:
+                        semaphore = semaphores.setdefault(loop, asyncio.Semaphore(limit))
+                if not block and semaphore.locked():
+                    return await _call_then(then, *args, **kwargs)
+                async with semaphore:
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        # a counter under a lock, rather than a threading.Semaphore, keeps the uncontended path to taking
+        # the lock once each way, with the condition only used when callers are waiting
+        lock = threading.Lock()
+        condition = threading.Condition(lock)
+        available = limit
+        waiting = 0
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal available, waiting
+            with lock:
+                if available == 0 and not block:
+                    acquired = False
+                else:
+                    waiting += 1
+                    while available == 0:
+                        condition.wait()
+                    waiting -= 1
+                    available -= 1
+                    acquired = True
+
+            if not acquired:
+                return then(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with lock:
+                    available += 1
+                    if waiting:
+                        condition.notify()
+        return wrapper
+    return decorator
+
+def once() -> Callable:
+    """Gives a transformer whose output functions run only the first time they're called, every later call gives the first call's result.
+
+    Callers arriving while the first call is running wait for its result rather
+    than running it again. If it raises, the error is raised to its caller and
+    the next call tries again. Once the result is settled, calls return it
+    without taking any lock.
+    """
+    def decorator(func: Callable) -> Callable:
+        done = False
+        result = None
+
+        if inspect.iscoroutinefunction(func):
+            task = None
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                nonlocal done, result, task
+                if done:
+                    return result
+                if task is None:
+                    task = asyncio.ensure_future(func(*args, **kwargs))
+                current = task
+                try:
+                    # shielded, so one waiter being cancelled doesn't cancel it for the others
+                    value = await asyncio.shield(current)
+                except BaseException:
+                    if current.done() and task is current: # failed, so let the next call try again
+                        task = None
+                    raise
+                result, done = value, True
+                return value
+            return async_wrapper
+
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal done, result
+            if done:
+                return result
+            with lock:
+                if not done:
+                    result = func(*args, **kwargs)
+                    done = True
+            return result
+        return wrapper
+    return decorator
+
+class _Batch:
+    """The calls of a coalesced function waiting in one event loop for their batch to be sent."""
+    __slots__ = ('items', 'futures', 'timer')
+
+    def __init__(self):
+        self.items = []
+        self.futures = []
+        self.timer = None
+
+def coalesce(max_size: int = 64, window: float = 0.001) -> Callable:
+    """Gives a transformer whose output coroutine functions take one item each, and collect the items of concurrent calls into one call of the function.
+
+    The function takes a list of items and gives a list of their results in the
+    same order, the convention of take_args_as_list, and may be a coroutine
+    function or a plain function. A batch is sent once it holds max_size items,
+    or window seconds after its first call, and each caller is given its own
+    result, or the error the batch raised. Batches are collected per event loop.
+
+    A call cancelled while waiting is still sent with its batch, but isn't
+    given the result.
+    """
+    if max_size < 1 or window < 0:
+        raise ValueError("Expected a max_size of at least 1 and a window of at least 0")
+
+    def decorator(func: Callable) -> Callable:
+        is_async = inspect.iscoroutinefunction(func)
+        batches: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Batch] = weakref.WeakKeyDictionary()
+        lock = threading.Lock() # only guards the mapping, each batch is only touched by its own loop
+        sending = set() # the loop only keeps weak references to tasks
+
+        async def send(items: list, futures: list[asyncio.Future]):
+            try:
+                results = await func(items) if is_async else func(items)
+                results = list(results)
+                if len(results) != len(items):
+                    raise ValueError(f"{func.__qualname__} gave {len(results)} results for a batch of {len(items)}")
+            except asyncio.CancelledError:
+                for future in futures:
+                    future.cancel()
+                raise
+            except Exception as error:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+            for future, result in zip(futures, results):
+                if not future.done():
+                    future.set_result(result)
+
+        def flush(loop: asyncio.AbstractEventLoop):
+            batch = batches[loop]
+            if batch.timer is not None:
+                batch.timer.cancel()
+            batches[loop] = _Batch()
+            task = loop.create_task(send(batch.items, batch.futures))
+            sending.add(task)
+            task.add_done_callback(sending.discard)
+
+        @functools.wraps(func)
+        async def async_wrapper(item):
+            loop = asyncio.get_running_loop()
+            if (batch := batches.get(loop)) is None:
+                with lock:
+                    batch = batches.setdefault(loop, _Batch())
+
+            future = loop.create_future()
+            batch.items.append(item)
+            batch.futures.append(future)
+            if len(batch.items) >= max_size:
+                flush(loop)
+            elif batch.timer is None:
+                batch.timer = loop.call_later(window, flush, loop)
+            return await future
+        return async_wrapper
+    return decorator
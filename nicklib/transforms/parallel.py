@@ -0,0 +1,200 @@
+"""Parallel mapping function transformers
+
+A transformer turning a function of one item into a parallel map over
+many items, run on a pool of threads for I/O bound work or of processes
+for CPU bound work. Items are read from the input only as workers become
+free, and results are streamed back, so inputs larger than memory can be
+mapped.
+
+The output function takes its items the way take_args_as_list gives
+them: as separate arguments, or as one list (or range, or iterator).
+Coroutine functions are refused with a TypeError, as the workers have no
+event loop to run them on.
+
+Typical usage example:
+
+    @parallel_map(pool='process')
+    def simulate(seed: int) -> float:
+        ...
+
+    for result in simulate(range(1_000_000)):
+        ...
+
+    @parallel_map(workers=32, ordered=False, errors='capture')
+    def fetch(url: str) -> bytes:
+        ...
+
+    for i, page in fetch(urls):
+        if isinstance(page, Exception):
+            ... # urls[i] failed, the rest carry on
+"""
+from __future__ import annotations
+from typing import Any, Callable, Literal
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+import functools
+import importlib
+import inspect
+import itertools
+import os
+import time
+
+_TARGET_CHUNK_SECONDS = 0.02 # automatic chunks aim to take about this long
+_MAX_CHUNK_SIZE = 4096
+
+def _resolve(module: str, qualname: str) -> Callable:
+    """Find the function a parallel_map output function at module level wraps."""
+    obj = _lookup(module, qualname)
+    while not hasattr(obj, '_parallel_map_func'):
+        obj = obj.__wrapped__
+    return obj._parallel_map_func
+
+class _ByName:
+    """A function pickled by the name of the module level output function wrapping it.
+
+    Decorating a module level function replaces it by name, so it can't be
+    pickled for a process pool as it is.
+    """
+    def __init__(self, func: Callable):
+        self.func = func
+
+    def __reduce__(self):
+        return (_resolve, (self.func.__module__, self.func.__qualname__))
+
+def _run_chunk(func: Callable, args: tuple, kwargs: dict, chunk: list, capture: bool) -> tuple[list, float]:
+    """Call func on each item of a chunk, giving the results and how long they took."""
+    start = time.perf_counter()
+    if not capture:
+        results = [func(*args, item, **kwargs) for item in chunk]
+    else:
+        results = []
+        for item in chunk:
+            try:
+                results.append(func(*args, item, **kwargs))
+            except Exception as e:
+                results.append(e)
+    return results, time.perf_counter() - start
+
+def _items(args: tuple) -> Iterator:
+    # a single list, range or iterator is the items, as take_args_as_list takes a single list
+    if len(args) == 1 and (type(args[0]) in (list, range) or isinstance(args[0], Iterator)):
+        return iter(args[0])
+    return iter(args)
+
+def parallel_map(pool: Literal['thread', 'process']|Executor = 'thread', workers: int|None = None, chunk_size: int|None = None,
+                 ordered: bool = True, max_in_flight: int|None = None, errors: Literal['raise', 'capture'] = 'raise', pos: int = 0) -> Callable:
+    """Gives a transformer whose output functions map the input function over their items in parallel, giving a generator of the results.
+
+    The work runs on a new thread or process pool of workers (by default the
+    number of CPUs), or on an existing executor. Items are sent in chunks of
+    chunk_size, or when None, of a size adapted as results come back to keep
+    each chunk around 20ms. At most max_in_flight chunks (by default twice the
+    workers) are pending at once, and items are only read from the input to
+    refill them.
+
+    When ordered, results are given in the order of their items, otherwise
+    (index, result) pairs are given as they complete. With errors='raise' the
+    first error is raised from the generator, with errors='capture' each
+    failed item's exception is given in place of its result.
+
+    As with take_args_as_list, the first pos arguments are passed to every call
+    ahead of the item, and keyword arguments are passed to every call.
+    """
+    if errors not in ('raise', 'capture'):
+        raise ValueError(f"Expected errors to be 'raise' or 'capture', got {errors!r}")
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            raise TypeError(f"parallel_map can't run the coroutine function {func.__qualname__} on a pool")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return _parallel_map(func, args[:pos], kwargs, _items(args[pos:]))
+        wrapper._parallel_map_func = func
+
+        def _parallel_map(func: Callable, args: tuple, kwargs: dict, items: Iterator) -> Iterator:
+            n_workers = workers or getattr(pool, '_max_workers', None) or os.cpu_count() or 1
+            in_flight_limit = max_in_flight or 2 * n_workers
+            capture = errors == 'capture'
+
+            if isinstance(pool, Executor):
+                executor, owned = pool, False
+            elif pool == 'thread':
+                executor, owned = ThreadPoolExecutor(n_workers), True
+            elif pool == 'process':
+                executor, owned = ProcessPoolExecutor(n_workers), True
+                if not _is_picklable_by_name(func):
+                    func = _ByName(func)
+            else:
+                raise ValueError(f"Expected pool to be 'thread', 'process' or an Executor, got {pool!r}")
+
+            size = chunk_size or 1
+            index = 0
+            pending: deque[tuple[int, Future]]|dict[Future, int] = deque() if ordered else {}
+
+            def submit() -> bool:
+                """Submit the next chunk of items, giving whether there were any."""
+                nonlocal index
+                chunk = list(itertools.islice(items, size))
+                if not chunk:
+                    return False
+                future = executor.submit(_run_chunk, func, args, kwargs, chunk, capture)
+                if ordered:
+                    pending.append((index, future))
+                else:
+                    pending[future] = index
+                index += len(chunk)
+                return True
+
+            def adapt(results: list, elapsed: float):
+                """Size the next chunks by how long this one took per item."""
+                nonlocal size
+                if chunk_size is None and results:
+                    per_item = max(elapsed / len(results), 1e-9)
+                    size = max(1, min(_MAX_CHUNK_SIZE, int(_TARGET_CHUNK_SECONDS / per_item)))
+
+            try:
+                exhausted = False
+                while True:
+                    while not exhausted and len(pending) < in_flight_limit:
+                        exhausted = not submit()
+                    if not pending:
+                        return
+
+                    if ordered:
+                        start, future = pending.popleft()
+                        done = [(start, future)]
+                    else:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        done = [(pending.pop(future), future) for future in finished]
+
+                    for start, future in done:
+                        results, elapsed = future.result()
+                        adapt(results, elapsed)
+                        if ordered:
+                            yield from results
+                        else:
+                            yield from zip(itertools.count(start), results)
+            finally:
+                futures = pending if not ordered else [future for _, future in pending]
+                for future in futures:
+                    future.cancel()
+                if owned:
+                    executor.shutdown(wait=True, cancel_futures=True)
+
+        return wrapper
+    return decorator
+
+def _is_picklable_by_name(func: Callable) -> bool:
+    """Whether pickle finds func itself by its name, rather than some other object (like a wrapper) or nothing."""
+    try:
+        return _lookup(func.__module__, func.__qualname__) is func
+    except (AttributeError, ImportError):
+        return False
+
+def _lookup(module: str, qualname: str) -> Any:
+    obj = importlib.import_module(module)
+    for name in qualname.split('.'):
+        obj = getattr(obj, name)
+    return obj
@@ -7,192 +7,304 @@ Alternative names: FieldTuple, Field, Mutple
 """
 
 from __future__ import annotations
-from typing import Any
-from collections.abc import Mapping
-from dataclasses import dataclass, field, fields, MISSING, make_dataclass
-import functools
-import io
-import unittest
+from typing import Any, Callable
+from operator import attrgetter
+
+# the tuple base's own accessors, used by slots storage since TupleClass overrides them
+_tuple_new = tuple.__new__
+_tuple_getitem = tuple.__getitem__
+
+try: # the C accessor namedtuple fields use
+    from collections import _tuplegetter
+except ImportError:
+    from operator import itemgetter as _itemgetter
+    _tuplegetter = lambda index, doc: property(_itemgetter(index), doc=doc)
+
+# the descriptors that take the place of fields, so aren't their defaults
+_FIELD_DESCRIPTORS = (property, type(_tuplegetter(0, None)))
+
+# methods frozen classes take from tuple as they are, since the values are the tuple's own items
+_TUPLE_METHODS = ('__getitem__', '__iter__', '__len__', '__contains__', '__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__')
+
+# methods generated for frozen classes only, along with those in _GENERATED_METHODS
+_FROZEN_METHODS = ('__setattr__', '__delattr__', '__hash__', '__getstate__')
+
+# methods that the metaclass generates for each class, unless the class defines its own
+_GENERATED_METHODS = (
+    '__new__', '__init__', '__getitem__', '__setitem__', '__iter__', '__len__', '__contains__',
+    '__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__',
+    '__repr__', '__str__', '__getnewargs__',
+)
+
+def _make_slot_property(index: int) -> property:
+    def getter(_self):
+        return _tuple_getitem(_self, 0)[index]
+    def setter(_self, value):
+        _tuple_getitem(_self, 0)[index] = value
+
+    return property(getter, setter)
+
+def _make_methods(cls_name: str, fields: tuple[str, ...], defaults: dict[str, Any], slots: bool, custom_storage: bool,
+                  frozen: bool = False, intern: dict|None = None, cache_hash: bool = False) -> dict[str, Callable]:
+    """Generate the source of the tuple emulating methods for a field layout and compile them, like collections.namedtuple does.
+
+    With slots storage, the field values are kept in a list held as the only item 
+    of the underlying tuple. Classes with custom_storage define their own __iter__, 
+    so their values are read through it rather than through the fields. Frozen
+    classes keep the values as the items of the tuple itself, as namedtuple does,
+    so use tuple's own methods, and are constructed through the intern table
+    when given one.
+    """
+    n = len(fields)
+    params = ''.join(f', {name}=_d_{name}' for name in fields)
+    attrs = ''.join(f'self.{name}, ' for name in fields)
+
+    # an expression giving all of the values of self and of another instance of the same class,
+    # along with the constructor of that expression's type for converting any other iterable
+    if custom_storage or frozen:
+        values, other_values, seq = 'tuple(self)', 'tuple(other)', 'tuple'
+    elif slots:
+        values, other_values, seq = '_tuple_getitem(self, 0)', '_tuple_getitem(other, 0)', 'list'
+    else:
+        values, other_values, seq = f'({attrs})', f'({attrs.replace("self.", "other.")})', 'tuple'
+
+    source = []
+    if frozen:
+        new = f'_tuple_new(_cls, ({"".join(f"{name}, " for name in fields)}))'
+        if intern is not None: # an equal record already made is given instead
+            source.append(f'def __new__(_cls{params}):\n'
+                          f'    self = {new}\n'
+                          f'    return _interned.setdefault(self, self)\n')
+        else:
+            source.append(f'def __new__(_cls{params}):\n'
+                          f'    return {new}\n')
+        source.append('def __setitem__(self, key, value):\n'
+                      f'    raise TypeError("{cls_name} is frozen, so its items can\'t be assigned")\n')
+        source.append('def __setattr__(self, name, value):\n'
+                      f'    raise AttributeError(f"{cls_name} is frozen, so can\'t set attribute \'{{name}}\'")\n')
+        source.append('def __delattr__(self, name):\n'
+                      f'    raise AttributeError(f"{cls_name} is frozen, so can\'t delete attribute \'{{name}}\'")\n')
+        if cache_hash: # kept in the instance __dict__, and checked before comparing the values
+            source.append('def __hash__(self):\n'
+                          '    try:\n'
+                          '        return self._TupleClass_hash\n'
+                          '    except AttributeError:\n'
+                          '        h = _tuple_hash(self)\n'
+                          '        _object_setattr(self, "_TupleClass_hash", h)\n'
+                          '        return h\n')
+            source.append('def __eq__(self, other):\n'
+                          '    if self is other:\n'
+                          '        return True\n'
+                          '    if other.__class__ is self.__class__ and self.__hash__() != other.__hash__():\n'
+                          '        return False\n'
+                          '    return _tuple_eq(self, other)\n')
+            source.append('def __ne__(self, other):\n'
+                          '    result = self.__eq__(other)\n'
+                          '    return result if result is NotImplemented else not result\n')
+            source.append('def __getstate__(self):\n' # the hash of a str differs between processes, so isn't pickled
+                          '    return None\n')
+    elif slots:
+        source.append(f'def __new__(_cls{params}):\n'
+                      f'    return _tuple_new(_cls, ([{", ".join(fields)}],))\n')
+    else: # the fields are held by the instance's __dict__, so the underlying tuple is left empty
+        source.append('def __new__(_cls, *args, **kwargs):\n'
+                      '    return _tuple_new(_cls)\n')
+        body = ''.join(f'    self.{name} = {name}\n' for name in fields) or '    pass\n'
+        source.append(f'def __init__(self{params}):\n{body}')
+
+    if frozen: # the tuple's own accessors are used
+        pass
+    elif slots:
+        source.append('def __getitem__(self, key):\n'
+                      '    if key.__class__ is slice:\n'
+                      '        return tuple(_tuple_getitem(self, 0)[key])\n'
+                      '    return _tuple_getitem(self, 0)[key]\n')
+        source.append('def __setitem__(self, key, value):\n'
+                      '    _tuple_getitem(self, 0)[key] = value\n')
+        source.append('def __iter__(self):\n'
+                      '    return iter(_tuple_getitem(self, 0))\n')
+    else:
+        source.append('def __getitem__(self, key):\n'
+                      '    if key.__class__ is slice:\n'
+                      f'        return ({attrs})[key]\n'
+                      '    return _getters[key](self)\n')
+        source.append('def __setitem__(self, key, value):\n'
+                      '    setattr(self, _fields[key], value)\n')
+        source.append('def __iter__(self):\n'
+                      f'    return iter(({attrs}))\n')
+
+    source.append(f'def __len__(self):\n'
+                  f'    return {n}\n')
+    source.append(f'def __contains__(self, value):\n'
+                  f'    return value in {values}\n')
+
+    # comparisons are between the values of each, like they would be for tuples
+    for name, op in (('__eq__', '=='), ('__ne__', '!='), ('__lt__', '<'), ('__le__', '<='), ('__gt__', '>'), ('__ge__', '>=')):
+        source.append(f'def {name}(self, other):\n'
+                      f'    if other.__class__ is self.__class__:\n'
+                      f'        return {values} {op} {other_values}\n'
+                      f'    try:\n'
+                      f'        other = {seq}(other)\n'
+                      f'    except TypeError:\n'
+                      f'        return NotImplemented\n'
+                      f'    return {values} {op} other\n')
+
+    as_tuple = values if seq == 'tuple' else f'tuple({values})'
+    source.append(f'def __repr__(self):\n'
+                  f'    return self.__class__.__name__ + _repr_fmt % {as_tuple}\n')
+    source.append(f'def __str__(self):\n'
+                  f'    return self.__class__.__name__ + str({as_tuple})\n')
+    source.append(f'def __getnewargs__(self):\n'
+                  f'    return {as_tuple}\n')
+
+    namespace = {
+        '_tuple_new': _tuple_new,
+        '_tuple_getitem': _tuple_getitem,
+        '_tuple_hash': tuple.__hash__,
+        '_tuple_eq': tuple.__eq__,
+        '_object_setattr': object.__setattr__,
+        '_interned': intern,
+        '_fields': fields,
+        '_getters': tuple(attrgetter(name) for name in fields),
+        '_repr_fmt': '(' + ', '.join(f'{name}=%r' for name in fields) + ')',
+        **{f'_d_{name}': default for name, default in defaults.items()},
+    }
+    exec('\n'.join(source), namespace)
+
+    methods = {name: namespace[name] for name in _GENERATED_METHODS if name in namespace}
+    for name, method in methods.items():
+        method.__qualname__ = f'{cls_name}.{name}'
+    if slots or frozen: # nothing is left to initialise after __new__
+        methods['__init__'] = object.__init__
+    if frozen:
+        # the C methods of tuple, rather than python functions reading the tuple,
+        # except for the equality checking the cached hashes first
+        for name in _TUPLE_METHODS:
+            if not (cache_hash and name in ('__eq__', '__ne__')):
+                methods[name] = getattr(tuple, name)
+        if not cache_hash:
+            methods['__hash__'] = tuple.__hash__
+        for name in _FROZEN_METHODS:
+            if name in namespace:
+                methods[name] = namespace[name]
+                methods[name].__qualname__ = f'{cls_name}.{name}'
+    return methods
 
 class _TupleClassMeta(type):
-    """The metaclass of TupleClass (see below for TupleClass)"""
-    def __new__(cls, name, bases, dct):
-        annotations = dct.get('__annotations__', {})
-        new_cls = make_dataclass(name, [(name, typ, field(default=MISSING)) for name, typ in annotations.items()], bases=bases) # pass tuple superclass in here in bases
-        new_cls.__module__ = dct.get('__module__')
-        for key, value in dct.items():
-            if key != '__annotations__':
-                setattr(new_cls, key, value)
-
-        # don't actually use the tuple superclass's __new__
-        # TODO if superclass is a subclass of TupleClass, then make smart 
-        # constructor chain
-        original_new = new_cls.__new__
-        def __new__(cls, *args, **kwargs):
-            instance = original_new(cls, tuple(args)) # convert args to tuple
-            for name, value in zip([f.name for f in fields(cls)], args):
-                setattr(instance, name, value)
-            for name, value in kwargs.items():
-                setattr(instance, name, value)
-            return instance
-        setattr(new_cls, '__new__', __new__)
-
-        # add an __iter__ method to enable emulated tuple unpacking
-        def __iter__(self):
-            field_names = list(self.__annotations__.keys())
-            for f in field_names:
-                yield getattr(self, f)
-        setattr(new_cls, '__iter__', __iter__)
-
-        # pseudo-tuple index access
-        def __getitem__(self, key: int) -> Any:
-            return getattr(self, list(self.__annotations__.keys())[key])
-        setattr(new_cls, '__getitem__', __getitem__)
-
-        # pseudo-tuple index set
-        def __setitem__(self, key: int, val: Any):
-            setattr(self, list(self.__annotations__.keys())[key], val)
-        setattr(new_cls, '__setitem__', __setitem__)
-
-        # pretty tuple print
-        def __str__(self):
-            return self.__class__.__name__ + str(tuple(self))
-        setattr(new_cls, '__str__', __str__)        
-
-        # TODO: __repr__ that prints also the field names
-
-        return new_cls
-
-@functools.total_ordering
+    """The metaclass of TupleClass (see below for TupleClass)
+
+    Computes the field layout of each class once, including inherited fields,
+    then generates the constructor and tuple emulating methods specialised 
+    to that layout.
+    """
+    def __new__(mcls, name, bases, dct, slots: bool = False, frozen: bool = False, intern: bool = False, cache_hash: bool = False):
+        # like slots storage, frozenness and its options are inherited
+        def inherited(option: str) -> bool:
+            return any(getattr(base, f'_TupleClass_{option}', False) for base in bases)
+        intern = intern or inherited('intern')
+        cache_hash = cache_hash or inherited('cache_hash')
+        frozen = frozen or intern or cache_hash or inherited('frozen')
+
+        # slots storage is inherited, every class in the hierarchy must declare 
+        # empty __slots__ for instances to be without a __dict__, which frozen
+        # classes are too unless they keep a cached hash in it
+        slots = slots or inherited('slots')
+        if (slots or frozen) and not cache_hash and '__slots__' not in dct:
+            dct['__slots__'] = ()
+
+        cls = super().__new__(mcls, name, bases, dct)
+
+        # inherited fields come first, in the order of their definition
+        fields = []
+        for base in reversed(cls.__mro__[1:]):
+            if isinstance(base, _TupleClassMeta):
+                fields.extend(f for f in base._TupleClass_fields if f not in fields)
+        fields.extend(f for f in dct.get('__annotations__', {}) if f not in fields)
+        fields = tuple(fields)
+
+        # a field's default is the class attribute of the same name, if any
+        defaults = {}
+        for f in fields:
+            for owner in cls.__mro__:
+                if f in owner.__dict__:
+                    default = owner.__dict__[f]
+                    if isinstance(default, _FIELD_DESCRIPTORS): # replaced by storage, so its default was recorded
+                        default = getattr(owner, '_TupleClass_defaults', {}).get(f)
+                    defaults[f] = default
+                    break
+            else:
+                defaults[f] = None
+
+        # only (re)generate the methods that were generated for a base, never those defined by a class
+        def is_generated(method: str) -> bool:
+            for owner in cls.__mro__:
+                if method in owner.__dict__:
+                    if not isinstance(owner, _TupleClassMeta): # tuple's own
+                        return True
+                    return owner is not cls and method in owner._TupleClass_generated
+            return True
+
+        generated = [method for method in _GENERATED_METHODS if is_generated(method)]
+        custom_storage = '__iter__' not in generated
+        # each interning class has a table of its own, so a subclass's records are never given for its base's
+        interned = {} if intern else None
+        methods = _make_methods(name, fields, defaults, slots, custom_storage, frozen, interned, cache_hash)
+        if frozen:
+            generated.extend(m for m in _FROZEN_METHODS if m not in dct)
+
+        cls._TupleClass_fields = fields
+        cls._TupleClass_defaults = defaults
+        cls._TupleClass_slots = slots
+        cls._TupleClass_frozen = frozen
+        cls._TupleClass_intern = intern
+        cls._TupleClass_cache_hash = cache_hash
+        cls._TupleClass_interned = interned
+        cls._TupleClass_generated = frozenset(m for m in generated if m in methods)
+        for method in cls._TupleClass_generated:
+            setattr(cls, method, methods[method])
+
+        if frozen: # the values are the items of the tuple itself
+            for i, f in enumerate(fields):
+                setattr(cls, f, _tuplegetter(i, f'Alias for field number {i}'))
+        elif slots:
+            for i, f in enumerate(fields):
+                setattr(cls, f, _make_slot_property(i))
+
+        return cls
+
 class TupleClass(tuple, metaclass=_TupleClassMeta):
     """Mutable Named pseudo-Tuple.
 
-    Acts just like a regular NamedTuple and thus a normal tuple, but, is really a subclass of a dataclass instance. 
+    Acts just like a regular NamedTuple and thus a normal tuple, but its fields can be reassigned.
 
     Requires each specified field to be typed, since in Python, we can only determine dynamic fields via typed __annotations__.
+    Fields without a default are initialised to None.
+
+    Declaring a class with slots=True stores the fields without a per-instance __dict__:
+
+        class Point(TupleClass, slots=True):
+            x: int
+            y: int
+
+    Declaring a class with frozen=True makes its records immutable and hashable, 
+    so they can be used as dict keys and set members. They are stored like a 
+    NamedTuple, so are as fast to hash and compare as a tuple:
+
+        class Key(TupleClass, frozen=True):
+            user: str
+            day: int
+
+    intern=True also makes construction give the record already made for equal 
+    values, so that duplicates share one instance and compare by identity first. 
+    The records are kept in the class's _TupleClass_interned dict until it is 
+    cleared. Since the records are equal rather than identical, Key('a', 1.0)
+    may be given as Key('a', 1).
+
+    cache_hash=True computes each record's hash once and keeps it in a per-instance 
+    __dict__, then compares the hashes of records before their values. This only
+    pays off for records of many fields, or of fields that are slow to hash.
     """
+    __slots__ = ()
 
-    def __init__(self, *args, **kwargs):
-        # store all annotation names in their defined order
-        field_names = []
-
-        # check for inherited annotations
-        for base in self.__class__.__mro__[1:-3]:
-            field_names.extend(list(base.__annotations__.keys()))
-
-        # add all annotations defined in this class only
-        field_names.extend(list(self.__annotations__.keys()))
-        if len(args) > len(field_names):
-            raise TypeError(f"Expected at most {len(field_names)} arguments, got {len(args)}")
-
-        # set all default
-        for name in field_names:
-            if not hasattr(self, name): # perhaps a default was already provided
-                setattr(self, name, None)
-
-        for name, value in zip(field_names, args):
-            setattr(self, name, value)
-        for name, value in kwargs.items():
-            setattr(self, name, value)
-
-        setattr(self, '__TupleClass_field_names', field_names)
-
-    # allow tuple equivalence w/ total_ordering
-    def __eq__(self, other):
-        return tuple(self) == tuple(other)
-
-    def __lt__(self, other):
-        return tuple(self) < tuple(other)
-
-class TestTupleClass(unittest.TestCase):
-    def _make_dummy_TupleClass(self) -> type:
-        class Dummy(TupleClass):
-            x: int # no default
-            y: str = 'default'
-        
-        return Dummy
-
-    def test_tuple_behavior(self):
-        Dummy = self._make_dummy_TupleClass()
-            
-        # a Dummy is a subclass of tuple (not really, but python thinks so)
-        assert issubclass(Dummy, tuple)
-        
-        # a Dummy is a tuple
-        d = Dummy(10,'hi')
-        assert isinstance(d, tuple)
-        assert isinstance(d, Dummy)
-        assert d[0] == 10
-        assert d[1] == 'hi'
-        assert d == (10, 'hi')
-        assert list(d) == [10, 'hi']
-        assert len(d) == 2
-
-    def test_named_tuple_behavior(self):
-        Dummy = self._make_dummy_TupleClass() 
-
-        # a Dummy is a NamedTuple
-        d = Dummy(10,'hi')
-        assert d.x == 10
-        assert d.y == 'hi'
-
-        # a Dummy supports defaults
-        assert Dummy(10).y == 'default'
-
-        # correct constructor calling
-        assert Dummy(x=10,y='hi') == (10, 'hi')
-        assert Dummy(x=10) == (10, 'default')
-        assert Dummy(10,y='hi') == (10, 'hi')
-
-    def test_mutability(self):
-        d = self._make_dummy_TupleClass()(10,'hi')
-
-        d.x = 11
-        assert d.x == 11
-
-    def test_inheritance(self):
-        class A(TupleClass):
-            a: str = 'a'
-
-        class B(A):
-            b: str = 'b'
-
-        b = B()
-        assert b.a == 'a'
-        assert b.b == 'b'
-
-    def test_inheritance_no_defaults_a(self):
-        class A(TupleClass):
-            a: str
-
-        class B(A):
-            b: str = 'b'
-
-        b = B('a')
-        assert b.a == 'a'
-        assert b.b == 'b'
-
-    def test_inheritance_no_defaults_b(self):
-        class A(TupleClass):
-            a: str = 'a'
-
-        class B(A):
-            b: str
-
-        b = B('b')
-        assert b.a == 'b'
-        assert b.b == None
-
-    def test_inheritance_no_defaults_ab(self):
-        class A(TupleClass):
-            a: str
-
-        class B(A):
-            b: str
-
-        b = B('a', 'b')
-        assert b.a == 'a'
-        assert b.b == 'b'
-
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    # mutable, so unhashable
+    __hash__ = None
@@ -1,13 +1,10 @@
 from __future__ import annotations
-from typing import Union, Callable, Literal
+from typing import Any, Union, Callable, Literal
 from collections.abc import Sequence, Iterator
-import itertools
 import functools
-import operator
-import unittest
 from math import sqrt, atan2
 import numpy as np
-from tupleclass import TupleClass
+from .tupleclass import TupleClass
 
 def _make_property(index):
     def getter(_self):
@@ -29,6 +26,14 @@ class _ArrayClass(TupleClass):
 
     def __new__(cls, *args, **kwargs):
         new_cls = super().__new__(cls)
+        cls._install_properties()
+        return new_cls
+
+    @classmethod
+    def _install_properties(cls):
+        """Replace each annotated field of cls with a property onto _items, only once per class."""
+        if '_ArrayClass_properties_installed' in cls.__dict__:
+            return
 
         for i, key in enumerate(cls.__annotations__.keys()):
             default = getattr(cls, key, None)
@@ -38,7 +43,7 @@ class _ArrayClass(TupleClass):
 
                 setattr(cls, key, _make_property(i))
 
-        return new_cls
+        cls._ArrayClass_properties_installed = True
 
     def __init__(self, *args, **kwargs):
         # determine the type of the values
@@ -46,14 +51,27 @@ class _ArrayClass(TupleClass):
         if len(annotation_vals) > 0:
             dtype = annotation_vals[0]
             self._items = np.zeros(len(self.__annotations__), dtype=dtype)
-            super().__init__(*args, **kwargs)
+            if len(args) > len(self._items):
+                raise TypeError(f"Expected at most {len(self._items)} arguments, got {len(args)}")
 
             for name in self.__annotations__:
                 if (default := getattr(self.__class__, '_' + name + '_default', None)) != None:
                     setattr(self, name, default)
+
+            self._items[:len(args)] = args
+            for name, value in kwargs.items():
+                setattr(self, name, value)
         else:
             self._items = np.array(args, **kwargs)
 
+    @classmethod
+    def _from_items(cls, items: np.ndarray) -> _ArrayClass:
+        """Wrap an existing array as an instance of cls without copying it."""
+        instance = tuple.__new__(cls) # skips __init__, so no storage is allocated
+        cls._install_properties()
+        instance._items = items
+        return instance
+
     def __getitem__(self, idx: int) -> T:
         return self._items[idx]
 
@@ -69,44 +87,73 @@ class _ArrayClass(TupleClass):
     def __iter__(self) -> Iterator[T]:
         return iter(self.__tuple__())
 
+def _unwrap(other: Any) -> Any:
+    """Give the underlying array of a Vec or VecArray, anything else is left for numpy to broadcast."""
+    if isinstance(other, (_ArrayClass, VecArray)):
+        return other._items
+    return other
+
 class Vec(_ArrayClass):
+    """A numeric vector whose arithmetic runs directly on its underlying numpy array.
+
+    Scalars and sequences are broadcast against every element. Vecs also
+    take part in numpy ufuncs, so np.sqrt(v) gives a Vec, and the ufunc out
+    parameter can be used to write results into an existing Vec without
+    allocating, e.g. np.add(v, u, out=v). v.lazy() gives a lazily evaluated
+    expression instead, see VecExpr.
+    """
     @staticmethod
-    def _accept_expanded_other(f: Callable) -> Callable:
-        """Utility decorator that makes any method taking an 'other' object accept either a Vec of the same degree or a scalar"""
+    def _accept_expanded_other(f: Callable, in_place: bool = False) -> Callable:
+        """Utility decorator that makes any method taking an 'other' object accept either a Vec of the same degree, a sequence or a scalar"""
         @functools.wraps(f)
-        def _f(_self, *args, **kwargs) -> Any:
-            other = args[0]
-
-            if isinstance(other, Vec):
-                expanded_other = other
-            elif isinstance(other, Sequence):
-                expanded_other = _self.__class__(other)
-            else:
-                expanded_other = _self.__class__(*[other]*len(_self._items))
-
-            return f(_self, expanded_other, *args[1:], **kwargs)
+        def _f(_self, other, *args, **kwargs) -> Any:
+            if isinstance(other, _ArrayClass):
+                other = other._items
+            elif isinstance(other, VecArray): # let the VecArray's reflected operator broadcast over its rows
+                return NotImplemented
+            elif isinstance(other, VecExpr):
+                if not in_place: # let the expression's reflected operator extend it
+                    return NotImplemented
+                other = other.eval()._items
+
+            return f(_self, other, *args, **kwargs)
         return _f
 
-    @staticmethod
-    def _fmap(f: Callable[T,T]) -> Callable[T,Vec[T]]:
-        def _map(vec: Vec[T]) -> Vec[T]: 
-            return vec.__class__(*map(f, vec._items))
-        return _map
+    def lazy(self) -> VecExpr:
+        """Gives a lazily evaluated expression of this Vec, see VecExpr."""
+        return VecExpr(None, (self,), self)
 
-    @staticmethod
-    def _fmap2(f: Callable[T,T]) -> Callable[Vec[T],Callable[Vec[T],Vec[T]]]:
-        def _map2_1(vec1: Vec[T]) -> Vec[T]: 
-            def _map2_2(vec2: Vec[T]) -> Vec[T]: 
-                #return Vec([*itertools.starmap(f, zip(vec1._items, vec2._items))])
-                return vec1.__class__(*itertools.starmap(f, zip(vec1._items, vec2._items)))
-            return _map2_2
-        return _map2_1
+    @classmethod
+    def batch(cls, items: int|Sequence|np.ndarray) -> VecArray:
+        """Gives a VecArray of this Vec class, see VecArray."""
+        return VecArray(cls, items)
 
     def __repr__(self):
         return f"{self.__class__.__name__}({', '.join(map(str, self._items))})"
 
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return np.array(self._items, dtype=dtype, copy=copy)
+
+    def __array_ufunc__(self, ufunc: np.ufunc, method: str, *inputs, out=None, **kwargs) -> Any:
+        if any(isinstance(x, (VecArray, VecExpr)) for x in inputs):
+            return NotImplemented
+
+        inputs = tuple(map(_unwrap, inputs))
+        if out is not None:
+            kwargs['out'] = tuple(map(_unwrap, out))
+
+        result = getattr(ufunc, method)(*inputs, **kwargs)
+
+        if out is not None: # results were written in place, give back the given outputs
+            return out[0] if len(out) == 1 else out
+        if method != '__call__': # e.g. reductions, which aren't vectors anymore
+            return result
+        if isinstance(result, tuple):
+            return tuple(map(self._from_items, result))
+        return self._from_items(result)
+
     def magnitude(self) -> T:
-        return sqrt(sum(self**2))
+        return sqrt(np.dot(self._items, self._items))
 
     def direction(self) -> Vec[T]:
         return self / self.magnitude()
@@ -116,149 +163,617 @@ class Vec(_ArrayClass):
         return atan2(*self._items[:2])
 
     def __neg__(self) -> Vec[T]:
-        return self._fmap(operator.neg)(self)
+        return self._from_items(-self._items)
 
     @_accept_expanded_other
     def __add__(self, other: Vec) -> Vec[T]:
-        return self._fmap2(operator.add)(self)(other)
+        return self._from_items(self._items + other)
+
+    def __radd__(self, lhs: T) -> Vec[T]:
+        return self.__add__(lhs)
 
     @_accept_expanded_other
     def __sub__(self, other: Vec) -> Vec[T]:
-        return self._fmap2(operator.add)(self)(-other)
+        return self._from_items(self._items - other)
 
     @_accept_expanded_other
     def __mul__(self, other: Vec) -> Vec[T]:
-        return self._fmap2(operator.mul)(self)(other)
+        return self._from_items(self._items * other)
 
-    def __rmul__(self, lhs: T) -> T:
+    def __rmul__(self, lhs: T) -> Vec[T]:
         return self.__mul__(lhs)
 
-    def __imul__(self, other: Vec) -> Vec[T]:
-        self._items = self.__mul__(other)._items
+    @_accept_expanded_other
+    def __truediv__(self, rhs: T) -> Vec[T]:
+        return self._from_items(self._items / rhs)
+
+    @_accept_expanded_other
+    def __pow__(self, p: int) -> Vec[T]:
+        return self._from_items(self._items ** p)
+
+    def _in_place(self, ufunc: np.ufunc, other: Any) -> Vec[T]:
+        """Apply a ufunc in place, writing into the existing buffer.
+
+        When the result needs a wider dtype (e.g. an int Vec += 0.5) the buffer is
+        replaced, unless it's a view of another, such as a row of a VecArray, which
+        replacing would silently detach it from, so raises a TypeError instead.
+        """
+        try:
+            ufunc(self._items, other, out=self._items)
+        except TypeError:
+            if self._items.base is not None:
+                raise TypeError(f"Can't widen {self!r}, a view of another array such as a row of a VecArray, "
+                                f"to the {ufunc.__name__} result's dtype in place") from None
+            self._items = ufunc(self._items, other)
         return self
 
-    def __truediv__(self, rhs: T) -> T:
-        return self._fmap(lambda lhs: lhs / rhs)(self)
+    @functools.partial(_accept_expanded_other, in_place=True)
+    def __iadd__(self, other: Vec) -> Vec[T]:
+        return self._in_place(np.add, other)
 
-    def __pow__(self, p: int) -> float:
-        return self._fmap(lambda x: x**p)(self)
+    @functools.partial(_accept_expanded_other, in_place=True)
+    def __isub__(self, other: Vec) -> Vec[T]:
+        return self._in_place(np.subtract, other)
 
-    @_accept_expanded_other
-    def __iadd__(self, other: Vec):
-        self._items = self.__add__(other)._items
-        return self
+    @functools.partial(_accept_expanded_other, in_place=True)
+    def __imul__(self, other: Vec) -> Vec[T]:
+        return self._in_place(np.multiply, other)
 
+    @functools.partial(_accept_expanded_other, in_place=True)
+    def __itruediv__(self, other: Vec) -> Vec[T]:
+        return self._in_place(np.true_divide, other)
+
+    @_accept_expanded_other
     def __eq__(self, other: Vec):
-        return self._fmap2(operator.eq)(self)(other)
+        return self._from_items(self._items == other)
 
+    @_accept_expanded_other
     def __ne__(self, other: Vec):
-        return not self.__eq__(other)
+        return self._from_items(self._items != other)
 
-class TestVec(unittest.TestCase):
-    def test_basic_array_class(self):
-        class VecXY(_ArrayClass):
-            x: float 
-            y: float
+def _defer_to_expression(f: Callable) -> Callable:
+    """Decorator giving NotImplemented for a lazy expression as the other operand, so the expression's reflected operator extends it."""
+    @functools.wraps(f)
+    def _f(self, other: Any) -> Any:
+        if isinstance(other, VecExpr):
+            return NotImplemented
+        return f(self, other)
+    return _f
 
-        # test basic methods when all args provided
-        v1 = VecXY(5.5, 1.2)
-        assert v1.x == 5.5
-        assert v1.y == 1.2
-        assert v1[0] == 5.5
-        assert v1[1] == 1.2
-        assert len(v1) == 2
-
-        # test basic methods when not all args provided
-        # values should be initialised to 0.0
-        v1 = VecXY(5.5)
-        assert v1.x == 5.5
-        print(v1.y)
-        assert v1.y == 0.0
-        assert v1[0] == 5.5
-        assert v1[1] == 0.0
-        assert len(v1) == 2
-
-        # test that casting occurs
-        v2 = VecXY(1) 
-        assert v2.x == 1.0
-
-    def test_default_value_array_class(self):
-        class VecXY(_ArrayClass):
-            x: float = 1.0
-            y: float
+class VecArray:
+    """A batch of N vectors of the same Vec class stored in one contiguous (N, dim) numpy array.
 
-        v1 = VecXY()
-        assert v1.x == 1.0
-        assert v1.y == 0.0
-        assert v1[0] == 1.0
-        assert v1[1] == 0.0
-        assert len(v1) == 2
+    Operators act on the whole array at once, named fields give zero-copy 
+    column views (arr.x) and indexing a row gives a Vec view of that row.
 
-    def test_default_value_array_class_2(self):
-        class VecXY(_ArrayClass):
+    Typical usage example:
+
+        class VecXY(Vec):
             x: float
-            y: float = 1.0
+            y: float
 
-        v1 = VecXY()
-        assert v1.x == 0.0
-        assert v1.y == 1.0
-        assert v1[0] == 0.0
-        assert v1[1] == 1.0
-        assert len(v1) == 2
+        positions = VecArray(VecXY, 100_000) # or VecXY.batch(100_000)
+        positions.x += 1.0
+        positions[0]              # VecXY(1.0, 0.0), shares memory with positions
+        (positions * 2).magnitude()
+        (positions.lazy() * 2 + velocities).eval() # fused, see VecExpr
+    """
+    __slots__ = ('_vec_cls', '_fields', '_items')
+
+    def __init__(self, vec_cls: type[Vec], items: int|Sequence|np.ndarray):
+        fields = tuple(vec_cls.__annotations__.keys())
+        dtype = next(iter(vec_cls.__annotations__.values()), None)
+
+        if isinstance(items, int): # allocate n zeroed vectors
+            if len(fields) == 0:
+                raise TypeError(f"{vec_cls.__name__} has no fields, so its dimension must be given by the items")
+            items = np.zeros((items, len(fields)), dtype=dtype)
+        elif isinstance(items, Sequence) and len(items) > 0 and isinstance(items[0], _ArrayClass):
+            items = np.stack([v._items for v in items]).astype(dtype or items[0]._items.dtype, copy=False)
+        else:
+            items = np.asarray(items, dtype=dtype)
+
+        if items.ndim != 2 or (len(fields) > 0 and items.shape[1] != len(fields)):
+            raise ValueError(f"Expected an array of shape (N, {len(fields) or 'dim'}), got {items.shape}")
+
+        object.__setattr__(self, '_vec_cls', vec_cls)
+        object.__setattr__(self, '_fields', fields)
+        object.__setattr__(self, '_items', items)
+
+    def _wrap(self, items: np.ndarray) -> VecArray:
+        """Give a VecArray of the same Vec class around items, without copying or validation."""
+        arr = object.__new__(VecArray)
+        object.__setattr__(arr, '_vec_cls', self._vec_cls)
+        object.__setattr__(arr, '_fields', self._fields)
+        object.__setattr__(arr, '_items', items)
+        return arr
+
+    def lazy(self) -> VecExpr:
+        """Gives a lazily evaluated expression of this VecArray, see VecExpr."""
+        return VecExpr(None, (self,), self)
+
+    # named field column access
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self._items[:, self._fields.index(name)]
+        except ValueError:
+            raise AttributeError(f"'{self.__class__.__name__}' of {self._vec_cls.__name__} has no attribute '{name}'") from None
+
+    def __setattr__(self, name: str, val: Any):
+        if name not in self._fields:
+            raise AttributeError(f"'{self.__class__.__name__}' of {self._vec_cls.__name__} has no field '{name}'")
+        self._items[:, self._fields.index(name)] = val
+
+    # row access
+    def __getitem__(self, idx: int|slice|np.ndarray) -> Vec|VecArray:
+        if isinstance(idx, (int, np.integer)):
+            return self._vec_cls._from_items(self._items[idx])
+        return self._wrap(self._items[idx])
+
+    def __setitem__(self, idx: int|slice|np.ndarray, val: Any):
+        self._items[idx] = _unwrap(val)
+
+    def __len__(self) -> int:
+        return len(self._items)
 
-    def test_basic_vec(self):
-        v = Vec(1,2)
-        assert v[0] == 1
-        assert v[1] == 2
-        assert len(v) == 2
+    def __iter__(self) -> Iterator[Vec]:
+        return (self._vec_cls._from_items(row) for row in self._items)
 
-        u = v + 1
-        assert u[0] == 2
+    def __repr__(self):
+        return f"{self.__class__.__name__}[{self._vec_cls.__name__}]({self._items.tolist()})"
 
-        assert (v * 2)[1] == 4
+    def __reduce__(self):
+        # by its array, since the fields' __getattr__ can't be used on an instance being unpickled
+        return (VecArray, (self._vec_cls, self._items))
 
-        # the original object is unchanged
-        assert v[0] == 1
-        assert v[1] == 2
-        assert len(v) == 2
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return np.array(self._items, dtype=dtype, copy=copy)
 
-        v += 1
-        assert v[0] == 2
-        assert v[1] == 3
-        assert len(v) == 2
+    def __array_ufunc__(self, ufunc: np.ufunc, method: str, *inputs, out=None, **kwargs) -> Any:
+        if any(isinstance(x, VecExpr) for x in inputs):
+            return NotImplemented
 
-    def test_typed_vec(self):
-        class VecXY(Vec):
-            x: float
-            y: float
+        inputs = tuple(map(_unwrap, inputs))
+        if out is not None:
+            kwargs['out'] = tuple(map(_unwrap, out))
+
+        result = getattr(ufunc, method)(*inputs, **kwargs)
+
+        if out is not None: # results were written in place, give back the given outputs
+            return out[0] if len(out) == 1 else out
+        if method != '__call__': # e.g. reductions, which aren't vectors anymore
+            return result
+        if isinstance(result, tuple):
+            return tuple(map(self._wrap, result))
+        return self._wrap(result)
+
+    def magnitude(self) -> np.ndarray:
+        return np.sqrt((self._items**2).sum(axis=1))
+
+    def direction(self) -> VecArray:
+        return self._wrap(self._items / self.magnitude()[:, np.newaxis])
+
+    def argument(self) -> np.ndarray:
+        # only works for vectors of length 2, matches Vec.argument
+        return np.arctan2(self._items[:, 0], self._items[:, 1])
+
+    def __neg__(self) -> VecArray:
+        return self._wrap(-self._items)
+
+    @_defer_to_expression
+    def __add__(self, other: Any) -> VecArray:
+        return self._wrap(self._items + _unwrap(other))
+
+    def __radd__(self, lhs: Any) -> VecArray:
+        return self.__add__(lhs)
+
+    @_defer_to_expression
+    def __sub__(self, other: Any) -> VecArray:
+        return self._wrap(self._items - _unwrap(other))
+
+    @_defer_to_expression
+    def __mul__(self, other: Any) -> VecArray:
+        return self._wrap(self._items * _unwrap(other))
+
+    def __rmul__(self, lhs: Any) -> VecArray:
+        return self.__mul__(lhs)
+
+    @_defer_to_expression
+    def __truediv__(self, rhs: Any) -> VecArray:
+        return self._wrap(self._items / _unwrap(rhs))
+
+    @_defer_to_expression
+    def __pow__(self, p: Any) -> VecArray:
+        return self._wrap(self._items ** p)
+
+    # in place operators write into the existing buffer, so row and column views stay valid
+    def __iadd__(self, other: Any) -> VecArray:
+        np.add(self._items, _unwrap(other), out=self._items)
+        return self
+
+    def __isub__(self, other: Any) -> VecArray:
+        np.subtract(self._items, _unwrap(other), out=self._items)
+        return self
+
+    def __imul__(self, other: Any) -> VecArray:
+        np.multiply(self._items, _unwrap(other), out=self._items)
+        return self
+
+    def __itruediv__(self, other: Any) -> VecArray:
+        np.true_divide(self._items, _unwrap(other), out=self._items)
+        return self
+
+def _operand_key(value: Any) -> Any:
+    """A key under which equal operands of an expression are the same, arrays by identity and scalars by value."""
+    if isinstance(value, (int, float, complex)):
+        return (type(value), value)
+    return ('id', id(value))
+
+class VecExpr:
+    """A lazily evaluated arithmetic expression over Vecs or VecArrays, started by their lazy method.
+
+    Operators, and numpy ufuncs, on an expression extend it rather than
+    computing anything. It's evaluated once, by eval or on first use of the
+    result (its fields, rows, methods, len, iteration or np.asarray), with each
+    distinct subexpression computed once and each temporary written over, via
+    the ufunc out parameter, by the next operation once nothing else needs it.
+    a + b * 2 - c / d so allocates two arrays where eager operators allocate
+    four, and with eval(out=...) into an existing buffer, only one. The result is a VecArray if any operand is one, and otherwise a Vec
+    of the first Vec's class.
+
+    Operands are read when the expression is evaluated, not when it's built.
+    For a single small Vec, building the expression costs more than the
+    temporaries it saves. Its use is in fusing VecArray arithmetic.
+
+    Only operators with an expression as an operand are lazy, so each
+    operand to fuse should be made lazy, e.g. with lazy(a, b, c, d).
+
+    Typical usage example:
+
+        a, b, c, d = lazy(a, b, c, d)
+        expr = a + b * 2 - c / d          # nothing computed yet
+        result = expr.eval()              # a VecArray, as for the eager a + b * 2 - c / d
+        expr.eval(out=result)             # recomputed into result, without allocating it
+        positions += velocities.lazy() * dt # evaluated straight into positions
+    """
+    __slots__ = ('_ufunc', '_args', '_like', '_result')
+
+    def __init__(self, ufunc: np.ufunc|None, args: tuple, like: Vec|VecArray):
+        self._ufunc = ufunc # None for a leaf, whose only arg is its Vec or VecArray
+        self._args = args
+        self._like = like # what the result is wrapped as
+        self._result = None
+
+    @staticmethod
+    def _apply(ufunc: np.ufunc, *operands: Any) -> VecExpr:
+        args, like = [], None
+        for x in operands:
+            if isinstance(x, (_ArrayClass, VecArray)):
+                x = VecExpr(None, (x,), x)
+            if isinstance(x, VecExpr) and (like is None or (isinstance(x._like, VecArray) and not isinstance(like, VecArray))):
+                like = x._like
+            args.append(x)
+        return VecExpr(ufunc, tuple(args), like)
+
+    def _compile(self) -> list[tuple[np.ufunc, tuple[tuple[bool, Any], ...]]]:
+        """Give the distinct operations of the expression in an order to compute them, the last being the whole.
+
+        Each operand is (True, index) of an earlier operation or (False, value).
+        """
+        program = []
+        self._visit(self, program, {}, {})
+        return program
+
+    @staticmethod
+    def _visit(x: Any, program: list, keys: dict, seen: dict) -> tuple[bool, Any]:
+        if not isinstance(x, VecExpr):
+            return False, _unwrap(x)
+        if x._ufunc is None or x._result is not None:
+            return False, _unwrap(x._args[0] if x._ufunc is None else x._result)
+        if id(x) not in seen:
+            operands = tuple(VecExpr._visit(arg, program, keys, seen) for arg in x._args)
+            key = (x._ufunc, tuple((operand if is_op else _operand_key(operand)) for is_op, operand in operands))
+            if key not in keys:
+                keys[key] = len(program)
+                program.append((x._ufunc, operands))
+            seen[id(x)] = (True, keys[key])
+        return seen[id(x)]
+
+    def _evaluate(self, out: np.ndarray|None) -> np.ndarray:
+        program = self._compile()
+        uses = [0] * len(program)
+        for _, operands in program:
+            for is_op, operand in operands:
+                if is_op:
+                    uses[operand] += 1
+
+        # out can hold the first temporary too, as nothing but the whole is written there after it, unless
+        # it shares memory with an operand, which it would overwrite before that's read
+        spare = out
+        if out is not None and any(not is_op and np.may_share_memory(out, operand) for _, operands in program for is_op, operand in operands):
+            spare = None
+
+        values = [None] * len(program)
+        for i, (ufunc, operands) in enumerate(program):
+            inputs = [values[operand] if is_op else operand for is_op, operand in operands]
+            target = None
+            for is_op, operand in operands:
+                if is_op:
+                    uses[operand] -= 1
+                    if uses[operand] == 0: # the last use of a temporary, so it can take this result
+                        target = values[operand] if target is None else target
+                        values[operand] = None
+
+            if i == len(program) - 1 and out is not None:
+                values[i] = ufunc(*inputs, out=out)
+                continue
+            if target is None and spare is not None:
+                target, spare = spare, None
+            if target is None:
+                values[i] = ufunc(*inputs)
+                continue
+            try: # only when the result has exactly the temporary's shape and dtype
+                values[i] = ufunc(*inputs, out=target, casting='no')
+            except (TypeError, ValueError):
+                values[i] = ufunc(*inputs)
+                if target is out:
+                    spare = out
+        return values[-1]
+
+    def eval(self, out: Vec|VecArray|np.ndarray|None = None) -> Any:
+        """Gives the value of the expression, computed on the first call only, or computes it into out and gives out."""
+        if self._ufunc is None:
+            result = self._args[0]
+        elif self._result is None and out is None:
+            items = self._evaluate(None)
+            self._result = self._like._wrap(items) if isinstance(self._like, VecArray) else self._like._from_items(items)
+            result = self._result
+        else:
+            result = self._result
+
+        if out is None:
+            return result
+        if result is None:
+            self._evaluate(_unwrap(out))
+        else:
+            np.copyto(_unwrap(out), _unwrap(result))
+        return out
+
+    def __repr__(self):
+        if self._ufunc is None:
+            return f"{self.__class__.__name__}({self._args[0]!r})"
+        return f"{self.__class__.__name__}({self._ufunc.__name__}{self._args!r})"
+
+    # using the result evaluates the expression
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.eval(), name)
+
+    def __getitem__(self, idx: Any) -> Any:
+        return self.eval()[idx]
+
+    def __len__(self) -> int:
+        return len(self.eval())
+
+    def __iter__(self) -> Iterator:
+        return iter(self.eval())
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return np.array(_unwrap(self.eval()), dtype=dtype, copy=copy)
+
+    def __array_ufunc__(self, ufunc: np.ufunc, method: str, *inputs, out=None, **kwargs) -> Any:
+        if method != '__call__' or kwargs or ufunc.nout != 1: # e.g. reductions, on the evaluated operands
+            inputs = tuple(x.eval() if isinstance(x, VecExpr) else x for x in inputs)
+            if out is not None:
+                kwargs['out'] = out
+            return getattr(ufunc, method)(*inputs, **kwargs)
+
+        expr = self._apply(ufunc, *inputs)
+        if out is None:
+            return expr
+        expr.eval(out=out[0]) # e.g. a VecArray's in place operators, fused into its buffer
+        return out[0]
+
+    def __neg__(self) -> VecExpr:
+        return self._apply(np.negative, self)
+
+    def __add__(self, other: Any) -> VecExpr:
+        return self._apply(np.add, self, other)
+
+    def __radd__(self, lhs: Any) -> VecExpr:
+        return self._apply(np.add, lhs, self)
+
+    def __sub__(self, other: Any) -> VecExpr:
+        return self._apply(np.subtract, self, other)
+
+    def __rsub__(self, lhs: Any) -> VecExpr:
+        return self._apply(np.subtract, lhs, self)
+
+    def __mul__(self, other: Any) -> VecExpr:
+        return self._apply(np.multiply, self, other)
+
+    def __rmul__(self, lhs: Any) -> VecExpr:
+        return self._apply(np.multiply, lhs, self)
+
+    def __truediv__(self, other: Any) -> VecExpr:
+        return self._apply(np.true_divide, self, other)
+
+    def __rtruediv__(self, lhs: Any) -> VecExpr:
+        return self._apply(np.true_divide, lhs, self)
+
+    def __pow__(self, p: Any) -> VecExpr:
+        return self._apply(np.power, self, p)
+
+def lazy(*values: Vec|VecArray) -> VecExpr|tuple[VecExpr, ...]:
+    """Gives a lazily evaluated expression of each Vec or VecArray, or of the only one, see VecExpr."""
+    exprs = tuple(value.lazy() for value in values)
+    return exprs[0] if len(exprs) == 1 else exprs
+
+def _small_operand(other: Any, n: int) -> tuple:
+    """Give the n values another operand of a small Vec broadcasts to, raising TypeError for operands which handle the operation themselves."""
+    if isinstance(other, (VecArray, VecExpr)) or getattr(other, 'ndim', 0) > 1:
+        raise TypeError
+    if isinstance(other, _ArrayClass):
+        values = other._items.tolist()
+    else:
+        try:
+            values = tuple(other)
+        except TypeError: # a scalar
+            return (other,) * n
+    if len(values) != n:
+        raise ValueError(f"Expected {n} values to broadcast against, got {len(values)}")
+    return values
+
+_new = object.__new__
+
+def _make_small_methods(cls_name: str, fields: tuple[str, ...]) -> dict[str, Callable]:
+    """Generate the source of the unrolled field by field methods of a small Vec and compile them, as TupleClass does."""
+    n = len(fields)
+    names = ', '.join(fields)
+    values = ', '.join(f'self.{f}' for f in fields)
+    others = [f'_o{i}' for i in range(n)]
+
+    def assign(target: str, expr: Callable[[str, str], str], other: Callable[[int, str], str]) -> str:
+        return '; '.join(f'{target}.{f} = {expr(f"self.{f}", other(i, f))}' for i, f in enumerate(fields))
+
+    source = [f'def __init__(self, {", ".join(f"{f}=0.0" for f in fields)}):\n'
+              + ''.join(f'    self.{f} = float({f})\n' for f in fields)]
+
+    for name, op in (('add', '+'), ('sub', '-'), ('mul', '*'), ('truediv', '/'), ('pow', '**')):
+        for method, expr in ((f'__{name}__', lambda a, b: f'{a} {op} {b}'), (f'__r{name}__', lambda a, b: f'{b} {op} {a}')):
+            source.append(f'def {method}(self, other):\n'
+                          f'    cls = self.__class__\n'
+                          f'    r = _new(cls)\n'
+                          f'    if other.__class__ is cls:\n'
+                          f'        {assign("r", expr, lambda i, f: f"other.{f}")}\n'
+                          f'    elif other.__class__ is float or other.__class__ is int:\n'
+                          f'        {assign("r", expr, lambda i, f: "other")}\n'
+                          f'    else:\n'
+                          f'        try:\n'
+                          f'            {", ".join(others)}, = _small_operand(other, {n})\n'
+                          f'        except TypeError:\n'
+                          f'            return NotImplemented\n'
+                          f'        {assign("r", expr, lambda i, f: others[i])}\n'
+                          f'    return r\n')
+        if name != 'pow':
+            source.append(f'def __i{name}__(self, other):\n'
+                          f'    if other.__class__ is self.__class__:\n'
+                          f'        {"; ".join(f"self.{f} {op}= other.{f}" for f in fields)}\n'
+                          f'    elif other.__class__ is float or other.__class__ is int:\n'
+                          f'        {"; ".join(f"self.{f} {op}= other" for f in fields)}\n'
+                          f'    else:\n'
+                          f'        try:\n'
+                          f'            {", ".join(others)}, = _small_operand(other, {n})\n'
+                          f'        except TypeError:\n'
+                          f'            return NotImplemented\n'
+                          f'        {"; ".join(f"self.{f} {op}= {o}" for f, o in zip(fields, others))}\n'
+                          f'    return self\n')
+
+    source.append('def __neg__(self):\n'
+                  '    r = _new(self.__class__)\n'
+                  f'    {"; ".join(f"r.{f} = -self.{f}" for f in fields)}\n'
+                  '    return r\n')
+    source.append('def __eq__(self, other):\n'
+                  '    if other.__class__ is self.__class__:\n'
+                  f'        return {" and ".join(f"self.{f} == other.{f}" for f in fields)}\n'
+                  '    try:\n'
+                  f'        return ({values},) == tuple(other)\n'
+                  '    except TypeError:\n'
+                  '        return NotImplemented\n')
+    source.append('def __getitem__(self, key):\n'
+                  f'    return ({values},)[key]\n')
+    source.append('def __iter__(self):\n'
+                  f'    return iter(({values},))\n')
+    source.append(f'def __len__(self):\n'
+                  f'    return {n}\n')
+    source.append('def magnitude(self):\n'
+                  f'    return _sqrt({" + ".join(f"self.{f} * self.{f}" for f in fields)})\n')
+    source.append('def direction(self):\n'
+                  f'    m = _sqrt({" + ".join(f"self.{f} * self.{f}" for f in fields)})\n'
+                  '    r = _new(self.__class__)\n'
+                  f'    {"; ".join(f"r.{f} = self.{f} / m" for f in fields)}\n'
+                  '    return r\n')
+
+    namespace = {'_new': _new, '_sqrt': sqrt, '_small_operand': _small_operand}
+    exec('\n'.join(source), namespace)
+    methods = {name: method for name, method in namespace.items() if callable(method) and name not in ('_new', '_sqrt', '_small_operand')}
+    for name, method in methods.items():
+        method.__qualname__ = f'{cls_name}.{name}'
+    return methods
+
+class _SmallVec:
+    """The shared base of Vec2, Vec3 and Vec4, whose arithmetic is generated for each from its __slots__."""
+    __slots__ = ()
+    _fields: tuple[str, ...] = ()
+    vec_cls: type[Vec] # the numpy backed Vec class of the same fields
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = cls.__dict__.get('__slots__')
+        if fields: # subclasses of Vec2 etc. inherit its fields and methods
+            for name, method in _make_small_methods(cls.__name__, fields).items():
+                setattr(cls, name, method)
+            cls._fields = fields
+            cls.vec_cls = type(Vec)(f'Nd{cls.__name__}', (Vec,), {'__annotations__': {f: float for f in fields}, '__module__': __name__})
+
+    __hash__ = None # mutable, so unhashable
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({', '.join(map(str, self))})"
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        return np.array(tuple(self), dtype=dtype)
+
+    def __setitem__(self, idx: int, val: float):
+        setattr(self, self._fields[idx], float(val))
+
+    def argument(self) -> float:
+        # matches Vec.argument
+        return atan2(self[0], self[1])
+
+    def to_vec(self, vec_cls: type[Vec]|None = None) -> Vec:
+        """Gives a numpy backed Vec of the same values, of vec_cls or by default of a class with the same fields."""
+        return (vec_cls or self.vec_cls)(*self)
+
+    @classmethod
+    def from_vec(cls, vec: Vec|Sequence[float]) -> _SmallVec:
+        """Gives an instance of cls of the values of a numpy backed Vec, or of any sequence."""
+        return cls(*(vec._items.tolist() if isinstance(vec, _ArrayClass) else vec))
+
+    @classmethod
+    def batch(cls, items: int|Sequence) -> VecArray:
+        """Gives a VecArray of cls.vec_cls, see VecArray, whose items may also be instances of cls."""
+        if not isinstance(items, int) and len(items) > 0 and isinstance(items[0], _SmallVec):
+            items = [tuple(v) for v in items]
+        return VecArray(cls.vec_cls, items)
+
+    @classmethod
+    def from_batch(cls, batch: VecArray|np.ndarray) -> list[_SmallVec]:
+        """Gives an instance of cls for each row of a VecArray, or of an (N, dim) array."""
+        return [cls(*row) for row in _unwrap(batch).tolist()]
+
+class Vec2(_SmallVec):
+    """A 2D vector of python floats, for code working on a few vectors at a time, such as game loops.
+
+    Has the fields, operators and methods of a numpy backed Vec, unrolled over
+    its fields with no array behind them, so arithmetic on single vectors runs
+    several times faster. Unlike a Vec, it isn't a tuple, == compares all of its
+    values to give a bool, and it isn't a numpy ufunc operand of its own, so
+    np.sqrt(v) gives an array. to_vec, from_vec, batch and from_batch convert to
+    and from the numpy backed types.
+
+    Typical usage example:
+
+        position, velocity = Vec2(0, 0), Vec2(1, 0.5)
+        position += velocity * dt
+        x, y = position
+        positions = Vec2.batch([position, velocity]) # a VecArray of Vec2.vec_cls
+    """
+    __slots__ = ('x', 'y')
+
+class Vec3(_SmallVec):
+    """A 3D vector of python floats, see Vec2."""
+    __slots__ = ('x', 'y', 'z')
 
-        v = VecXY(1,2)
-        assert v.x == 1
-        assert v[0] == 1
-        assert v.y == 2
-        assert v[1] == 2
-        assert len(v) == 2
-
-        u = v + 1
-        assert u[0] == 2
-        assert u.x == 2
-
-        assert (v * 2)[1] == 4
-        assert (v * 2).y == 4
-
-        # the original object is unchanged
-        assert v[0] == 1
-        assert v.x == 1
-        assert v[1] == 2
-        assert v.y == 2
-        assert len(v) == 2
-
-        v += 1
-        assert v[0] == 2
-        assert v.x == 2
-        assert v[1] == 3
-        assert v.y == 3
-        assert len(v) == 2
-
-if __name__ == '__main__':
-    unittest.main()
+class Vec4(_SmallVec):
+    """A 4D vector of python floats, see Vec2."""
+    __slots__ = ('x', 'y', 'z', 'w')
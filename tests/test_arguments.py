@@ -0,0 +1,186 @@
+from __future__ import annotations
+import asyncio
+import functools
+import inspect
+import unittest
+import numpy as np
+from nicklib.transforms.arguments import set_validation, map_arguments, take_args_as_list, vectorize, validate_args, validate_params, fuse
+
+class TestArguments(unittest.TestCase):
+    def test_validate_params(self):
+        positive = lambda x: None if x > 0 else ValueError(x)
+
+        @validate_params(a=positive, c=positive)
+        def f(a, /, b=2, *rest, c=3, **kw):
+            return (a, b, rest, c, kw)
+
+        assert f(1) == (1, 2, (), 3, {})
+        assert f(1, 5, 6, c=4, d=7) == (1, 5, (6,), 4, {'d': 7})
+        assert f.__name__ == 'f'
+        assert inspect.signature(f) == inspect.signature(f.__wrapped__)
+        with self.assertRaises(ValueError):
+            f(0)
+        with self.assertRaises(ValueError):
+            f(1, c=-1)
+        with self.assertRaises(TypeError):
+            f(a=1)
+
+        with self.assertRaises(TypeError):
+            validate_params(z=positive)(f.__wrapped__)
+
+    def test_disabled(self):
+        def f(x):
+            return x
+
+        assert validate_params(enabled=False, x=lambda x: ValueError())(f) is f
+        assert validate_args(lambda x: ValueError(), enabled=False)(f) is f
+
+        set_validation(False)
+        try:
+            assert validate_params(x=lambda x: ValueError())(f) is f
+            assert fuse(validate_args(lambda x: ValueError()))(f) is f
+        finally:
+            set_validation(True)
+        assert validate_params(x=lambda x: ValueError())(f) is not f
+
+    def test_sampling(self):
+        checked = []
+
+        @validate_params(x=lambda x: checked.append(x), sample=3)
+        def f(x):
+            return x
+
+        for i in range(7):
+            f(i)
+        assert checked == [0, 3, 6]
+
+        for sample in (0, -1):
+            with self.assertRaises(ValueError):
+                validate_params(sample=sample, x=lambda x: None)
+            with self.assertRaises(ValueError):
+                validate_args(lambda x: None, sample=sample)
+
+    def test_fuse(self):
+        log = []
+
+        def outer(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                log.append('outer')
+                return func(*args, **kwargs)
+            return wrapper
+
+        def g(first, nums, scale=1):
+            return first + sum(nums) * scale
+
+        stack = [
+            map_arguments(lambda *args, **kwargs: (args[::-1], kwargs)),
+            validate_args(lambda *args, **kwargs: None if len(args) >= 2 else TypeError()),
+            take_args_as_list(pos=1),
+            validate_params(first=lambda x: None if x >= 0 else ValueError(x)),
+        ]
+        fused = fuse(*stack)(g)
+        stacked = functools.reduce(lambda func, t: t(func), reversed(stack), g)
+
+        for args, kwargs in [((3, 2, 1), {}), ((3, 2, 1), {'scale': 2})]:
+            assert fused(*args, **kwargs) == stacked(*args, **kwargs)
+        assert fused.__name__ == 'g'
+        with self.assertRaises(ValueError):
+            fused(1, -1)
+        with self.assertRaises(TypeError):
+            fused(1)
+
+        # other transformers split the fused runs
+        mixed = fuse(stack[0], outer, stack[2])(g)
+        assert mixed(2, 2, 1) == 5
+        assert log == ['outer']
+
+    def test_async(self):
+        async def g(first, nums, scale=1):
+            await asyncio.sleep(0)
+            return first + sum(nums) * scale
+
+        stack = [
+            map_arguments(lambda *args, **kwargs: (args[::-1], kwargs)),
+            validate_args(lambda *args, **kwargs: None if len(args) >= 2 else TypeError()),
+            take_args_as_list(pos=1),
+            validate_params(first=lambda x: None if x >= 0 else ValueError(x)),
+        ]
+        stacked = functools.reduce(lambda func, t: t(func), reversed(stack), g)
+        fused = fuse(*stack)(g)
+
+        async def main():
+            for f in (stacked, fused):
+                # coroutine functions, which run the transformers' logic before awaiting g
+                assert inspect.iscoroutinefunction(f)
+                assert await f(3, 2, 1) == 6
+                assert await f(3, 2, 1, scale=2) == 11
+                with self.assertRaises(ValueError):
+                    await f(1, -1)
+                with self.assertRaises(TypeError):
+                    await f(1)
+        asyncio.run(main())
+
+        with self.assertRaises(TypeError):
+            vectorize()(g)
+
+    def test_vectorize(self):
+        calls = []
+
+        @vectorize(dtype=float, chunk_size=3)
+        def scale(x, factor=1.0, offset=0.0):
+            calls.append(x)
+            return x * factor + offset
+
+        assert scale(2, 3) == 6 # scalars pass straight through
+        # numpy scalars are scalars too, not 0-d batches
+        out = scale(np.float64(1.5), 2)
+        assert out == 3.0 and not isinstance(out, np.ndarray)
+        assert calls[-1] == np.float64(1.5)
+        out = scale([1, 2, 3, 4], 2, offset=1.0)
+        assert isinstance(out, np.ndarray) and out.dtype == np.float64
+        assert list(out) == [3, 5, 7, 9]
+
+        # batches broadcast against each other
+        out = scale(np.arange(3)[:, None], np.array([1, 10]))
+        assert out.shape == (3, 2)
+        assert out[2, 1] == 20
+
+        calls.clear()
+
+        @scale.vectorized
+        def _(x, factor=1.0, offset=0.0):
+            return x * factor + offset
+
+        assert list(scale(np.arange(4), 2)) == [0, 2, 4, 6]
+        assert calls == []
+
+    def test_vectorize_vec(self):
+        from nicklib.vector import Vec
+
+        class VecXY(Vec):
+            x: float
+            y: float
+
+        @vectorize()
+        def square(v):
+            return v * v
+
+        out = square(VecXY(2, 3))
+        assert isinstance(out, VecXY)
+        assert tuple(out) == (4, 9)
+
+        from nicklib.vector import Vec2
+        out = square(Vec2(2.0, 3.0))
+        assert isinstance(out, Vec2)
+        assert tuple(out) == (4.0, 9.0)
+
+        # other tuples with __array__ aren't Vecs
+        class Pair(tuple):
+            def __array__(self, dtype=None, copy=None):
+                return np.array(tuple(self), dtype=dtype)
+
+        assert isinstance(square(Pair((2, 3))), np.ndarray)
+
+if __name__ == '__main__':
+    unittest.main()
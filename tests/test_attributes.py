@@ -0,0 +1,50 @@
+from __future__ import annotations
+import sys
+import unittest
+import nicklib
+from nicklib import iter_attr_unpack, iter_attr_stream, attr_columns
+
+class TestAttrUnpack(unittest.TestCase):
+    class _Row:
+        def __init__(self, x, y, n):
+            self.x, self.y, self.n = x, y, n
+
+    def _rows(self, count: int) -> list:
+        return [self._Row(i * 0.5, -i, i) for i in range(count)]
+
+    def test_stream(self):
+        rows = self._rows(3)
+        stream = iter_attr_stream(iter(rows), 'x', 'n')
+        assert next(stream) == (0.0, 0)
+        assert list(stream) == [(0.5, 1), (1.0, 2)]
+        assert list(iter_attr_stream(rows, 'n')) == [(0,), (1,), (2,)]
+        assert [list(t) for t in iter_attr_stream(rows, 'x', 'y')] == iter_attr_unpack(rows, 'x', 'y')
+
+    def test_columns(self):
+        import numpy as np
+
+        rows = self._rows(10)
+        xs, ns = attr_columns(rows, 'x', 'n', dtype={'n': np.int32}, chunk_size=3)
+        assert xs.dtype == np.float64 and ns.dtype == np.int32
+        assert list(ns) == list(range(10))
+        assert xs[4] == 2.0
+
+        # unknown lengths, and chunked input
+        ys, = attr_columns((row for row in rows), 'y', chunk_size=4)
+        assert list(ys) == [-i for i in range(10)]
+        ys, = attr_columns([rows[:7], rows[7:]], 'y', chunked=True)
+        assert len(ys) == 10 and ys[9] == -9
+
+        xs, ns = attr_columns(rows, 'x', 'n', kind='array', dtype={'n': 'i'})
+        assert xs.typecode == 'd' and ns.typecode == 'i'
+        assert list(ns) == list(range(10))
+
+    def test_lazy_submodules(self):
+        assert nicklib.stack is sys.modules['nicklib.stack']
+        assert nicklib.transforms.caching.memoize is sys.modules['nicklib.transforms.caching'].memoize
+        assert 'vector' in dir(nicklib)
+        with self.assertRaises(AttributeError):
+            nicklib.missing
+
+if __name__ == '__main__':
+    unittest.main()
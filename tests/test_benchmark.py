@@ -0,0 +1,37 @@
+from __future__ import annotations
+import unittest
+from nicklib.benchmark import _CASES, _IMPORT_BUDGETS, run, compare, import_time
+
+class TestBenchmark(unittest.TestCase):
+    def test_run(self):
+        results = run('tupleclass/slots/construct', repeat=1, min_time=0.001)
+        assert list(results) == ['tupleclass/slots/construct']
+        result = results['tupleclass/slots/construct']
+        assert result['ns_min'] > 0
+        assert result['peak_bytes'] > 0
+
+    def test_compare(self):
+        baseline = {'a': {'ns_min': 100.0}, 'b': {'ns_min': 100.0}}
+        results = {'a': {'ns_min': 105.0}, 'b': {'ns_min': 150.0}, 'c': {'ns_min': 1.0}}
+        assert compare(results, baseline, 0.1) == [('b', 100.0, 150.0)]
+        assert compare(results, baseline, 1.0) == []
+
+    def test_cases(self):
+        # every case sets up and runs
+        for name, setup in _CASES.items():
+            setup()()
+
+    def test_import_time(self):
+        result = import_time('nicklib.transforms.caching', repeat=1)
+        assert 0 < result['us']
+        assert 'nicklib.transforms.caching' in result['modules']
+        # the lazily imported dependencies aren't
+        assert 'numpy' not in result['modules'] and 'unittest' not in result['modules']
+        assert 'nicklib.vector' not in import_time('nicklib', repeat=1)['modules']
+        assert 'numpy' in import_time('nicklib.vector', repeat=1)['modules']
+        # and the cases import what they measure as they're set up
+        assert not {'numpy', 'asyncio', 'nicklib.vector'} & set(import_time('nicklib.benchmark', repeat=1)['modules'])
+        assert all(module.startswith('nicklib') for module in _IMPORT_BUDGETS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+import unittest
+from nicklib.transforms.arguments import take_args_as_list, validate_args
+from nicklib.transforms.caching import memoize
+
+class TestMemoize(unittest.TestCase):
+    def test_hits_and_lru(self):
+        calls = []
+
+        @memoize(max_size=2)
+        def f(x, y=0):
+            calls.append(x)
+            return x + y
+
+        assert f(1) == 1 and f(1) == 1
+        assert f(2, y=1) == 3
+        f(3) # evicts 1
+        f(1)
+        assert calls == [1, 2, 3, 1]
+
+        info = f.cache_info()
+        assert info['hits'] == 1
+        assert info['misses'] == 4
+        assert info['evictions'] == 2
+        assert info['size'] == 2
+
+        f.cache_clear()
+        assert f.cache_info()['size'] == 0
+
+    def test_ttl(self):
+        calls = []
+
+        @memoize(ttl=0.01)
+        def f(x):
+            calls.append(x)
+            return x
+
+        f(1)
+        f(1)
+        time.sleep(0.02)
+        f(1)
+        assert calls == [1, 1]
+        assert f.cache_info()['expirations'] == 1
+
+    def test_weight(self):
+        @memoize(max_size=None, max_weight=10, weigh=len)
+        def f(n):
+            return 'x' * n
+
+        f(4)
+        f(5)
+        f(20) # too heavy to keep
+        assert f.cache_info()['size'] == 2
+        f(3) # evicts 4
+        info = f.cache_info()
+        assert info['weight'] == 8
+        assert info['evictions'] == 1
+
+    def test_unhashable_and_composition(self):
+        calls = []
+
+        # beneath take_args_as_list, both calls give memoize the same list
+        @take_args_as_list()
+        @memoize()
+        def total(nums):
+            calls.append(nums)
+            return sum(nums)
+
+        assert total(1, 2, 3) == 6
+        assert total([1, 2, 3]) == 6
+        assert len(calls) == 1
+
+        @memoize()
+        def keys(d, s):
+            calls.append(d)
+            return sorted(d) + sorted(s)
+
+        assert keys({'a': [1]}, {2}) == ['a', 2]
+        assert keys({'a': [1]}, {2}) == ['a', 2]
+        assert len(calls) == 2
+
+    def test_keyword_key(self):
+        @memoize()
+        def f(*args, **kwargs):
+            return args, kwargs
+
+        # the same key without a mark between the positional and keyword arguments
+        assert f(1, 2, a=3) == ((1, 2), {'a': 3})
+        assert f((1, 2), (('a', 3),)) == (((1, 2), (('a', 3),)), {})
+        assert f.cache_info()['misses'] == 2
+
+    def test_arg_transform(self):
+        calls = []
+
+        # normalise the argument case insensitively
+        @memoize(arg_transform=lambda s: ((s.lower(),), {}))
+        @validate_args(lambda s: None if s.islower() else ValueError(s))
+        def f(s):
+            calls.append(s)
+            return s
+
+        assert f('Hi') == 'hi'
+        assert f('HI') == 'hi'
+        assert calls == ['hi']
+
+    def test_single_flight(self):
+        calls = []
+        release = threading.Event()
+
+        @memoize(single_flight=True)
+        def slow(x):
+            calls.append(x)
+            release.wait()
+            return x * 2
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow(21))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        time.sleep(0.02)
+        release.set()
+        for t in threads:
+            t.join()
+
+        assert calls == [21]
+        assert results == [42] * 8
+
+    def test_single_flight_error(self):
+        attempts = []
+
+        @memoize(single_flight=True)
+        def f():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError()
+            return 'ok'
+
+        with self.assertRaises(RuntimeError):
+            f()
+        assert f() == 'ok'
+
+    def test_async(self):
+        calls = []
+
+        @memoize()
+        async def f(x):
+            calls.append(x)
+            await asyncio.sleep(0)
+            return x * 2
+
+        async def main():
+            return [await f(1), await f(1), await f(2)]
+
+        assert asyncio.run(main()) == [2, 2, 4]
+        assert asyncio.run(main()) == [2, 2, 4] # the awaited results, reusable from another loop
+        assert calls == [1, 2]
+        assert f.cache_info()['hits'] == 4
+
+    def test_async_single_flight(self):
+        calls = []
+
+        @memoize(single_flight=True)
+        async def f(x):
+            calls.append(x)
+            await asyncio.sleep(0.01)
+            if x < 0:
+                raise ValueError(x)
+            return x * 2
+
+        async def main(x):
+            return await asyncio.gather(*[f(x) for _ in range(8)], return_exceptions=True)
+
+        assert asyncio.run(main(21)) == [42] * 8
+        assert calls == [21]
+        assert all(isinstance(e, ValueError) for e in asyncio.run(main(-1)))
+        assert calls == [21, -1]
+        asyncio.run(main(-1)) # errors aren't cached
+        assert calls == [21, -1, -1]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+import os
+import tempfile
+import unittest
+from nicklib.tupleclass import TupleClass
+from nicklib.config import to_schema, config_file, read_config, clear_config_cache
+
+class TestConfig(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        clear_config_cache()
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _write(self, name: str, text: str) -> str:
+        path = os.path.join(self._dir.name, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    class Database(TupleClass):
+        host: str = 'localhost'
+        port: int = 5432
+        debug: bool = False
+
+    def test_formats(self):
+        toml = self._write('c.toml', 'name = "svc"\n[database]\nport = 6543\ndebug = true\n[cache]\nsize = 10\n')
+        json_ = self._write('c.json', '{"name": "svc", "database": {"port": 6543, "debug": true}}')
+        ini = self._write('c.ini', '[DEFAULT]\nhost = db.local\n[database]\nport = 6543\ndebug = yes\n')
+
+        for path in (toml, json_, ini):
+            db = read_config(path, self.Database, section='database')
+            assert isinstance(db, self.Database)
+            assert db.port == 6543 and db.debug is True, path
+        assert read_config(ini, self.Database, section='database').host == 'db.local'
+        assert read_config(toml, self.Database, section='database').host == 'localhost'
+        assert read_config(toml)['cache'] == {'size': 10}
+
+    def test_whole_schema(self):
+        class Service(TupleClass):
+            name: str
+            database: TestConfig.Database
+
+        path = self._write('c.toml', 'name = "svc"\n[database]\nport = 1\n')
+        service = read_config(path, Service)
+        assert service.name == 'svc'
+        assert service.database.port == 1
+
+        with self.assertRaises(ValueError):
+            to_schema({'port': 'not a number'}, self.Database)
+
+    def test_lazy_sections(self):
+        text = 'top = 1\n' + ''.join(f'[s{i}]\nvalue = {i}\n[s{i}.sub]\nx = {i}\n' for i in range(100))
+        config = config_file(self._write('big.toml', text))
+        assert config.section('s42') == {'value': 42, 'sub': {'x': 42}}
+        assert config.section(None) == {'top': 1}
+        assert set(config._sections) == {'s42', None} # nothing else was parsed
+        assert len(config.sections()) == 100
+
+    def test_multiline_toml(self):
+        # lines of an array or a string that look like headers aren't sections
+        text = 'matrix = [\n  [1, 2],\n  [3, 4]\n]\nnote = """\n[fake]\n"""\n[database]\nport = 6543\n'
+        path = self._write('c.toml', text)
+        assert config_file(path).sections() == ['database']
+        assert config_file(path).section(None) == {'matrix': [[1, 2], [3, 4]], 'note': '[fake]\n'}
+        assert read_config(path, self.Database, section='database').port == 6543
+        with self.assertRaises(KeyError):
+            read_config(path, section='fake')
+
+    def test_top_level_tables(self):
+        # tables made by dotted keys and inline tables, rather than by headers
+        path = self._write('c.toml', 'name = "svc"\ndatabase.port = 6543\ncache = {size = 10}\n[[items]]\nx = 1\n[[items]]\nx = 2\n')
+        config = config_file(path)
+        assert sorted(config.sections()) == ['cache', 'database', 'items']
+        assert config.section(None) == {'name': 'svc'}
+        assert read_config(path, self.Database, section='database').port == 6543
+        assert config.section('cache') == {'size': 10}
+        assert config.section('items') == [{'x': 1}, {'x': 2}]
+        with self.assertRaises(KeyError):
+            config.section('name')
+
+    def test_headers(self):
+        # a comment after a header, and quoted keys with dots in them
+        text = '[a] # note\nx = 1\n[b]  # another\ny = 2\n["c.d"]\nz = 3\n[\'e.f\'.g] # [not a header]\nw = 4\n[[h]] # array\nv = 5\n'
+        config = config_file(self._write('c.toml', text))
+        assert sorted(config.sections()) == ['a', 'b', 'c.d', 'e.f', 'h']
+        assert config.section('a') == {'x': 1}
+        assert config.section('b') == {'y': 2}
+        assert config.section('c.d') == {'z': 3}
+        assert config.section('e.f') == {'g': {'w': 4}}
+        assert config.section('h') == [{'v': 5}]
+
+        ini = self._write('c.ini', '[a] # note\nx = 1\n[b]\ny = 2\n')
+        assert config_file(ini).section('a') == {'x': '1'}
+
+    def test_unresolved_annotations(self):
+        class Local(TupleClass):
+            port: int = 0
+
+        class Schema(TupleClass):
+            local: Local
+
+        with self.assertWarns(UserWarning):
+            to_schema({'local': {'port': 1}}, Schema)
+
+    def test_invalidation(self):
+        path = self._write('c.json', '{"database": {"port": 1}}')
+        first = read_config(path, self.Database, section='database')
+        assert read_config(path, self.Database, section='database') is first
+
+        self._write('c.json', '{"database": {"port": 22}}')
+        assert read_config(path, self.Database, section='database').port == 22
+
+        # within the polling interval, changes aren't looked for
+        polled = read_config(path, self.Database, section='database', poll_interval=60)
+        self._write('c.json', '{"database": {"port": 333}}')
+        assert read_config(path, self.Database, section='database', poll_interval=60) is polled
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import mmap
+import os
+import tempfile
+import unittest
+from nicklib.files import map_file, FileManager
+
+class TestFileManager(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(10):
+            path = os.path.join(self._dir.name, f'{i}.txt')
+            with open(path, 'wb') as file:
+                file.write(str(i).encode() * (i * 100))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_read_many(self):
+        with FileManager(workers=4, mmap_threshold=500) as files:
+            contents = files.read_many(self.paths)
+            assert contents[0] == b''
+            assert contents[3] == b'3' * 300
+            assert isinstance(contents[5], mmap.mmap)
+            assert contents[9][:3] == b'999' and len(contents[9]) == 900
+        assert contents[9].closed
+
+    def test_errors(self):
+        files = FileManager()
+        missing = os.path.join(self._dir.name, 'missing')
+        contents = files.read_many([self.paths[1], missing], errors='capture')
+        assert contents[0] == b'1' * 100
+        assert isinstance(contents[1], FileNotFoundError)
+        with self.assertRaises(FileNotFoundError):
+            files.read_many([missing])
+
+    def test_map_file(self):
+        mapped = map_file(self.paths[2])
+        assert mapped[:] == b'2' * 200
+        mapped.close()
+        assert map_file(self.paths[0]) == b''
+
+if __name__ == '__main__':
+    unittest.main()
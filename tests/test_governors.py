@@ -0,0 +1,193 @@
+from __future__ import annotations
+from typing import Callable
+import asyncio
+import threading
+import time
+import unittest
+from nicklib.transforms.testing import limit_calls
+from nicklib.transforms.governors import rate_limit, max_concurrency, once, coalesce
+
+class TestGovernors(unittest.TestCase):
+    def _run_threads(self, target: Callable, n: int):
+        threads = [threading.Thread(target=target) for _ in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def test_limit_calls_threads(self):
+        calls = []
+
+        @limit_calls(5, then=lambda: 'limited')
+        def f():
+            calls.append(1)
+            time.sleep(0.001) # widen the window for a race
+
+        self._run_threads(lambda: [f() for _ in range(20)], 8)
+        assert len(calls) == 5
+        assert f() == 'limited'
+
+    def test_limit_calls_async(self):
+        @limit_calls(1, then=lambda: 'limited')
+        async def f():
+            return 'called'
+
+        async def main():
+            return [await f(), await f()]
+
+        assert asyncio.run(main()) == ['called', 'limited']
+
+    def test_once(self):
+        calls = []
+
+        @once()
+        def init():
+            calls.append(1)
+            time.sleep(0.01)
+            return 'ready'
+
+        results = []
+        self._run_threads(lambda: results.append(init()), 16)
+        assert calls == [1]
+        assert results == ['ready'] * 16
+
+    def test_once_retries(self):
+        attempts = []
+
+        @once()
+        def init():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError()
+            return len(attempts)
+
+        with self.assertRaises(RuntimeError):
+            init()
+        assert init() == 2
+        assert init() == 2
+
+    def test_once_async(self):
+        calls = []
+
+        @once()
+        async def init():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'ready'
+
+        async def main():
+            return await asyncio.gather(*[init() for _ in range(10)])
+
+        assert asyncio.run(main()) == ['ready'] * 10
+        assert calls == [1]
+
+    def test_max_concurrency(self):
+        lock = threading.Lock()
+        running, peak = 0, 0
+
+        @max_concurrency(3)
+        def work():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.005)
+            with lock:
+                running -= 1
+
+        self._run_threads(work, 12)
+        assert peak <= 3
+
+        started, release = threading.Event(), threading.Event()
+
+        @max_concurrency(1, block=False, then=lambda: 'busy')
+        def hold():
+            started.set()
+            release.wait()
+
+        t = threading.Thread(target=hold)
+        t.start()
+        started.wait()
+        assert hold() == 'busy'
+        release.set()
+        t.join()
+
+    def test_max_concurrency_async(self):
+        running, peak = 0, 0
+
+        @max_concurrency(2)
+        async def work():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.005)
+            running -= 1
+
+        async def main():
+            await asyncio.gather(*[work() for _ in range(8)])
+
+        asyncio.run(main())
+        assert peak == 2
+
+        # and again from another loop
+        peak = 0
+        asyncio.run(main())
+        assert peak == 2
+
+    def test_rate_limit(self):
+        @rate_limit(1000, burst=2, block=False, then=lambda: 'refused')
+        def f():
+            return 'called'
+
+        assert [f(), f(), f()] == ['called', 'called', 'refused']
+        time.sleep(0.005)
+        assert f() == 'called'
+
+        @rate_limit(200, burst=1)
+        def g():
+            pass
+
+        start = time.monotonic()
+        for _ in range(5):
+            g()
+        assert time.monotonic() - start >= 4 / 200 * 0.9
+
+    def test_coalesce(self):
+        batches = []
+
+        @coalesce(max_size=4, window=0.01)
+        async def get(keys):
+            batches.append(list(keys))
+            await asyncio.sleep(0)
+            return [key * 10 for key in keys]
+
+        async def main():
+            return await asyncio.gather(*[get(i) for i in range(10)])
+
+        # full batches are sent at once, the rest after the window
+        assert asyncio.run(main()) == [i * 10 for i in range(10)]
+        assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+        # and again in another event loop
+        assert asyncio.run(main()) == [i * 10 for i in range(10)]
+        assert len(batches) == 6
+
+    def test_coalesce_errors(self):
+        @coalesce(window=0)
+        def get(keys): # a plain function is called with the batch too
+            if 'missing' in keys:
+                raise KeyError('missing')
+            return keys[1:]
+
+        async def main(*keys):
+            return await asyncio.gather(*[get(key) for key in keys], return_exceptions=True)
+
+        # every caller of a failed batch is given its error
+        assert [type(e) for e in asyncio.run(main('a', 'missing'))] == [KeyError, KeyError]
+        assert [type(e) for e in asyncio.run(main('a', 'b'))] == [ValueError, ValueError] # too few results
+
+        with self.assertRaises(ValueError):
+            coalesce(max_size=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+import asyncio
+import json
+import threading
+import time
+import unittest
+from nicklib.transforms.arguments import take_args_as_list, validate_args
+from nicklib.transforms.instrument import _BUCKETS, _bucket, _bucket_bounds, Registry, instrument, instrument_stack
+
+class TestInstrument(unittest.TestCase):
+    def test_buckets(self):
+        assert [_bucket(v) for v in range(16)] == list(range(16))
+        for value in (16, 17, 100, 1000, 12345, 10**9, 2**47):
+            low, high = _bucket_bounds(_bucket(value))
+            assert low <= value < high
+            assert high - low <= max(1, low / 8)
+        assert _bucket(2**60) == _BUCKETS - 1
+
+    def test_counts_and_percentiles(self):
+        reg = Registry()
+
+        @instrument(registry=reg)
+        def f(x):
+            if x < 0:
+                raise ValueError()
+            time.sleep(x)
+
+        for _ in range(20):
+            f(0)
+        f(0.01)
+        with self.assertRaises(ValueError):
+            f(-1)
+
+        stats = reg.snapshot()[f.__qualname__]
+        assert stats['calls'] == 22 and stats['errors'] == 1 and stats['sampled'] == 22
+        assert stats['p50_ns'] < 5e6
+        assert stats['max_ns'] >= 1e7
+        assert stats['p999_ns'] >= 0.8e7
+        assert json.loads(reg.to_json())[f.__qualname__]['calls'] == 22
+
+        reg.reset()
+        assert reg.snapshot()[f.__qualname__]['calls'] == 0
+        f(0)
+        assert reg.snapshot()[f.__qualname__]['calls'] == 1
+
+    def test_sampling_and_threads(self):
+        reg = Registry()
+        f = instrument('f', sample=4, concurrency=True, registry=reg)(lambda: time.sleep(0.001))
+
+        threads = [threading.Thread(target=lambda: [f() for _ in range(8)]) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = reg.snapshot()['f']
+        assert stats['calls'] == 32
+        assert stats['sampled'] == 8
+        assert stats['in_flight'] == 0
+        assert 1 <= stats['max_in_flight'] <= 4
+
+    def test_allocations(self):
+        reg = Registry()
+        f = instrument('f', allocations=True, registry=reg)(lambda: bytearray(10000))
+        # not yet called
+        g = instrument('g', allocations=True, registry=reg)(lambda: None)
+        assert reg.snapshot()['g']['alloc_max_bytes'] is None
+        assert json.loads(reg.to_json())['g']['calls'] == 0
+
+        kept = [f() for _ in range(3)]
+        assert reg.snapshot()['f']['alloc_max_bytes'] >= 10000
+
+    def test_async(self):
+        reg = Registry()
+
+        @instrument('f', concurrency=True, registry=reg)
+        async def f(x):
+            await asyncio.sleep(x)
+            if x == 0:
+                raise ValueError()
+            return x
+
+        async def main():
+            with self.assertRaises(ValueError):
+                await f(0)
+            return await asyncio.gather(f(0.02), f(0.02))
+
+        assert asyncio.run(main()) == [0.02, 0.02]
+        stats = reg.snapshot()['f']
+        assert stats['calls'] == 3 and stats['errors'] == 1
+        assert stats['max_ns'] >= 2e7 # the time until awaited, not until the coroutine is made
+        assert stats['max_in_flight'] == 2 and stats['in_flight'] == 0
+
+    def test_stack(self):
+        reg = Registry()
+
+        @instrument_stack('total', take_args_as_list(), validate_args(lambda nums: None), registry=reg)
+        def total(nums):
+            return sum(nums)
+
+        for _ in range(100):
+            assert total(1, 2, 3) == 6
+
+        snapshot = reg.snapshot()
+        assert set(snapshot) == {'total/take_args_as_list', 'total/validate_args', 'total/total'}
+        assert all(stats['calls'] == 100 for stats in snapshot.values())
+        overheads = reg.layer_overheads('total')
+        assert list(overheads) == ['take_args_as_list', 'validate_args']
+        assert all(ns >= 0 for ns in overheads.values())
+
+if __name__ == '__main__':
+    unittest.main()
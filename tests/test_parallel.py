@@ -0,0 +1,76 @@
+from __future__ import annotations
+import threading
+import time
+import unittest
+from nicklib.transforms.parallel import parallel_map
+
+@parallel_map(pool='process', workers=2)
+def _square(x: int) -> int:
+    return x * x
+
+class TestParallelMap(unittest.TestCase):
+    def test_ordered(self):
+        @parallel_map(workers=4)
+        def double(x):
+            time.sleep(0.001 * (x % 3))
+            return 2 * x
+
+        assert list(double(range(20))) == [2 * x for x in range(20)]
+        assert list(double(1, 2, 3)) == [2, 4, 6]
+        assert list(double([4, 5])) == [8, 10]
+
+    def test_unordered(self):
+        @parallel_map(workers=4, ordered=False, chunk_size=2)
+        def double(x):
+            return 2 * x
+
+        results = list(double(range(11)))
+        assert sorted(results) == [(i, 2 * i) for i in range(11)]
+
+    def test_arguments(self):
+        @parallel_map(pos=1)
+        def scale(factor, x, offset=0):
+            return factor * x + offset
+
+        assert list(scale(3, [1, 2], offset=1)) == [4, 7]
+
+    def test_errors(self):
+        def check(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        results = list(parallel_map(errors='capture')(check)(range(5)))
+        assert results[:3] == [0, 1, 2] and results[4] == 4
+        assert isinstance(results[3], ValueError)
+
+        with self.assertRaises(ValueError):
+            list(parallel_map()(check)(range(5)))
+
+        async def fetch(x):
+            return x
+
+        with self.assertRaises(TypeError):
+            parallel_map()(fetch)
+
+    def test_bounded(self):
+        lock = threading.Lock()
+        read = 0
+
+        def source():
+            nonlocal read
+            for i in range(1000):
+                with lock:
+                    read += 1
+                yield i
+
+        results = parallel_map(workers=2, chunk_size=1, max_in_flight=4)(lambda x: x)(source())
+        assert next(results) == 0
+        assert read <= 5 # only what's in flight has been read
+        assert sum(results) == sum(range(1, 1000))
+
+    def test_process_pool(self):
+        assert list(_square(range(10))) == [x * x for x in range(10)]
+
+if __name__ == '__main__':
+    unittest.main()
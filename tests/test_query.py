@@ -0,0 +1,103 @@
+from __future__ import annotations
+import unittest
+from nicklib.tupleclass import TupleClass
+from nicklib.table import TupleClassTable
+from nicklib.query import Query
+
+class Sale(TupleClass):
+    shop: str
+    day: int
+    amount: float
+
+class Shop(TupleClass, frozen=True):
+    name: str
+    city: str
+
+SALES = [Sale('a', 2, 5.0), Sale('b', 1, 7.0), Sale('a', 1, 3.0), Sale('c', 2, 1.0), Sale('b', 2, 9.0)]
+
+class TestQuery(unittest.TestCase):
+    def test_sort(self):
+        q = Query(SALES)
+        assert q.sort('amount').to_list() == sorted(SALES, key=lambda s: s.amount)
+        assert q.sort('day', 'amount', descending=(False, True)).to_list() == sorted(SALES, key=lambda s: (s.day, -s.amount))
+        assert q.sort('shop', descending=True).to_list() == sorted(SALES, key=lambda s: s.shop, reverse=True)
+
+        # views hold the records themselves, by index
+        assert q.sort('amount')[0] is SALES[3]
+        assert q.sort('amount').indices.tolist() == [3, 2, 0, 1, 4]
+
+        # stable for equal keys, and a sort of a view sorts only its records
+        assert q.sort('shop').indices.tolist() == [0, 2, 1, 4, 3]
+        assert q[1:].sort('day').indices.tolist() == [1, 2, 3, 4]
+
+    def test_where(self):
+        q = Query(SALES)
+        big = q.where(q.column('amount') > 4.0)
+        assert big.to_list() == [SALES[0], SALES[1], SALES[4]]
+        assert list(big.column('shop')) == ['a', 'b', 'b']
+        with self.assertRaises(IndexError):
+            q.where([True])
+
+    def test_group_by(self):
+        q = Query(SALES)
+        by_shop = q.group_by('shop')
+        assert len(by_shop) == 3
+        assert by_shop.keys == ['a', 'b', 'c'] # in order of first appearance
+        assert list(by_shop.sizes()) == [2, 2, 1]
+        assert by_shop['b'].to_list() == [SALES[1], SALES[4]]
+        assert [key for key, _ in by_shop] == by_shop.keys
+
+        result = by_shop.aggregate(total=('amount', 'sum'), mean=('amount', 'mean'), sales='count',
+                                   last=('day', 'last'), days=('day', lambda days: sorted(days.tolist())))
+        assert result['shop'] == ['a', 'b', 'c']
+        assert result['total'].tolist() == [8.0, 16.0, 1.0]
+        assert result['mean'].tolist() == [4.0, 8.0, 1.0]
+        assert result['sales'].tolist() == [2, 2, 1]
+        assert result['last'].tolist() == [1, 2, 2]
+        assert result['days'] == [[1, 2], [1, 2], [2]]
+        with self.assertRaises(ValueError):
+            by_shop.aggregate(x=('amount', 'median'))
+
+        by_shop_day = q.group_by('shop', 'day')
+        assert by_shop_day.keys == [('a', 2), ('b', 1), ('a', 1), ('c', 2), ('b', 2)]
+        assert q.group_by('day').keys == [2, 1]
+
+        # only the groups of records in a view
+        view = q.where(q.column('shop') != 'a').group_by('shop')
+        assert view.keys == ['b', 'c']
+        assert view.aggregate(total=('amount', 'sum'))['total'].tolist() == [16.0, 1.0]
+
+    def test_join(self):
+        shops = [Shop('a', 'x'), Shop('b', 'y'), Shop('b', 'z'), Shop('d', 'w')]
+        joined = Query(SALES).join(Query(shops), on='shop', right_on='name')
+        expected = [(sale, shop) for sale in SALES for shop in shops if sale.shop == shop.name]
+        assert list(joined) == expected
+        assert len(joined) == 6
+        assert joined.left.column('day').tolist() == [2, 1, 1, 1, 2, 2]
+
+        # on several fields
+        class Target(TupleClass):
+            shop: str
+            day: int
+
+        targets = [Target('b', 2), Target('a', 2)]
+        assert [sale for sale, _ in Query(SALES).join(Query(targets), on=('shop', 'day'))] == [SALES[0], SALES[4]]
+
+    def test_table(self):
+        table = TupleClassTable(Sale, SALES)
+        q = Query(table)
+        assert q.record_cls is Sale
+        assert q.sort('amount')[0].to_record() == SALES[3]
+        assert q.group_by('day').aggregate(total=('amount', 'sum'))['total'].tolist() == [15.0, 10.0]
+
+    def test_empty(self):
+        q = Query([], Sale)
+        assert q.sort('day').to_list() == []
+        assert len(q.group_by('shop')) == 0
+        result = q.group_by('shop').aggregate(n='count', total=('amount', 'sum'))
+        assert result['shop'] == [] and len(result['n']) == 0 and len(result['total']) == 0
+        assert len(q.join(Query(SALES), on='shop')) == 0
+        assert len(Query(SALES).join(q, on='shop')) == 0
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import os
+import tempfile
+import unittest
+import numpy as np
+from nicklib.tupleclass import TupleClass
+from nicklib.vector import Vec, VecArray
+from nicklib.records import record_dtype, write_records, read_records
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, 'test.rec')
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _make_record_cls(self) -> type:
+        class Point(TupleClass):
+            x: float
+            n: int
+            label: str
+
+        return Point
+
+    def test_record_dtype(self):
+        Point = self._make_record_cls()
+        dtype = record_dtype(Point, {'label': 4})
+        assert dtype.names == ('x', 'n', 'label')
+        assert dtype['x'] == np.float64
+        assert dtype['label'] == np.dtype('U4')
+
+        with self.assertRaises(TypeError):
+            record_dtype(Point)
+
+    def test_round_trip(self):
+        Point = self._make_record_cls()
+        points = [Point(float(i), i, str(i)) for i in range(10)]
+        assert write_records(self.path, Point, points, sizes={'label': 4}, chunk_size=3) == 10
+
+        table = read_records(self.path, Point)
+        assert len(table) == 10
+        assert isinstance(table['x'], np.memmap) or isinstance(table['x'].base, np.memmap)
+        assert table[3].x == 3.0
+        assert table[3] == (3.0, 3, '3')
+        assert table[9].to_record() == points[9]
+
+        # read only by default
+        with self.assertRaises(ValueError):
+            table[0].x = 1.0
+
+    def test_append_and_write_through(self):
+        Point = self._make_record_cls()
+        write_records(self.path, Point, [Point(1.0, 1, 'a')], sizes={'label': 1})
+        write_records(self.path, Point, [(2.0, 2, 'b')], sizes={'label': 1}, append=True)
+
+        table = read_records(self.path, Point, mode='r+')
+        assert len(table) == 2
+        table[1].n = 20
+        table['x'].flush()
+        assert read_records(self.path, Point)[1].n == 20
+
+    def test_validation(self):
+        Point = self._make_record_cls()
+        write_records(self.path, Point, [Point(1.0, 1, 'a')], sizes={'label': 1})
+
+        class Other(TupleClass):
+            x: float
+            n: float
+            label: str
+
+        with self.assertRaises(ValueError):
+            read_records(self.path, Other)
+
+        with open(self.path, 'wb') as file:
+            file.write(b'not a record file')
+        with self.assertRaises(ValueError):
+            read_records(self.path, Point)
+
+    def test_vecs(self):
+        class VecXY(Vec):
+            x: float
+            y: float
+
+        write_records(self.path, VecXY, VecXY.batch([[1, 2], [3, 4]]))
+        write_records(self.path, VecXY, [VecXY(5, 6)], append=True)
+
+        vecs = read_records(self.path, VecXY)
+        assert isinstance(vecs, VecArray)
+        assert len(vecs) == 3
+        assert isinstance(vecs[2], VecXY)
+        assert vecs[2].y == 6
+        assert list(vecs.x) == [1, 3, 5]
+
+if __name__ == '__main__':
+    unittest.main()
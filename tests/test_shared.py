@@ -0,0 +1,114 @@
+from __future__ import annotations
+import itertools
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from nicklib.vector import Vec, VecArray
+from nicklib.shared import SharedVecBuffer
+
+class VecXY(Vec):
+    x: float
+    y: float
+
+def _step(buffer: SharedVecBuffer, part: int) -> float:
+    rows = slice(part * 25, (part + 1) * 25)
+    with buffer.locked(rows):
+        buffer.value[rows] += 1.0
+    return float(buffer.value.x[rows].sum())
+
+class TestSharedVecBuffer(unittest.TestCase):
+    def test_create(self):
+        with SharedVecBuffer.create(VecXY, [[1.0, 2.0], [3.0, 4.0]]) as buffer:
+            assert isinstance(buffer.value, VecArray)
+            assert buffer.value.x.tolist() == [1.0, 3.0]
+            assert buffer.handle.shape == (2, 2)
+
+            # pickled by name, and attached to once per process
+            assert pickle.loads(pickle.dumps(buffer)) is buffer
+            assert len(pickle.dumps(buffer)) < 300
+
+        # unlinked by its owner on leaving the context
+        with self.assertRaises(FileNotFoundError):
+            SharedVecBuffer.attach(buffer.handle)
+        with self.assertRaises(ValueError):
+            buffer.value
+
+    def test_single_vec(self):
+        with SharedVecBuffer.create(VecXY, VecXY(1.0, 2.0)) as buffer:
+            assert isinstance(buffer.value, VecXY)
+            buffer.value.x = 5.0
+            assert list(buffer.value) == [5.0, 2.0]
+            with self.assertRaises(RuntimeError):
+                with buffer.locked():
+                    pass
+
+    def test_close_with_views(self):
+        buffer = SharedVecBuffer.create(VecXY, 10)
+        try:
+            column = buffer.value.x
+            with self.assertRaises(BufferError):
+                buffer.close()
+            assert buffer.value.x.sum() == 0.0 # still open
+            del column
+            buffer.close()
+        finally:
+            buffer.unlink()
+
+        # a view held only by a reference cycle is collected
+        with SharedVecBuffer.create(VecXY, 10) as buffer:
+            cycle = [buffer.value.y]
+            cycle.append(cycle)
+            del cycle
+
+    def test_attach_from_another_program(self):
+        # a process not started through multiprocessing has a resource tracker of its own,
+        # which would otherwise unlink the segment as the process exits
+        code = 'import pickle, sys; buffer = pickle.loads(bytes.fromhex(sys.argv[1])); buffer.value.x[:] = 2.0; buffer.close()'
+        tests = os.path.dirname(os.path.abspath(__file__))
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join([os.path.dirname(tests), tests])}
+        with SharedVecBuffer.create(VecXY, 10) as buffer:
+            result = subprocess.run([sys.executable, '-c', code, pickle.dumps(buffer).hex()], env=env, capture_output=True, text=True)
+            assert result.returncode == 0, result.stderr
+            assert 'leaked' not in result.stderr
+            assert buffer.value.x.sum() == 20.0
+            buffer.close()
+            SharedVecBuffer.attach(buffer.handle).close() # still there to attach to
+
+    def test_locks(self):
+        with SharedVecBuffer.create(VecXY, 10, locks=3) as buffer:
+            # stripes of 4 rows
+            assert list(buffer._stripes(slice(0, 4))) == [0]
+            assert list(buffer._stripes(slice(3, 5))) == [0, 1]
+            assert list(buffer._stripes(slice(4, 9))) == [1, 2]
+            assert list(buffer._stripes(-1)) == [2]
+            assert list(buffer._stripes(None)) == [0, 1, 2]
+            with buffer.locked(slice(2, 5)):
+                buffer.value[2:5] = 1.0
+            assert buffer.value.x.sum() == 3.0
+        with self.assertRaises(ValueError):
+            SharedVecBuffer.create(VecXY, 2, locks=3)
+
+    def test_processes(self):
+        for method in ('fork', 'spawn'):
+            context = multiprocessing.get_context(method)
+            with SharedVecBuffer.create(VecXY, 100, locks=4, context=context) as buffer:
+                if method == 'spawn': # rather than inherited, the locks are only passed as the workers start
+                    with ProcessPoolExecutor(1, mp_context=context) as pool:
+                        with self.assertRaises(RuntimeError):
+                            list(pool.map(_step, [buffer], [0]))
+
+                # the buffer is passed by name with each task
+                with ProcessPoolExecutor(2, mp_context=context, initializer=_attach, initargs=(buffer,)) as pool:
+                    assert list(pool.map(_step, itertools.repeat(buffer, 4), range(4))) == [25.0] * 4
+                assert np.all(buffer.value.x == 1.0)
+
+def _attach(buffer: SharedVecBuffer):
+    pass # unpickling the buffer attaches to it, with its locks
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+import unittest
+import numpy as np
+from nicklib.vector import Vec
+from nicklib.spatial import GridIndex
+from nicklib.testing import measure_time
+
+class TestGridIndex(unittest.TestCase):
+    def _brute_radius(self, points: np.ndarray, q: np.ndarray, r: float) -> set[int]:
+        return set(np.flatnonzero(np.sqrt(((points - q)**2).sum(axis=1)) <= r).tolist())
+
+    def test_radius(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(-10, 10, size=(500, 2))
+        index = GridIndex(points)
+
+        queries = rng.uniform(-10, 10, size=(20, 2))
+        for r in (0.5, 2.0, 7.0):
+            results = index.query_radius(queries, r)
+            assert len(results) == 20
+            for q, ids in zip(queries, results):
+                assert set(ids.tolist()) == self._brute_radius(points, q, r)
+
+        # a single query point
+        ids, dists = index.query_radius(queries[0], 2.0, return_distances=True)
+        assert set(ids.tolist()) == self._brute_radius(points, queries[0], 2.0)
+        assert (dists <= 2.0).all()
+
+    def test_vecs(self):
+        class VecXY(Vec):
+            x: float
+            y: float
+
+        vecs = VecXY.batch([[0, 0], [1, 0], [5, 5]])
+        index = GridIndex(vecs, cell_size=1.0)
+        assert set(index.query_radius(VecXY(0, 0), 1.5).tolist()) == {0, 1}
+        assert set(GridIndex([VecXY(0, 0), VecXY(3, 0)]).query_radius(VecXY(2, 0), 1.0).tolist()) == {1}
+
+    def test_knn(self):
+        rng = np.random.default_rng(1)
+        points = rng.normal(size=(1000, 3))
+        index = GridIndex(points)
+
+        queries = rng.normal(size=(10, 3)) * 3 # some are far outside the points
+        ids, dists = index.query_knn(queries, k=5)
+        assert ids.shape == (10, 5)
+        for q, row, drow in zip(queries, ids, dists):
+            expected = np.argsort(np.sqrt(((points - q)**2).sum(axis=1)))[:5]
+            assert list(row) == list(expected)
+            assert (np.diff(drow) >= 0).all()
+
+        # far outside the points, where the neighbouring cells would outnumber them
+        points = rng.random((1000, 3))
+        index = GridIndex(points)
+        far = np.array([[5.0, 5.0, 5.0], [20.0, 20.0, 20.0]])
+        ids, _ = index.query_knn(far, k=2)
+        for q, row in zip(far, ids):
+            assert list(row) == list(np.argsort(((points - q)**2).sum(axis=1))[:2])
+        assert len(index.query_radius([0.5, 0.5, 0.5], 100.0)) == 1000
+        assert measure_time(lambda: index.query_knn(far, k=2), repeat=1, warmup=0, min_time=0)['min'] < 1.0
+
+        ids, dists = GridIndex([[0.0, 0.0]]).query_knn([1.0, 0.0], k=2)
+        assert list(ids) == [0, -1]
+        assert dists[1] == np.inf
+
+    def test_pairs(self):
+        rng = np.random.default_rng(2)
+        points = rng.uniform(0, 10, size=(300, 2))
+        index = GridIndex(points)
+
+        expected = {(i, j) for i in range(300) for j in range(i + 1, 300) if np.linalg.norm(points[i] - points[j]) <= 0.5}
+        assert set(map(tuple, index.pairs(0.5).tolist())) == expected
+
+    def test_incremental(self):
+        index = GridIndex([[0.0, 0.0], [10.0, 10.0]], cell_size=1.0)
+
+        ids = index.insert([[0.5, 0.0], [20.0, 20.0]])
+        assert list(ids) == [2, 3]
+        assert set(index.query_radius([0.0, 0.0], 1.0).tolist()) == {0, 2}
+
+        index.move(1, [0.0, 0.5])
+        assert set(index.query_radius([0.0, 0.0], 1.0).tolist()) == {0, 1, 2}
+        assert index.query_radius([10.0, 10.0], 1.0).tolist() == []
+
+        index.remove(0)
+        assert 0 not in index
+        assert len(index) == 3
+        assert set(index.query_radius([0.0, 0.0], 1.0).tolist()) == {1, 2}
+
+        # the same results after rebuilding the grid
+        index.rebuild()
+        assert set(index.query_radius([0.0, 0.0], 1.0).tolist()) == {1, 2}
+        assert list(index.query_knn([19.0, 19.0], k=1)[0]) == [3]
+
+        # growing past the initial capacity
+        index.insert(np.zeros((100, 2)))
+        assert len(index) == 103
+
+    def test_pending_pairs(self):
+        rng = np.random.default_rng(3)
+        points = rng.uniform(0, 100, size=(20_000, 2))
+        index = GridIndex(points)
+        fresh = measure_time(lambda: index.pairs(0.5), repeat=3, warmup=0, min_time=0)['min']
+
+        # just under the rebuild threshold, so every moved point is kept aside
+        ids = rng.choice(len(points), 1000, replace=False)
+        points[ids] += rng.normal(0, 0.2, size=(1000, 2))
+        index.move(ids, points[ids])
+        assert len(index._pending) == 1000
+        moved = measure_time(lambda: index.pairs(0.5), repeat=3, warmup=0, min_time=0)['min']
+        assert set(map(tuple, index.pairs(0.5).tolist())) == set(map(tuple, GridIndex(points).pairs(0.5).tolist()))
+
+        # the points kept aside are found by cell too, rather than compared with every query
+        assert moved < 3 * fresh, (moved, fresh)
+
+if __name__ == '__main__':
+    unittest.main()
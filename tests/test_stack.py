@@ -0,0 +1,78 @@
+from __future__ import annotations
+import copy
+import pickle
+import unittest
+from nicklib.stack import _number_kind, BottomlessStack, TypedStack, StackCounter
+
+class TestStack(unittest.TestCase):
+    def test_bottomless(self):
+        stack = BottomlessStack([1, 2], default='empty')
+        assert stack.peek() == 2
+        assert stack.pop() == 2
+        assert stack.pop() == 1
+        assert stack.pop() == 'empty'
+        assert not stack and len(stack) == 0
+
+        stack.push_many('abc')
+        assert list(stack) == ['a', 'b', 'c']
+        assert stack.pop_many(2) == ['b', 'c']
+        assert stack.pop_many(3) == ['empty', 'empty', 'a']
+        assert stack.pop_many(0) == []
+
+    def test_typed(self):
+        import numpy as np
+
+        stack = TypedStack(float, [1.0, 2.0])
+        assert stack.typecode == 'd'
+        stack.push(3)
+        assert stack.pop() == 3.0
+        assert isinstance(stack.pop(), float)
+
+        stack.push_many(np.arange(5.0)) # copied as a buffer
+        stack.push_many(np.arange(2)) # converted from another type
+        stack.push_many(range(3))
+        assert len(stack) == 11
+        assert stack.pop_many(3).tolist() == [0.0, 1.0, 2.0]
+        assert np.frombuffer(stack.pop_many(7), dtype=np.float64).tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 0.0, 1.0]
+        stack.clear()
+        assert stack.pop() == 0
+        assert stack.pop_many(2).tolist() == [0.0, 0.0]
+
+        ints = TypedStack('i', default=-1)
+        ints.push_many([1, 2, 3])
+        assert ints.pop_many(4).tolist() == [-1, 1, 2, 3]
+        with self.assertRaises(TypeError):
+            ints.push(1.5)
+
+        # numpy's int64 buffers have format 'l' rather than array's 'q', but are copied as buffers all the same
+        big = TypedStack(int)
+        assert _number_kind(memoryview(np.arange(3)).format) == _number_kind(big.typecode) == 'i'
+        big.push_many(np.arange(3))
+        big.push_many(np.arange(2, dtype=np.int32)) # of another size, converted
+        assert big.pop_many(5).tolist() == [0, 1, 2, 0, 1]
+        assert _number_kind('?') is None
+
+    def test_copies(self):
+        for stack in (BottomlessStack([1, 2], default=0), TypedStack(int, [1, 2])):
+            for duplicate in (copy.copy(stack), copy.deepcopy(stack), pickle.loads(pickle.dumps(stack))):
+                # the copy's push goes to its own storage
+                duplicate.push(3)
+                assert list(duplicate) == [1, 2, 3]
+                assert list(stack) == [1, 2]
+                assert duplicate.default == stack.default
+
+    def test_counter(self):
+        counter = StackCounter()
+        with counter:
+            with counter:
+                assert counter.depth == 2
+            counter.push(3)
+        assert counter.depth == 3
+        assert counter.high_water == 4
+        counter.pop(5)
+        assert counter.depth == 0 and counter.underflows == 2
+        assert counter.pushes == 5 and counter.pops == 7
+        assert counter.mean_depth == (1 + 2 + 1 + 4 + 3 + 0) / 6
+
+if __name__ == '__main__':
+    unittest.main()
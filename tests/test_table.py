@@ -0,0 +1,126 @@
+from __future__ import annotations
+import gc
+import unittest
+import weakref
+import numpy as np
+from nicklib.tupleclass import TupleClass
+from nicklib.table import TupleClassTable, _row_classes
+
+class Sample(TupleClass):
+    value: np.float32
+    count: np.int16
+
+class TestTupleClassTable(unittest.TestCase):
+    def _make_table(self) -> TupleClassTable:
+        class Point(TupleClass):
+            x: float
+            y: int
+            label: str = 'none'
+
+        table = TupleClassTable(Point)
+        table.append(Point(1.0, 2, 'a'))
+        table.extend([(3.0, 4, 'b'), Point(5.0, 6)])
+        return table
+
+    def test_columns(self):
+        table = self._make_table()
+        assert len(table) == 3
+        assert table['x'].dtype == np.float64
+        assert table['y'].dtype == np.int64
+        assert table['label'] == ['a', 'b', 'none']
+        assert list(table['x']) == [1.0, 3.0, 5.0]
+
+        table['y'] = table['y'] * 10
+        assert list(table['y']) == [20, 40, 60]
+
+        table['label'] = 'same'
+        assert table['label'] == ['same'] * 3
+        for values in (['a', 'b'], ['a', 'b', 'c', 'd']):
+            with self.assertRaises(ValueError):
+                table['label'] = values
+            with self.assertRaises(ValueError):
+                table['y'] = [1] * len(values)
+        assert table['label'] == ['same'] * 3
+
+    def test_annotations(self):
+        # string annotations, under from __future__ import annotations, are resolved to their numpy types
+        table = TupleClassTable(Sample, [(1.5, 2)])
+        assert table['value'].dtype == np.float32
+        assert table['count'].dtype == np.int16
+
+    def test_row_class_collected(self):
+        class Temporary(TupleClass):
+            x: float
+
+        TupleClassTable(Temporary, [(1.0,)])[0].to_record()
+        assert Temporary in _row_classes
+        ref = weakref.ref(Temporary)
+        del Temporary
+        gc.collect()
+        assert ref() is None
+
+    def test_rows(self):
+        table = self._make_table()
+        row = table[1]
+        assert row.x == 3.0
+        assert row[2] == 'b'
+        assert table[-1].label == 'none'
+        x, y, label = row
+        assert (x, y, label) == (3.0, 4, 'b')
+        assert row == (3.0, 4, 'b')
+        assert len(row) == 3
+
+        # rows are views
+        row.x = 7.0
+        assert table['x'][1] == 7.0
+        table[0] = (0.0, 0, 'z')
+        assert table[0].label == 'z'
+
+        record = row.to_record()
+        assert isinstance(record, table.record_cls)
+        assert record == (7.0, 4, 'b')
+
+        with self.assertRaises(IndexError):
+            table[3]
+
+    def test_selection(self):
+        table = self._make_table()
+
+        selected = table[table['x'] > 2.0]
+        assert len(selected) == 2
+        assert selected['label'] == ['b', 'none']
+        assert list(selected['y']) == [4, 6]
+
+        # selections are copies
+        selected[0].x = 100.0
+        assert table[1].x == 3.0
+
+        assert table[1:]['label'] == ['b', 'none']
+        assert table[[2, 0]]['label'] == ['none', 'a']
+
+    def test_failed_append(self):
+        class Labelled(TupleClass):
+            label: str
+            x: float
+
+        # a value a numeric column can't take leaves every column as it was
+        table = TupleClassTable(Labelled, [('a', 1.0)])
+        with self.assertRaises(ValueError):
+            table.append(('b', 'oops'))
+        with self.assertRaises(ValueError):
+            table.extend([('b', 2.0), ('c', 'oops')])
+        table.append(('d', 3.0))
+        assert table.to_records() == [Labelled('a', 1.0), Labelled('d', 3.0)]
+        assert table['label'] == ['a', 'd']
+
+    def test_growth(self):
+        table = self._make_table()
+        table.extend(table)
+        table.extend([(float(i), i, str(i)) for i in range(100)])
+        assert len(table) == 106
+        assert table[105] == (99.0, 99, '99')
+        assert table[3] == (1.0, 2, 'a')
+        assert len(table.to_records()) == 106
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+import time
+import unittest
+from nicklib.testing import PerformanceAssertions, assert_error, assert_time_under, assert_allocations_under, assert_complexity
+
+class TestPerformanceAssertions(PerformanceAssertions, unittest.TestCase):
+    def test_assert_error(self):
+        assert assert_error(None, int, '1') == 1
+        assert_error(ValueError, int, 'a')
+        with self.assertRaises(AssertionError):
+            assert_error(None, int, 'a')
+
+    def test_time(self):
+        stats = self.assertTimeUnder(0.01, lambda: sum(range(100)), min_time=0.001)
+        assert stats['min'] <= stats['median'] <= stats['max']
+        assert stats['samples'] == 7 and stats['number'] > 1
+
+        with self.assertRaises(AssertionError) as failure:
+            assert_time_under(1e-6, lambda: time.sleep(0.001), repeat=4, min_time=0.001)
+        assert 'over its budget of 1 us' in str(failure.exception)
+        assert 'median' in str(failure.exception)
+
+    def test_allocations(self):
+        stats = self.assertAllocationsUnder(lambda: bytearray(100_000), max_peak_bytes=200_000, max_retained_blocks=0)
+        assert stats['peak_bytes'] >= 100_000
+
+        with self.assertRaises(AssertionError) as failure:
+            assert_allocations_under(lambda: bytearray(100_000), max_peak_bytes=10_000)
+        assert 'peak_bytes' in str(failure.exception)
+
+        # what a call keeps, once its result is dropped
+        kept = []
+        with self.assertRaises(AssertionError) as failure:
+            assert_allocations_under(lambda: kept.append(bytearray(1000)), max_retained_bytes=100, calls=10)
+        assert 'retained_bytes' in str(failure.exception)
+
+    def test_complexity(self):
+        fit = self.assertScales('O(n)', lambda n: sum(range(n)), sizes=(10_000, 40_000, 160_000), min_time=0.005)
+        assert 0.5 < fit['exponent'] < 1.5
+
+        # a quadratic function isn't linear
+        with self.assertRaises(AssertionError) as failure:
+            assert_complexity('O(n)', lambda items: [x for x in items for _ in items], sizes=(100, 200, 400),
+                              setup=lambda n: list(range(n)), min_time=0.005)
+        assert 'grows faster than O(n)' in str(failure.exception)
+
+        with self.assertRaises(ValueError):
+            assert_complexity('O(2^n)', len, sizes=(10, 20))
+
+if __name__ == '__main__':
+    unittest.main()
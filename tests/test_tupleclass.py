@@ -0,0 +1,258 @@
+from __future__ import annotations
+import unittest
+from nicklib.tupleclass import TupleClass
+
+class TestTupleClass(unittest.TestCase):
+    def _make_dummy_TupleClass(self) -> type:
+        class Dummy(TupleClass):
+            x: int # no default
+            y: str = 'default'
+        
+        return Dummy
+
+    def test_tuple_behavior(self):
+        Dummy = self._make_dummy_TupleClass()
+            
+        # a Dummy is a subclass of tuple (not really, but python thinks so)
+        assert issubclass(Dummy, tuple)
+        
+        # a Dummy is a tuple
+        d = Dummy(10,'hi')
+        assert isinstance(d, tuple)
+        assert isinstance(d, Dummy)
+        assert d[0] == 10
+        assert d[1] == 'hi'
+        assert d == (10, 'hi')
+        assert list(d) == [10, 'hi']
+        assert len(d) == 2
+
+    def test_named_tuple_behavior(self):
+        Dummy = self._make_dummy_TupleClass() 
+
+        # a Dummy is a NamedTuple
+        d = Dummy(10,'hi')
+        assert d.x == 10
+        assert d.y == 'hi'
+
+        # a Dummy supports defaults
+        assert Dummy(10).y == 'default'
+
+        # correct constructor calling
+        assert Dummy(x=10,y='hi') == (10, 'hi')
+        assert Dummy(x=10) == (10, 'default')
+        assert Dummy(10,y='hi') == (10, 'hi')
+
+    def test_mutability(self):
+        d = self._make_dummy_TupleClass()(10,'hi')
+
+        d.x = 11
+        assert d.x == 11
+
+    def test_inheritance(self):
+        class A(TupleClass):
+            a: str = 'a'
+
+        class B(A):
+            b: str = 'b'
+
+        b = B()
+        assert b.a == 'a'
+        assert b.b == 'b'
+
+    def test_inheritance_no_defaults_a(self):
+        class A(TupleClass):
+            a: str
+
+        class B(A):
+            b: str = 'b'
+
+        b = B('a')
+        assert b.a == 'a'
+        assert b.b == 'b'
+
+    def test_inheritance_no_defaults_b(self):
+        class A(TupleClass):
+            a: str = 'a'
+
+        class B(A):
+            b: str
+
+        b = B('b')
+        assert b.a == 'b'
+        assert b.b == None
+
+    def test_inheritance_no_defaults_ab(self):
+        class A(TupleClass):
+            a: str
+
+        class B(A):
+            b: str
+
+        b = B('a', 'b')
+        assert b.a == 'a'
+        assert b.b == 'b'
+
+    def test_inheritance_order(self):
+        class A(TupleClass):
+            a: int
+
+        class B(A):
+            b: int
+
+        class C(B):
+            c: int
+
+        c = C(1, 2, 3)
+        assert (c.a, c.b, c.c) == (1, 2, 3)
+        assert list(c) == [1, 2, 3]
+        assert len(c) == 3
+
+    def test_sequence_behavior(self):
+        Dummy = self._make_dummy_TupleClass()
+        d = Dummy(10, 'hi')
+
+        assert d[-1] == 'hi'
+        assert d[:1] == (10,)
+        assert 'hi' in d
+        assert len(Dummy(10)) == 2 # defaults count too
+
+        d[1] = 'bye'
+        assert d.y == 'bye'
+        x, y = d
+        assert (x, y) == (10, 'bye')
+
+        assert repr(d) == "Dummy(x=10, y='bye')"
+        assert str(d) == "Dummy(10, 'bye')"
+
+    def test_comparison(self):
+        Dummy = self._make_dummy_TupleClass()
+
+        assert Dummy(1, 'a') < Dummy(2, 'a')
+        assert Dummy(1, 'a') <= Dummy(1, 'a')
+        assert Dummy(1, 'b') > (1, 'a')
+        assert Dummy(1, 'a') != Dummy(1, 'b')
+        assert Dummy(1, 'a') != None
+        assert sorted([Dummy(2), Dummy(1)]) == [(1, 'default'), (2, 'default')]
+
+    def test_slots(self):
+        class Point(TupleClass, slots=True):
+            x: int
+            y: int = 5
+
+        class Point3(Point):
+            z: int
+
+        p = Point(1)
+        assert not hasattr(p, '__dict__')
+        assert (p.x, p.y) == (1, 5)
+        p.x = 2
+        p[1] = 3
+        assert p == (2, 3)
+        assert list(p) == [2, 3]
+        assert p[:] == (2, 3)
+        with self.assertRaises(AttributeError):
+            p.w = 1
+
+        # slots storage is inherited
+        q = Point3(1, 2, 3)
+        assert not hasattr(q, '__dict__')
+        assert q == (1, 2, 3)
+        assert repr(q) == 'Point3(x=1, y=2, z=3)'
+
+    def test_copy(self):
+        import copy
+        Dummy = self._make_dummy_TupleClass()
+
+        d = Dummy(10, 'hi')
+        assert copy.copy(d) == d
+        assert copy.deepcopy(d) == d
+
+    def test_frozen(self):
+        class Key(TupleClass, frozen=True):
+            user: str
+            day: int = 1
+
+        class DayKey(Key):
+            hour: int = 0
+
+        k = Key('a')
+        assert not hasattr(k, '__dict__')
+        assert (k.user, k.day) == ('a', 1)
+        assert k == ('a', 1) and k[-1] == 1 and k[:1] == ('a',)
+        with self.assertRaises(AttributeError):
+            k.user = 'b'
+        with self.assertRaises(AttributeError):
+            k.other = 'b'
+        with self.assertRaises(TypeError):
+            k[0] = 'b'
+        assert repr(k) == "Key(user='a', day=1)"
+
+        # hashes like the tuple of its values, so can be a key
+        assert hash(k) == hash(('a', 1))
+        counts = {Key('a'): 1}
+        counts[Key('a', 1)] += 1
+        assert counts == {k: 2}
+        assert Key('b') not in {k}
+
+        # frozenness is inherited
+        d = DayKey('a', 2)
+        assert d == ('a', 2, 0)
+        with self.assertRaises(AttributeError):
+            d.hour = 1
+
+    def test_frozen_copy(self):
+        import copy, pickle
+
+        k = FrozenDummy(10, 'hi')
+        assert copy.copy(k) == k
+        assert pickle.loads(pickle.dumps(k)) == k
+
+    def test_intern(self):
+        import pickle
+
+        class Key(TupleClass, intern=True):
+            user: str
+            day: int
+
+        k = Key('a', 1)
+        assert Key('a', 1) is k
+        assert Key('a', 2) is not k
+        assert len(Key._TupleClass_interned) == 2
+        k.__class__._TupleClass_interned.clear()
+        assert Key('a', 1) is not k
+
+        k = InternedDummy(1)
+        assert pickle.loads(pickle.dumps(k)) is k
+
+    def test_cache_hash(self):
+        import pickle
+
+        class Key(TupleClass, cache_hash=True):
+            user: str
+            day: int
+
+        k = Key('a', 1)
+        assert hash(k) == hash(('a', 1)) == hash(k)
+        assert k == Key('a', 1) and k != Key('a', 2)
+        assert k == ('a', 1) and ('a', 2) != k
+        with self.assertRaises(AttributeError):
+            k.user = 'b'
+
+        # the hash isn't pickled, since str hashes differ between processes
+        k = CachedDummy('a')
+        hash(k)
+        assert pickle.loads(pickle.dumps(k)).__dict__ == {}
+
+# picklable classes need to be found at module level
+class FrozenDummy(TupleClass, frozen=True):
+    x: int
+    y: str = 'default'
+
+class InternedDummy(TupleClass, intern=True):
+    x: int
+
+class CachedDummy(TupleClass, cache_hash=True):
+    x: str
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,408 @@
+from __future__ import annotations
+import tracemalloc
+import unittest
+import numpy as np
+from nicklib.vector import _ArrayClass, Vec, VecArray, VecExpr, Vec2, Vec3, Vec4, lazy
+
+class TestVec(unittest.TestCase):
+    def test_basic_array_class(self):
+        class VecXY(_ArrayClass):
+            x: float 
+            y: float
+
+        # test basic methods when all args provided
+        v1 = VecXY(5.5, 1.2)
+        assert v1.x == 5.5
+        assert v1.y == 1.2
+        assert v1[0] == 5.5
+        assert v1[1] == 1.2
+        assert len(v1) == 2
+
+        # test basic methods when not all args provided
+        # values should be initialised to 0.0
+        v1 = VecXY(5.5)
+        assert v1.x == 5.5
+        print(v1.y)
+        assert v1.y == 0.0
+        assert v1[0] == 5.5
+        assert v1[1] == 0.0
+        assert len(v1) == 2
+
+        # test that casting occurs
+        v2 = VecXY(1) 
+        assert v2.x == 1.0
+
+    def test_default_value_array_class(self):
+        class VecXY(_ArrayClass):
+            x: float = 1.0
+            y: float
+
+        v1 = VecXY()
+        assert v1.x == 1.0
+        assert v1.y == 0.0
+        assert v1[0] == 1.0
+        assert v1[1] == 0.0
+        assert len(v1) == 2
+
+    def test_default_value_array_class_2(self):
+        class VecXY(_ArrayClass):
+            x: float
+            y: float = 1.0
+
+        v1 = VecXY()
+        assert v1.x == 0.0
+        assert v1.y == 1.0
+        assert v1[0] == 0.0
+        assert v1[1] == 1.0
+        assert len(v1) == 2
+
+    def test_basic_vec(self):
+        v = Vec(1,2)
+        assert v[0] == 1
+        assert v[1] == 2
+        assert len(v) == 2
+
+        u = v + 1
+        assert u[0] == 2
+
+        assert (v * 2)[1] == 4
+
+        # the original object is unchanged
+        assert v[0] == 1
+        assert v[1] == 2
+        assert len(v) == 2
+
+        v += 1
+        assert v[0] == 2
+        assert v[1] == 3
+        assert len(v) == 2
+
+    def test_typed_vec(self):
+        class VecXY(Vec):
+            x: float
+            y: float
+
+        v = VecXY(1,2)
+        assert v.x == 1
+        assert v[0] == 1
+        assert v.y == 2
+        assert v[1] == 2
+        assert len(v) == 2
+
+        u = v + 1
+        assert u[0] == 2
+        assert u.x == 2
+
+        assert (v * 2)[1] == 4
+        assert (v * 2).y == 4
+
+        # the original object is unchanged
+        assert v[0] == 1
+        assert v.x == 1
+        assert v[1] == 2
+        assert v.y == 2
+        assert len(v) == 2
+
+        v += 1
+        assert v[0] == 2
+        assert v.x == 2
+        assert v[1] == 3
+        assert v.y == 3
+        assert len(v) == 2
+
+    def test_vec_in_place(self):
+        v = Vec(1.0, 2.0)
+        items = v._items
+        v += 1
+        v *= 2
+        v -= Vec(1, 1)
+        v /= 2
+        assert v._items is items # no new buffer was allocated
+        assert list(v) == [1.5, 2.5]
+
+        # an int vector widens to float when needed
+        v = Vec(1, 2)
+        v += 0.5
+        assert list(v) == [1.5, 2.5]
+
+        # but a row of an int VecArray can't, as it would no longer be a view of the array
+        a = VecArray(Vec, np.array([[1, 2], [3, 4]]))
+        row = a[0]
+        with self.assertRaises(TypeError):
+            row += 0.5
+        row += 1
+        assert a._items.tolist() == [[2, 3], [3, 4]]
+
+    def test_vec_comparison(self):
+        class VecXY(Vec):
+            x: float
+            y: float
+
+        # elementwise, as == is
+        assert tuple(VecXY(1, 2) != VecXY(3, 3)) == (True, True)
+        assert tuple(VecXY(1, 2) != VecXY(1, 3)) == (False, True)
+        assert tuple(VecXY(1, 2) != 2) == (True, False)
+        assert isinstance(VecXY(1, 2) != VecXY(1, 2), VecXY)
+
+    def test_vec_ufuncs(self):
+        class VecXY(Vec):
+            x: float
+            y: float
+
+        v = VecXY(4, 9)
+        r = np.sqrt(v)
+        assert isinstance(r, VecXY)
+        assert r.x == 2 and r.y == 3
+        assert np.add.reduce(v) == 13
+        assert (np.asarray(v) == [4, 9]).all()
+
+        # write results into an existing vector
+        out = VecXY()
+        assert np.add(v, VecXY(1, 1), out=out) is out
+        assert out.x == 5 and out.y == 10
+
+        # sequences and other Vecs broadcast like scalars do
+        assert list(v + [1, 2]) == [5, 11]
+        assert list(v - v) == [0, 0]
+        assert list(1 + v) == [5, 10]
+        assert VecXY(3, 4).magnitude() == 5
+        assert list(VecXY(3, 4).direction()) == [0.6, 0.8]
+
+class TestVecArray(unittest.TestCase):
+    def _make_vec_xy(self) -> type:
+        class VecXY(Vec):
+            x: float
+            y: float
+
+        return VecXY
+
+    def test_construction(self):
+        VecXY = self._make_vec_xy()
+
+        a = VecArray(VecXY, 3)
+        assert len(a) == 3
+        assert a._items.shape == (3, 2)
+        assert (a.x == 0.0).all()
+
+        a = VecXY.batch([VecXY(1, 2), VecXY(3, 4)])
+        assert a[1].x == 3
+        assert a[1].y == 4
+
+        a = VecXY.batch([[1, 2], [3, 4]])
+        assert a._items.dtype == float
+        assert list(a[0]) == [1.0, 2.0]
+
+        with self.assertRaises(ValueError):
+            VecXY.batch([[1, 2, 3]])
+
+        # copies and pickles by its array
+        import copy
+        b = copy.deepcopy(a)
+        assert b[1].y == 4.0 and b._vec_cls is VecXY
+        assert not np.shares_memory(a._items, b._items)
+
+    def test_views(self):
+        VecXY = self._make_vec_xy()
+        a = VecXY.batch([[1, 2], [3, 4]])
+
+        # columns are views
+        a.x[0] = 10
+        assert a[0].x == 10
+        a.y = 7
+        assert (a._items[:, 1] == 7).all()
+
+        # rows are views, and are instances of the Vec class
+        v = a[1]
+        assert isinstance(v, VecXY)
+        v.x = 5
+        assert a._items[1, 0] == 5
+        a[1] = VecXY(8, 9)
+        assert v.x == 8 and v.y == 9
+
+        # unpacking of rows
+        assert [tuple(r) for r in a] == [(10, 7), (8, 9)]
+
+    def test_operators(self):
+        VecXY = self._make_vec_xy()
+        a = VecXY.batch([[1, 2], [3, 4]])
+
+        assert ((a + 1)._items == [[2, 3], [4, 5]]).all()
+        assert ((a - VecXY(1, 1))._items == [[0, 1], [2, 3]]).all()
+        assert ((2 * a)._items == [[2, 4], [6, 8]]).all()
+        assert ((a * a)._items == [[1, 4], [9, 16]]).all()
+        assert ((a / 2)._items == [[0.5, 1], [1.5, 2]]).all()
+        assert ((a ** 2)._items == [[1, 4], [9, 16]]).all()
+        assert ((-a)._items == [[-1, -2], [-3, -4]]).all()
+
+        # the original object is unchanged
+        assert (a._items == [[1, 2], [3, 4]]).all()
+
+        b = VecXY.batch([[3, 4], [0, 2]])
+        assert list(b.magnitude()) == [5, 2]
+        assert list(b.direction()[0]) == [0.6, 0.8]
+        assert b.argument()[0] == VecXY(3, 4).argument()
+
+        # in place operators keep existing views valid
+        col = a.x
+        a += 1
+        a *= 2
+        assert list(col) == [4, 8]
+
+    def test_ufuncs(self):
+        VecXY = self._make_vec_xy()
+        a = VecXY.batch([[1, 4], [9, 16]])
+
+        r = np.sqrt(a)
+        assert isinstance(r, VecArray)
+        assert (r._items == [[1, 2], [3, 4]]).all()
+
+        # a Vec combined with a VecArray applies to every row
+        r = VecXY(1, 1) + a
+        assert isinstance(r, VecArray)
+        assert (r._items == [[2, 5], [10, 17]]).all()
+        r = np.add(VecXY(1, 1), a)
+        assert isinstance(r, VecArray)
+
+        np.multiply(a, 2, out=a)
+        assert (a._items == [[2, 8], [18, 32]]).all()
+
+class TestVecExpr(unittest.TestCase):
+    def _make_vec_xy(self) -> type:
+        class VecXY(Vec):
+            x: float
+            y: float
+
+        return VecXY
+
+    def test_matches_eager(self):
+        VecXY = self._make_vec_xy()
+        rng = np.random.default_rng(0)
+        a, b, c, d = (VecXY.batch(rng.random((5, 2)) + 1) for _ in range(4))
+
+        la, lb, lc, ld = lazy(a, b, c, d)
+        expr = la + lb * 2 - lc / ld
+        assert isinstance(expr, VecExpr) and len(expr._compile()) == 4
+        result = expr.eval()
+        assert isinstance(result, VecArray)
+        assert np.allclose(result._items, (a + b * 2 - c / d)._items)
+        assert expr.eval() is result # evaluated once
+
+        # reflected operators, negation, powers and ufuncs
+        expr = 1 - (-a.lazy()) ** 2 / b + np.sqrt(c.lazy())
+        assert np.allclose(np.asarray(expr), 1 - (-a._items) ** 2 / b._items + np.sqrt(c._items))
+
+        # a Vec with a VecArray gives a VecArray, and Vecs alone give a Vec
+        assert isinstance((VecXY(1, 1).lazy() + a).eval(), VecArray)
+        v = (VecXY(1, 2).lazy() * 3 + VecXY(1, 1)).eval()
+        assert isinstance(v, VecXY) and list(v) == [4, 7]
+        assert (VecXY(1, 2).lazy() * 3).x == 3 # evaluated on access
+        assert len(a.lazy() * 2) == 5
+
+    def test_fusion(self):
+        VecXY = self._make_vec_xy()
+        a = VecXY.batch(np.ones((4, 2)))
+        b = VecXY.batch(np.full((4, 2), 2.0))
+
+        # a repeated subexpression is computed once
+        t = a.lazy() * b
+        expr = t + a.lazy() * b - (a.lazy() * b)
+        assert len(expr._compile()) == 3
+        assert (expr.eval()._items == 2).all()
+
+        # temporaries are reused, so the result is the only array allocated
+        big = VecXY.batch(np.ones((100_000, 2)))
+        tracing = tracemalloc.is_tracing()
+        tracemalloc.start()
+        try:
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            result = (((big.lazy() + big) * 2 + 1) / 3).eval()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        assert peak - start < 1.5 * big._items.nbytes
+        assert (result._items == 5 / 3).all()
+
+        expr = ((a.lazy() + b) * 2 + 1) / 3
+
+        # into a given buffer, or in place, without wrapping a new VecArray
+        out = VecXY.batch(np.zeros((4, 2)))
+        assert expr.eval(out=out) is out and (out._items == 7 / 3).all()
+        c = VecXY.batch(np.full((4, 2), 3.0))
+        (c.lazy() * 2 + c.lazy() ** 2).eval(out=c) # out is an operand, so holds no temporary
+        assert (c._items == 15).all()
+        items = a._items
+        a += b.lazy() * 3
+        assert a._items is items and (items == 7).all()
+
+        # a result of a different dtype than the temporaries gets its own buffer
+        ints = VecArray(VecXY, np.ones((2, 2), dtype=int))
+        assert (((ints.lazy() + ints) / 4).eval()._items == 0.5).all()
+
+    def test_vec_in_place(self):
+        VecXY = self._make_vec_xy()
+        v = VecXY(1, 2)
+        items = v._items
+        v += VecXY(1, 1).lazy() * 2
+        assert v._items is items and list(v) == [3, 4]
+
+class TestSmallVec(unittest.TestCase):
+    def test_api(self):
+        v = Vec2(3, 4)
+        assert v.x == 3.0 and isinstance(v.x, float)
+        assert v[1] == 4 and v[-1] == 4 and len(v) == 2
+        x, y = v
+        assert (x, y) == (3, 4)
+        assert v.magnitude() == 5
+        assert v.direction() == Vec2(0.6, 0.8)
+        assert v.argument() == Vec2.vec_cls(3, 4).argument()
+        assert repr(Vec3(1, 2, 3)) == 'Vec3(1.0, 2.0, 3.0)'
+        v[0] = 1
+        assert v.x == 1.0
+        assert Vec4(1, 2, 3, 4).w == 4
+        with self.assertRaises(AttributeError): # no __dict__
+            v.z = 1
+
+    def test_operators(self):
+        # as for a numpy backed Vec
+        u, v = Vec3(1, 2, 3), Vec3(4, 5, 6)
+        nu, nv = u.to_vec(), v.to_vec()
+        for small, numpy in ((u + v, nu + nv), (u - v, nu - nv), (u * v, nu * nv), (u / v, nu / nv), (u ** 2, nu ** 2),
+                             (u + 1, nu + 1), (2 * u, 2 * nu), (1 + u, 1 + nu), (-u, -nu), (u + [1, 1, 1], nu + [1, 1, 1]),
+                             (u + nv, nu + nv), (u / 2.0, nu / 2.0)):
+            assert isinstance(small, Vec3)
+            assert list(small) == list(numpy), (small, numpy)
+        assert 6 - u == Vec3(5, 4, 3)
+        assert 12 / u == Vec3(12, 6, 4)
+
+        w = Vec3(1, 1, 1)
+        w += u
+        w *= 2
+        w -= 1
+        w /= Vec3(1, 1, 3)
+        assert w == Vec3(3, 5, 7 / 3) and w == (3, 5, 7 / 3)
+
+        with self.assertRaises(ValueError):
+            u + Vec2(1, 2)
+        with self.assertRaises(TypeError):
+            u + 'abc'
+
+    def test_conversion(self):
+        v = Vec2(1, 2)
+        nv = v.to_vec()
+        assert isinstance(nv, Vec) and list(nv) == [1, 2] and nv.y == 2
+        assert Vec2.from_vec(nv) == v and isinstance(Vec2.from_vec(nv).x, float)
+        assert (np.asarray(v) == [1, 2]).all()
+
+        a = Vec2.batch([v, Vec2(3, 4)])
+        assert isinstance(a, VecArray) and (a._items == [[1, 2], [3, 4]]).all()
+        assert Vec2.from_batch(a) == [v, Vec2(3, 4)]
+        assert len(Vec2.batch(5)) == 5
+
+        # a small Vec with a VecArray applies to every row
+        assert ((v + a)._items == [[2, 4], [4, 6]]).all()
+        assert ((a * v)._items == [[1, 4], [3, 8]]).all()
+
+if __name__ == '__main__':
+    unittest.main()